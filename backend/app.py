@@ -1,29 +1,81 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g, Response
 from flask_cors import CORS
+import logging
 import os
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Diagnostics from routes and services go to stderr (gunicorn's error log)
+logging.basicConfig(
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s [%(process)d] [%(levelname)s] %(name)s: %(message)s'
+)
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # Import routes after app initialization to avoid circular imports
-from routes import domain_routes, email_routes, username_routes, ip_routes
+from routes import domain_routes, email_routes, username_routes, ip_routes, job_routes, watchlist_routes
+
+from services import dns_resolver, jobs, metrics, upstream, watchlist
+
+# Build the shared DNS resolver once at startup rather than per request
+dns_resolver.get_resolver()
+
+# Start this worker's job runner and watch scheduler so queued jobs, due
+# watch checks and work left behind by a restarted worker are picked up
+# without waiting for a new request
+jobs.get_job_runner()
+watchlist.get_watch_scheduler()
 
 # Register blueprints
 app.register_blueprint(domain_routes.bp)
 app.register_blueprint(email_routes.bp)
 app.register_blueprint(username_routes.bp)
 app.register_blueprint(ip_routes.bp)
+app.register_blueprint(job_routes.bp)
+app.register_blueprint(watchlist_routes.bp)
+
+@app.before_request
+def start_request_timer():
+    """Track in-flight requests and when each one started"""
+    g.request_started = time.perf_counter()
+    metrics.HTTP_IN_FLIGHT.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and record its latency under its route, not its raw URL"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_REQUESTS.inc(endpoint, request.method, response.status_code)
+        metrics.HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, endpoint)
+    return response
+
+@app.teardown_request
+def finish_request(error=None):
+    metrics.HTTP_IN_FLIGHT.dec()
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "message": "I See You OSINT API is running"}), 200
+    return jsonify({
+        "status": "healthy",
+        "message": "I See You OSINT API is running",
+        "upstreams": upstream.upstream_status()
+    }), 200
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics for this worker process"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
+    # Development server only; use gunicorn (see gunicorn.conf.py) in production
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True) 
\ No newline at end of file
+    debug = os.environ.get('FLASK_DEBUG', '1') == '1'
+    app.run(host='0.0.0.0', port=port, debug=debug, threaded=True) 
\ No newline at end of file
@@ -0,0 +1 @@
+# Benchmark harness package
\ No newline at end of file
@@ -0,0 +1,45 @@
+"""Compare two benchmark result files.
+
+    python -m bench.compare bench/results/before.json bench/results/after.json
+"""
+import argparse
+import json
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def change(before, after):
+    if not before:
+        return '    n/a'
+    return f"{(after - before) / before * 100:+6.1f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args(argv)
+
+    before, after = load(args.before), load(args.after)
+
+    header = f"{'endpoint':34} {'rps':>17} {'p50 ms':>17} {'p99 ms':>17} {'err%':>13}"
+    print(header)
+    print('-' * len(header))
+    for name in after:
+        if name not in before:
+            continue
+        old, new = before[name], after[name]
+        print(
+            f"{name:34} "
+            f"{new['throughput_rps']:>9.1f} {change(old['throughput_rps'], new['throughput_rps'])} "
+            f"{new['latency_ms']['p50']:>9.1f} {change(old['latency_ms']['p50'], new['latency_ms']['p50'])} "
+            f"{new['latency_ms']['p99']:>9.1f} {change(old['latency_ms']['p99'], new['latency_ms']['p99'])} "
+            f"{old['error_rate'] * 100:>5.1f}>{new['error_rate'] * 100:<5.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
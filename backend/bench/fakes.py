@@ -0,0 +1,368 @@
+"""Local stand-ins for the upstreams the API talks to.
+
+Every server answers after a configurable latency (with +/-50% jitter) and
+fails a configurable fraction of requests, so benchmarks are repeatable and
+never touch real registries or third-party sites.
+"""
+import hashlib
+import json
+import random
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import dns.flags
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+# Usernames whose hash falls in this fraction "exist" on every fake site
+EXISTING_USERNAME_RATIO = 0.3
+
+
+class UpstreamBehaviour:
+    """Latency and error rate shared by the handlers of one fake server"""
+
+    def __init__(self, latency=0.05, error_rate=0.0, seed=None, drop_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate  # UDP only: never answer, so the client times out
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        if self.latency > 0:
+            with self._lock:
+                jitter = self._rng.uniform(0.5, 1.5)
+            time.sleep(self.latency * jitter)
+
+    def should_fail(self):
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def should_drop(self):
+        if self.drop_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.drop_rate
+
+
+def _stable_fraction(text):
+    """Map a string to a stable number in [0, 1)"""
+    return int(hashlib.md5(text.encode()).hexdigest()[:8], 16) / 0x100000000
+
+
+def username_exists(username):
+    return _stable_fraction(username) < EXISTING_USERNAME_RATIO
+
+
+class _Server:
+    """Runs a socketserver on a background thread"""
+
+    def __init__(self, server):
+        self.server = server
+        self.port = server.server_address[1]
+        self._thread = threading.Thread(target=server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# --- DNS ---------------------------------------------------------------------
+
+class _DNSHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        data, sock = self.request
+        behaviour = self.server.behaviour
+        try:
+            query = dns.message.from_wire(data)
+        except Exception:
+            return
+
+        behaviour.delay()
+        if behaviour.should_drop():
+            return
+        response = dns.message.make_response(query)
+        response.flags |= dns.flags.RA
+
+        if behaviour.should_fail():
+            response.set_rcode(dns.rcode.SERVFAIL)
+        else:
+            exists = self.server.exists
+            for question in query.question:
+                name = question.name.to_text()
+                if name.startswith('nx') or (exists is not None and not exists(name.rstrip('.'))):
+                    response.set_rcode(dns.rcode.NXDOMAIN)
+                    continue
+                rdatas = _dns_answers(name, question.rdtype)
+                if rdatas:
+                    response.answer.append(
+                        dns.rrset.from_text_list(question.name, 300, 'IN', question.rdtype, rdatas)
+                    )
+
+        sock.sendto(response.to_wire(), self.client_address)
+
+
+def _dns_answers(name, rdtype):
+    """Plausible records for any name"""
+    octet = int(_stable_fraction(name) * 250) + 1
+    return {
+        dns.rdatatype.A: [f"127.0.0.{octet}"],  # Loopback, so connections fail fast instead of timing out
+        dns.rdatatype.AAAA: [f"2001:db8::{octet:x}"],
+        dns.rdatatype.MX: [f"10 mail.{name}", f"20 mail2.{name}"],
+        dns.rdatatype.NS: [f"ns1.{name}", f"ns2.{name}"],
+        dns.rdatatype.TXT: ['"v=spf1 -all"', f'"bench-verification={octet}"'],
+        dns.rdatatype.SOA: [f"ns1.{name} hostmaster.{name} 1 7200 3600 1209600 300"],
+        dns.rdatatype.PTR: [f"host-{octet}.bench.test."],
+    }.get(rdtype, [])
+
+
+class _ThreadingUDPServer(socketserver.ThreadingMixIn, socketserver.UDPServer):
+    daemon_threads = True
+
+
+def dns_server(behaviour, host='127.0.0.1', port=0, exists=None):
+    """Authoritative-looking UDP DNS server.
+
+    Every name exists except those starting "nx", or, if exists is given,
+    those for which exists(name) is false. Without latency the server
+    answers inline rather than starting a thread per query, so it keeps up
+    with pipelined clients.
+    """
+    server_class = _ThreadingUDPServer if behaviour.latency > 0 else socketserver.UDPServer
+    server = server_class((host, port), _DNSHandler)
+    server.behaviour = behaviour
+    server.exists = exists
+    return _Server(server)
+
+
+# --- WHOIS (port 43) -----------------------------------------------------------
+
+class _WhoisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        domain = self.rfile.readline().decode('utf-8', 'replace').strip().split()[-1]
+        behaviour = self.server.behaviour
+        behaviour.delay()
+        if behaviour.should_fail():
+            return  # Close without an answer, like an overloaded registry
+
+        self.wfile.write((
+            f"   Domain Name: {domain.upper()}\r\n"
+            f"   Registrar: Bench Registrar, Inc.\r\n"
+            f"   Creation Date: 2001-02-03T04:05:06Z\r\n"
+            f"   Registry Expiry Date: 2031-02-03T04:05:06Z\r\n"
+            f"   Name Server: NS1.{domain.upper()}\r\n"
+            f"   Name Server: NS2.{domain.upper()}\r\n"
+            f"   Domain Status: clientTransferProhibited\r\n"
+            f"   Registrar Abuse Contact Email: abuse@bench-registrar.test\r\n"
+            f"   DNSSEC: unsigned\r\n"
+        ).encode())
+
+
+class _ThreadingTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def whois_server(behaviour, host='127.0.0.1', port=0):
+    """Registry WHOIS server that knows every domain"""
+    server = _ThreadingTCPServer((host, port), _WhoisHandler)
+    server.behaviour = behaviour
+    return _Server(server)
+
+
+# --- HTTP: RDAP, ip-api and profile sites ------------------------------------------
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch(send_body=True)
+
+    def do_HEAD(self):
+        self._dispatch(send_body=False)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length else b''
+        self._dispatch(send_body=True, body=body)
+
+    def _dispatch(self, send_body, body=b''):
+        behaviour = self.server.behaviours.get(self._kind(), self.server.default_behaviour)
+        behaviour.delay()
+        if behaviour.should_fail():
+            return self._send(503, b'{"error": "unavailable"}', send_body)
+
+        path = urlsplit(self.path).path
+        parts = [part for part in path.split('/') if part]
+
+        if path == '/rdap/dns.json':
+            base = f"http://127.0.0.1:{self.server.server_address[1]}/rdap/"
+            return self._json({"version": "1.0", "services": [[["test", "bench"], [base]]]}, send_body)
+        if parts[:2] == ['rdap', 'domain'] and len(parts) == 3:
+            return self._json(_rdap_domain(parts[2]), send_body, 'application/rdap+json')
+        if parts[:2] == ['rdap', 'ip'] and len(parts) == 3:
+            return self._json(_rdap_ip(parts[2]), send_body, 'application/rdap+json')
+        if path == '/batch' and self.command == 'POST':
+            queries = json.loads(body or b'[]')
+            with self.server.lock:
+                self.server.batch_calls.append((time.monotonic(), [item.get("query") for item in queries]))
+            return self._json([_geolocation(item.get("query")) for item in queries], send_body,
+                              headers=dict(self.server.ipapi_headers))
+        if parts[:1] == ['site'] and len(parts) == 3:
+            return self._site(parts[1], parts[2], send_body)
+        if path == '/login':
+            # Where 'redirect' sites send missing profiles; a normal page, so only the URL gives it away
+            return self._send(200, b'<html>Log in</html>', send_body, 'text/html')
+
+        self._send(404, b'not found', send_body)
+
+    def _kind(self):
+        path = self.path
+        if path.startswith('/rdap/'):
+            return 'rdap'
+        if path.startswith('/batch'):
+            return 'ipapi'
+        return 'sites'
+
+    def _site(self, kind, username, send_body):
+        exists = username_exists(username)
+        if kind == 'message':
+            # Always 200; a missing profile is only visible in the body
+            text = (b'<html><body>' + b'<p>padding</p>' * 2000 +
+                    (b'<h1>Profile</h1>' if exists else b'<h1>User not found</h1>') +
+                    b'<p>footer</p>' * 5000 + b'</body></html>')
+            return self._send(200, text, send_body, 'text/html')
+        if kind == 'redirect' and not exists:
+            return self._send(302, b'', send_body, headers={'Location': '/login'})
+        if kind == 'nohead' and self.command == 'HEAD':
+            return self._send(405, b'', send_body)
+        self._send(200 if exists else 404, b'<html>' + b'x' * 50000 + b'</html>', send_body, 'text/html')
+
+    def _json(self, data, send_body, content_type='application/json', headers=None):
+        self._send(200, json.dumps(data).encode(), send_body, content_type, headers)
+
+    def _send(self, status, body, send_body, content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Clients stop reading once they have what they need
+
+
+def _rdap_domain(domain):
+    return {
+        "objectClassName": "domain",
+        "ldhName": domain.upper(),
+        "status": ["client transfer prohibited"],
+        "events": [
+            {"eventAction": "registration", "eventDate": "2001-02-03T04:05:06Z"},
+            {"eventAction": "expiration", "eventDate": "2031-02-03T04:05:06Z"},
+            {"eventAction": "last changed", "eventDate": "2024-01-01T00:00:00Z"},
+        ],
+        "nameservers": [{"ldhName": f"NS1.{domain.upper()}"}, {"ldhName": f"NS2.{domain.upper()}"}],
+        "secureDNS": {"delegationSigned": False},
+        "entities": [{
+            "roles": ["registrar"],
+            "vcardArray": ["vcard", [["version", {}, "text", "4.0"], ["fn", {}, "text", "Bench Registrar, Inc."]]],
+            "entities": [{
+                "roles": ["abuse"],
+                "vcardArray": ["vcard", [["email", {}, "text", "abuse@bench-registrar.test"]]]
+            }]
+        }]
+    }
+
+
+def _rdap_ip(ip):
+    """An ipwhois-style lookup_rdap() result; every /24 is its own allocation"""
+    network = '.'.join(ip.split('.')[:3]) + '.0/24' if '.' in ip else ip + '/128'
+    return {
+        "query": ip,
+        "asn": "64500",
+        "asn_cidr": network,
+        "asn_country_code": "ZZ",
+        "asn_registry": "bench",
+        "asn_description": "BENCH-AS",
+        "network": {"cidr": network, "name": "BENCH-NET", "country": "ZZ", "handle": f"NET-{network}"},
+        "entities": ["BENCH-1"],
+        "objects": {}
+    }
+
+
+def _geolocation(ip):
+    fraction = _stable_fraction(ip or '')
+    return {
+        "status": "success",
+        "country": "Benchland",
+        "countryCode": "ZZ",
+        "city": "Bench City",
+        "lat": round(fraction * 180 - 90, 4),
+        "lon": round(fraction * 360 - 180, 4),
+        "isp": "Bench ISP",
+        "query": ip
+    }
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections are routine, not worth a traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def http_server(behaviours, default_behaviour, host='127.0.0.1', port=0):
+    """HTTP server for the RDAP bootstrap/domain/ip, ip-api batch and profile-site endpoints.
+
+    behaviours maps 'rdap', 'ipapi' and 'sites' to their UpstreamBehaviour.
+    Every ip-api batch call is recorded in server.batch_calls as (monotonic
+    time, queried IPs); server.ipapi_headers holds the rate-limit headers it
+    answers with.
+    """
+    server = _QuietHTTPServer((host, port), _HTTPHandler)
+    server.behaviours = behaviours
+    server.default_behaviour = default_behaviour
+    server.lock = threading.Lock()
+    server.batch_calls = []
+    server.ipapi_headers = {'X-Rl': '1000', 'X-Ttl': '60'}
+    return _Server(server)
+
+
+def site_catalog(port, count):
+    """Build a Sherlock-style catalog of count sites on the fake server, mixing detection rules"""
+    kinds = [
+        ('status', {"errorType": "status_code"}),
+        ('nohead', {"errorType": "status_code"}),
+        ('message', {"errorType": "message", "errorMsg": "User not found"}),
+        ('redirect', {"errorType": "response_url", "errorUrl": "/login"}),
+    ]
+    catalog = {}
+    for i in range(count):
+        kind, rules = kinds[i % len(kinds)]
+        catalog[f"BenchSite{i:04d}"] = dict(
+            rules,
+            url=f"http://127.0.0.1:{port}/site/{kind}/{{}}",
+            urlMain=f"http://127.0.0.1:{port}/"
+        )
+    return catalog
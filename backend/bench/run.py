@@ -0,0 +1,321 @@
+"""Benchmark every /api/* endpoint against local fake upstreams.
+
+Run from the backend directory:
+
+    python -m bench.run --concurrency 16 --requests 200
+    python -m bench.run --endpoints domain,ip --latency 0.1 --error-rate 0.05
+    python -m bench.compare bench/results/old.json bench/results/new.json
+
+The app runs in-process on a threaded server and every upstream (DNS,
+WHOIS, RDAP, ip-api, profile sites) is a local fake with configurable
+latency and error rate. Results are printed and saved as JSON.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+import requests
+
+from bench import fakes
+
+UPSTREAM_KINDS = ('dns', 'whois', 'rdap', 'ipapi', 'sites')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients per endpoint')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+    parser.add_argument('--endpoints', default='',
+                        help='Comma-separated substrings selecting endpoints (default: all)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Upstream latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of upstream calls that fail')
+    parser.add_argument('--upstream', action='append', default=[], metavar='KIND=LATENCY[:ERROR_RATE]',
+                        help=f"Override one upstream ({', '.join(UPSTREAM_KINDS)}), e.g. dns=0.01:0.1")
+    parser.add_argument('--hot-keys', type=int, default=0,
+                        help='Draw targets from this many names so caches get hits (0: every target is new)')
+    parser.add_argument('--sites', type=int, default=40, help='Sites in the generated username catalog')
+    parser.add_argument('--batch-size', type=int, default=5, help='Targets per batch request')
+    parser.add_argument('--keep-limits', action='store_true',
+                        help='Keep the per-upstream rate limits (all fakes share one host, so they throttle hard)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON results path (default: bench/results/<timestamp>.json)')
+    return parser.parse_args(argv)
+
+
+def upstream_behaviours(args):
+    behaviours = {kind: (args.latency, args.error_rate) for kind in UPSTREAM_KINDS}
+    for override in args.upstream:
+        kind, _, spec = override.partition('=')
+        if kind not in behaviours or not spec:
+            raise SystemExit(f"Bad --upstream {override!r}; use KIND=LATENCY[:ERROR_RATE]")
+        latency, _, error_rate = spec.partition(':')
+        behaviours[kind] = (float(latency), float(error_rate) if error_rate else behaviours[kind][1])
+    return {
+        kind: fakes.UpstreamBehaviour(latency, error_rate, seed=args.seed + i)
+        for i, (kind, (latency, error_rate)) in enumerate(sorted(behaviours.items()))
+    }
+
+
+def start_upstreams(args, workdir):
+    """Start the fakes and point the app's configuration at them (before the app is imported)"""
+    behaviours = upstream_behaviours(args)
+    dns = fakes.dns_server(behaviours['dns']).start()
+    whois = fakes.whois_server(behaviours['whois']).start()
+    http = fakes.http_server(behaviours, behaviours['sites']).start()
+
+    catalog_path = os.path.join(workdir, 'sites.json')
+    with open(catalog_path, 'w') as f:
+        json.dump(fakes.site_catalog(http.port, args.sites), f)
+
+    base = f"http://127.0.0.1:{http.port}"
+    os.environ.update({
+        'DNS_NAMESERVERS': '127.0.0.1',
+        'DNS_PORT': str(dns.port),
+        'WHOIS_PORT': str(whois.port),
+        'RDAP_BOOTSTRAP_URL': f"{base}/rdap/dns.json",
+        'RDAP_BOOTSTRAP_PATH': os.path.join(workdir, 'rdap-dns.json'),
+        'IPAPI_URL': base,
+        'WHOAPI_URL': f"{base}/whoapi",
+        'USERNAME_SITES_PATH': catalog_path,
+        'PREFIX_CACHE_PATH': os.path.join(workdir, 'prefixes.sqlite3'),
+        'CACHE_SQLITE_PATH': os.path.join(workdir, 'cache.sqlite3'),
+        'CACHE_LOCK_DIR': os.path.join(workdir, 'locks'),
+        'GEO_BACKEND': 'remote',
+    })
+    if not args.keep_limits:
+        os.environ.update({
+            'UPSTREAM_RATE': '1000000',
+            'UPSTREAM_BURST': '1000000',
+            'UPSTREAM_TARGETS_RATE': '1000000',
+            'UPSTREAM_TARGETS_BURST': '1000000',
+            'WHOIS_SERVER_INTERVAL': '0.000001',
+        })
+    return base, (dns, whois, http)
+
+
+class BenchIPWhois:
+    """Stands in for ipwhois.IPWhois, whose RIR servers cannot be redirected; fetches from the fake RDAP server"""
+
+    base_url = None
+
+    def __init__(self, ip):
+        self.ip = ip
+
+    def lookup_rdap(self):
+        from services import http_client
+        response = http_client.get(f"{self.base_url}/rdap/ip/{self.ip}")
+        response.raise_for_status()
+        return response.json()
+
+
+def start_app(base, keep_limits):
+    """Import the app with the fake configuration and serve it on a local port"""
+    from werkzeug.serving import make_server
+
+    from app import app
+    from routes import domain_routes, ip_routes
+    from services import upstream, whois_client
+
+    whois_client.TLD_SERVERS.update({"test": "127.0.0.1", "bench": "127.0.0.1"})
+    BenchIPWhois.base_url = base
+    ip_routes.IPWhois = BenchIPWhois
+
+    # python-whois always talks to the real registries on port 43
+    def python_whois_disabled(domain):
+        raise Exception("python-whois is disabled in benchmarks")
+    domain_routes.whois.whois = python_whois_disabled
+
+    if not keep_limits:
+        for name in upstream.UPSTREAM_LIMITS:
+            upstream.UPSTREAM_LIMITS[name] = (upstream.UPSTREAM_RATE, upstream.UPSTREAM_BURST)
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def build_endpoints(args, site_base):
+    """Return (name, method, path, make_request) for every endpoint; make_request(n) builds one call"""
+    def domain(n):
+        return f"bench{n}.test"
+
+    def ip(n):
+        return f"198.{18 + n // 62500 % 2}.{n // 250 % 250}.{n % 250 + 1}"
+
+    def email(n):
+        return f"user{n}@bench{n}.test"
+
+    def username(n):
+        return f"benchuser{n}"
+
+    def many(make, n):
+        return [make(n * args.batch_size + i) for i in range(args.batch_size)]
+
+    return [
+        ('GET /api/health', 'GET', '/api/health', lambda n: {}),
+        ('GET /api/metrics', 'GET', '/api/metrics', lambda n: {}),
+
+        ('POST /api/domain/whois', 'POST', '/api/domain/whois', lambda n: {'json': {'domain': domain(n)}}),
+        ('POST /api/domain/dns', 'POST', '/api/domain/dns', lambda n: {'json': {'domain': domain(n)}}),
+        ('POST /api/domain/headers', 'POST', '/api/domain/headers',
+         lambda n: {'json': {'domain': f"{site_base}/site/status/{username(n)}"}}),
+        ('POST /api/domain/batch', 'POST', '/api/domain/batch',
+         lambda n: {'json': {'targets': many(domain, n), 'lookups': ['whois', 'dns']}}),
+        ('POST /api/domain/profile', 'POST', '/api/domain/profile', lambda n: {'json': {'domain': domain(n)}}),
+        ('GET /api/domain/stream', 'GET', '/api/domain/stream', lambda n: {'params': {'domain': domain(n)}}),
+
+        ('POST /api/email/validate', 'POST', '/api/email/validate', lambda n: {'json': {'email': email(n)}}),
+        ('POST /api/email/haveibeenpwned', 'POST', '/api/email/haveibeenpwned',
+         lambda n: {'json': {'email': email(n)}}),
+        ('POST /api/email/domain-emails', 'POST', '/api/email/domain-emails',
+         lambda n: {'json': {'domain': domain(n)}}),
+        ('POST /api/email/batch', 'POST', '/api/email/batch', lambda n: {'json': {'targets': many(email, n)}}),
+        ('POST /api/email/profile', 'POST', '/api/email/profile', lambda n: {'json': {'email': email(n)}}),
+        ('GET /api/email/stream', 'GET', '/api/email/stream', lambda n: {'params': {'email': email(n)}}),
+
+        ('POST /api/username/search', 'POST', '/api/username/search',
+         lambda n: {'json': {'username': username(n)}}),
+        ('POST /api/username/sherlock', 'POST', '/api/username/sherlock',
+         lambda n: {'json': {'username': username(n)}}),
+        ('POST /api/username/batch', 'POST', '/api/username/batch',
+         lambda n: {'json': {'targets': many(username, n)}}),
+        ('POST /api/username/profile', 'POST', '/api/username/profile',
+         lambda n: {'json': {'username': username(n)}}),
+        ('GET /api/username/stream', 'GET', '/api/username/stream',
+         lambda n: {'params': {'username': username(n)}}),
+
+        ('POST /api/ip/geolocation', 'POST', '/api/ip/geolocation', lambda n: {'json': {'ip': ip(n)}}),
+        ('POST /api/ip/whois', 'POST', '/api/ip/whois', lambda n: {'json': {'ip': ip(n)}}),
+        ('POST /api/ip/reverse-dns', 'POST', '/api/ip/reverse-dns', lambda n: {'json': {'ip': ip(n)}}),
+        ('POST /api/ip/shodan', 'POST', '/api/ip/shodan', lambda n: {'json': {'ip': ip(n)}}),
+        ('POST /api/ip/batch', 'POST', '/api/ip/batch', lambda n: {'json': {'targets': many(ip, n)}}),
+        ('POST /api/ip/profile', 'POST', '/api/ip/profile', lambda n: {'json': {'ip': ip(n)}}),
+        ('GET /api/ip/stream', 'GET', '/api/ip/stream', lambda n: {'params': {'ip': ip(n)}}),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run_endpoint(app_url, method, path, make_request, args, target_numbers):
+    """Send args.requests calls with args.concurrency clients and summarise them"""
+    local = threading.local()
+
+    def call(_):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+
+        kwargs = make_request(next(target_numbers))
+        started = time.perf_counter()
+        try:
+            response = session.request(method, app_url + path, timeout=120, **kwargs)
+            response.content  # Streamed endpoints finish when the body does
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        samples = list(executor.map(call, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 2),
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2),
+        }
+    }
+
+
+class TargetNumbers:
+    """Thread-safe source of target numbers: all distinct, or drawn from a small hot set"""
+
+    def __init__(self, hot_keys, seed):
+        self.hot_keys = hot_keys
+        self._counter = count()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __next__(self):
+        with self._lock:
+            if self.hot_keys > 0:
+                return self._rng.randrange(self.hot_keys)
+            return next(self._counter)
+
+
+def print_report(results):
+    header = f"{'endpoint':34} {'req':>5} {'err%':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for name, result in results.items():
+        latency = result["latency_ms"]
+        print(f"{name:34} {result['requests']:>5} {result['error_rate'] * 100:>5.1f}% "
+              f"{result['throughput_rps']:>8.1f} {latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix='iseeyou-bench-')
+
+    base, _ = start_upstreams(args, workdir)
+    app_url, _ = start_app(base, args.keep_limits)
+
+    selectors = [selector.strip() for selector in args.endpoints.split(',') if selector.strip()]
+    endpoints = [
+        endpoint for endpoint in build_endpoints(args, base.replace('http://', ''))
+        if not selectors or any(selector in endpoint[0] for selector in selectors)
+    ]
+    if not endpoints:
+        raise SystemExit("No endpoints match --endpoints")
+
+    numbers = TargetNumbers(args.hot_keys, args.seed)
+    results = {}
+    for name, method, path, make_request in endpoints:
+        print(f"Benchmarking {name} ...", file=sys.stderr)
+        results[name] = run_endpoint(app_url, method, path, make_request, args, numbers)
+
+    print_report(results)
+
+    report = {
+        "started_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "results": results
+    }
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'results', time.strftime('bench-%Y%m%d-%H%M%S.json')
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+
+if __name__ == '__main__':
+    main()
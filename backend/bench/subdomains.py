@@ -0,0 +1,67 @@
+"""Measure subdomain enumeration throughput against the local fake DNS server.
+
+    python -m bench.subdomains --labels 100000 --drop-rate 0.01
+
+Runs the fake server in a separate process so it does not compete with the
+enumerator for the GIL.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+from bench import fakes
+
+DOMAIN = 'enum.test'
+
+
+def serve(port_queue, latency, drop_rate, existing_every):
+    def exists(name):
+        label = name.split('.')[0]
+        return name.endswith('.' + DOMAIN) and label[1:].isdigit() and int(label[1:]) % existing_every == 0
+
+    server = fakes.dns_server(fakes.UpstreamBehaviour(latency, drop_rate=drop_rate, seed=1), exists=exists)
+    port_queue.put(server.port)
+    server.server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure subdomain enumeration throughput")
+    parser.add_argument('--labels', type=int, default=100000)
+    parser.add_argument('--existing-every', type=int, default=100, help='One label in this many exists')
+    parser.add_argument('--latency', type=float, default=0.0, help='Fake server latency in seconds')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='Fraction of queries never answered')
+    parser.add_argument('--timeout', type=float, default=1.0, help='Per-attempt query timeout')
+    args = parser.parse_args(argv)
+
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=serve, args=(port_queue, args.latency, args.drop_rate, args.existing_every), daemon=True
+    )
+    process.start()
+    port = port_queue.get()
+
+    # The fake server is the only client of itself; measure the enumerator, not the cap
+    os.environ.setdefault('SUBDOMAIN_MAX_QPS', '1000000')
+    from services.subdomains import SubdomainEnumerator
+    try:
+        enumerator = SubdomainEnumerator(
+            DOMAIN, (f"w{i}" for i in range(args.labels)), nameservers=['127.0.0.1'], port=port, timeout=args.timeout
+        )
+        started = time.monotonic()
+        first_found = None
+        for _ in enumerator:
+            if first_found is None:
+                first_found = time.monotonic() - started
+
+        summary = enumerator.summary()
+        summary["expected"] = len(range(0, args.labels, args.existing_every))
+        summary["first_result_seconds"] = round(first_found, 3) if first_found is not None else None
+        print(json.dumps(summary, indent=2))
+    finally:
+        process.terminate()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# Gunicorn configuration for production
+#
+# Start with:  gunicorn app:app
+#
+# Every endpoint spends nearly all of its time waiting on WHOIS, DNS, HTTP
+# or RDAP upstreams. The default gthread worker serves each request on one
+# of threads OS threads per worker process, so those waits block only their
+# own request.
+#
+# GUNICORN_WORKER_CLASS=gevent holds up to worker_connections lookups per
+# process on green threads instead, but gevent cannot patch the sqlite3
+# module: every query against the job store, the watchlist, the RDAP prefix
+# cache or CACHE_BACKEND=sqlite stalls the whole worker. Only choose it with
+# CACHE_BACKEND=memory and when background jobs and watches see little use.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# gevent: concurrent requests per worker process
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# gthread: OS threads per worker process
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+# Slow registries can take a while; streaming endpoints keep connections open
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def worker_exit(server, worker):
+    """Write cached RDAP prefixes that are still waiting for their scheduled save"""
+    from services.prefix_cache import flush_prefix_cache
+    flush_prefix_cache()
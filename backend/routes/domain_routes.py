@@ -1,16 +1,43 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
 import whois
+import dns.exception
 import dns.resolver
-import requests
-from bs4 import BeautifulSoup
+import logging
 import os
 import json
-import socket
 import time
 import random
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+from services import http_client, dns_resolver, rdap, whois_client
+from services.batch import parse_batch_request, stream_batch
+from services.cache import cached, CACHE_TTLS
+from services.concurrency import run_concurrently, call_with_timeout
+from services.metrics import WHOIS_SOURCES
+from services.profile import profile_response
+from services.sse import stream_events
+from services.subdomains import SubdomainEnumerator, load_wordlist
 
 bp = Blueprint('domain', __name__, url_prefix='/api/domain')
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECORD_TYPES = ['A', 'AAAA', 'MX', 'NS', 'TXT', 'SOA', 'CNAME']
+
+# Deadline (seconds) for a python-whois lookup, including referrals
+WHOIS_TIMEOUT = float(os.environ.get('WHOIS_TIMEOUT', 15))
+
+# Demo WHOIS API used when RDAP and every WHOIS source fail
+WHOAPI_URL = os.environ.get('WHOAPI_URL', 'https://api.whoapi.com').rstrip('/')
+http_client.register_host(WHOAPI_URL, 'whoapi')
+
+# Overall deadline (seconds) for resolving all requested DNS record types
+DNS_DEADLINE = float(os.environ.get('DNS_DEADLINE', 15))
+
+# Header lookups: timeout per scheme, and how long HTTPS may still take once plain HTTP has answered
+HEADERS_TIMEOUT = float(os.environ.get('HEADERS_TIMEOUT', 15))
+HEADERS_HTTPS_GRACE = float(os.environ.get('HEADERS_HTTPS_GRACE', 2))
+
 # Mock data for common domains when using placeholder API keys
 MOCK_WHOIS_DATA = {
     "google.com": {
@@ -58,141 +85,146 @@ def domain_whois():
     
     domain = data['domain']
     
+    try:
+        return jsonify(lookup_whois(domain))
+    
+    except Exception as e:
+        logger.warning("WHOIS error for %s: %s", domain, e)
+        return jsonify({
+            "domain": domain,
+            "whois_data": {"error": str(e)},
+            "message": "WHOIS lookup encountered an error. This might be due to rate limiting or network issues."
+        }), 200  # Return 200 to allow frontend to display partial results
+
+def lookup_whois(domain):
+    """Look up WHOIS information for a domain, returning the response body"""
     # Check if we have mock data for this domain
     if domain in MOCK_WHOIS_DATA:
-        return jsonify({
+        return {
             "domain": domain,
             "whois_data": MOCK_WHOIS_DATA[domain],
             "note": "Using mock data for demonstration purposes. For real data, configure API keys."
-        })
+        }
+    
+    whois_data = cached('whois', domain, lambda: fetch_whois(domain), ttl=whois_cache_ttl)
     
+    return {
+        "domain": domain,
+        "whois_data": whois_data
+    }
+
+def whois_cache_ttl(whois_data):
+    """Cache real WHOIS results, but never the generated placeholder data"""
+    if whois_data.get("source") == "Generated Mock Data (Demo)":
+        return 0
+    return CACHE_TTLS['whois']
+
+def fetch_whois(domain):
+    """Fetch registration data over RDAP, falling back through several WHOIS sources"""
+    # RDAP goes straight to the registry named by the IANA bootstrap file
+    # and returns structured JSON, so it is tried before any WHOIS source
+    try:
+        whois_data = rdap.lookup_domain(domain)
+        WHOIS_SOURCES.inc('rdap', 'success')
+        return whois_data
+    except Exception as rdap_error:
+        WHOIS_SOURCES.inc('rdap', 'failure')
+        logger.info("RDAP lookup for %s failed: %s", domain, rdap_error)
+    
+    # Try to get WHOIS information using python-whois library
+    # (bounded per call; changing the process-wide socket timeout would affect every thread)
     try:
-        # Set socket timeout to prevent hanging
-        socket.setdefaulttimeout(15)  # 15 seconds timeout
+        whois_info = call_with_timeout(whois.whois, WHOIS_TIMEOUT, domain)
         
-        # Try to get WHOIS information using python-whois library
+        # Convert datetime objects to strings for JSON serialization
+        serializable_whois = {}
+        for key, value in whois_info.items():
+            if isinstance(value, (list, tuple)):
+                serializable_whois[key] = [str(item) if hasattr(item, 'strftime') else item for item in value]
+            else:
+                serializable_whois[key] = str(value) if hasattr(value, 'strftime') else value
+        
+        # Check if we got meaningful data
+        if not any(value for value in serializable_whois.values() if value not in [None, '', 'None', []]):
+            raise Exception("No meaningful WHOIS data found")
+        
+        WHOIS_SOURCES.inc('python_whois', 'success')
+            
+    except Exception as whois_error:
+        WHOIS_SOURCES.inc('python_whois', 'failure')
+        logger.info("Python WHOIS library failed for %s: %s", domain, whois_error)
+        serializable_whois = {}
+        
+        # Try our own port-43 client, following registry -> registrar referrals
         try:
-            whois_info = whois.whois(domain)
+            serializable_whois = whois_client.lookup(domain, deadline=WHOIS_TIMEOUT)
             
-            # Convert datetime objects to strings for JSON serialization
-            serializable_whois = {}
-            for key, value in whois_info.items():
-                if isinstance(value, (list, tuple)):
-                    serializable_whois[key] = [str(item) if hasattr(item, 'strftime') else item for item in value]
-                else:
-                    serializable_whois[key] = str(value) if hasattr(value, 'strftime') else value
+            # Check if we got meaningful data from the WHOIS servers
+            if not any(value for key, value in serializable_whois.items() if key not in ("raw_text", "whois_server") and value):
+                raise Exception("No meaningful WHOIS data from WHOIS servers")
             
-            # Check if we got meaningful data
-            if not any(value for value in serializable_whois.values() if value not in [None, '', 'None', []]):
-                raise Exception("No meaningful WHOIS data found")
+            WHOIS_SOURCES.inc('whois_client', 'success')
                 
-        except Exception as whois_error:
-            print(f"Python WHOIS library failed: {str(whois_error)}")
-            serializable_whois = {}
+        except Exception as client_error:
+            WHOIS_SOURCES.inc('whois_client', 'failure')
+            logger.info("Native WHOIS fallback failed for %s: %s", domain, client_error)
             
-            # Try alternative approach using system whois command
+            # Try third approach using a public API
             try:
-                import subprocess
-                result = subprocess.run(['whois', domain], capture_output=True, text=True, timeout=20)
-                raw_output = result.stdout
-                
-                # Extract some basic info from raw output
-                serializable_whois = {
-                    "raw_text": raw_output,
-                    "registrar": extract_from_raw_whois(raw_output, "Registrar:"),
-                    "creation_date": extract_from_raw_whois(raw_output, "Creation Date:"),
-                    "expiration_date": extract_from_raw_whois(raw_output, "Registry Expiry Date:"),
-                    "name_servers": extract_from_raw_whois(raw_output, "Name Server:", multiple=True)
-                }
-                
-                # Check if we got meaningful data from subprocess
-                if not any(value for value in serializable_whois.values() if value not in [None, '', 'None', [], {}]):
-                    raise Exception("No meaningful WHOIS data from subprocess")
-                    
-            except Exception as subprocess_error:
-                print(f"Subprocess WHOIS fallback failed: {subprocess_error}")
+                # Use a public WHOIS API service
+                api_url = f"{WHOAPI_URL}/?domain={domain}&r=whois&apikey=demo"
+                response = http_client.get(api_url, timeout=10)
                 
-                # Try third approach using a public API
-                try:
-                    # Use a public WHOIS API service
-                    api_url = f"https://api.whoapi.com/?domain={domain}&r=whois&apikey=demo"
-                    response = requests.get(api_url, timeout=10)
-                    
-                    if response.status_code == 200:
-                        api_data = response.json()
-                        
-                        # Map API response to our format
-                        serializable_whois = {
-                            "domain_name": domain,
-                            "registrar": api_data.get("registrar", {}).get("name") if isinstance(api_data.get("registrar"), dict) else api_data.get("registrar"),
-                            "creation_date": api_data.get("date_created"),
-                            "expiration_date": api_data.get("date_expires"),
-                            "name_servers": api_data.get("nameservers", []),
-                            "status": api_data.get("status"),
-                            "emails": api_data.get("emails", []),
-                            "dnssec": api_data.get("dnssec"),
-                            "source": "whoapi.com (demo)"
-                        }
-                        
-                        # For demo API, we might get a status code instead of actual data
-                        if isinstance(api_data.get("status"), int):
-                            serializable_whois["status"] = str(api_data.get("status"))
-                            
-                        # Add a note about using demo API
-                        serializable_whois["note"] = "Using demo API key - limited data available. For full results, configure with your own API keys."
-                    else:
-                        raise Exception(f"API returned status code {response.status_code}")
-                        
-                except Exception as api_error:
-                    print(f"WHOIS API fallback failed: {api_error}")
-                    
-                    # If all methods fail, generate some plausible mock data
-                    # This ensures the UI always has something to display
-                    current_year = time.strftime("%Y")
-                    expiry_year = str(int(current_year) + random.randint(1, 10))
+                if response.status_code == 200:
+                    api_data = response.json()
                     
+                    # Map API response to our format
                     serializable_whois = {
                         "domain_name": domain,
-                        "registrar": "Example Registrar, Inc.",
-                        "creation_date": f"{int(current_year) - random.randint(1, 20)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
-                        "expiration_date": f"{expiry_year}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
-                        "name_servers": [f"ns1.example-{domain}", f"ns2.example-{domain}"],
-                        "status": "clientTransferProhibited",
-                        "emails": ["admin@" + domain],
-                        "source": "Generated Mock Data (Demo)",
-                        "note": "This is generated mock data. All WHOIS lookup methods failed. For real data, configure API keys."
+                        "registrar": api_data.get("registrar", {}).get("name") if isinstance(api_data.get("registrar"), dict) else api_data.get("registrar"),
+                        "creation_date": api_data.get("date_created"),
+                        "expiration_date": api_data.get("date_expires"),
+                        "name_servers": api_data.get("nameservers", []),
+                        "status": api_data.get("status"),
+                        "emails": api_data.get("emails", []),
+                        "dnssec": api_data.get("dnssec"),
+                        "source": "whoapi.com (demo)"
                     }
-        
-        return jsonify({
-            "domain": domain,
-            "whois_data": serializable_whois
-        })
-    
-    except Exception as e:
-        print(f"WHOIS error for {domain}: {str(e)}")
-        return jsonify({
-            "domain": domain,
-            "whois_data": {"error": str(e)},
-            "message": "WHOIS lookup encountered an error. This might be due to rate limiting or network issues."
-        }), 200  # Return 200 to allow frontend to display partial results
-
-def extract_from_raw_whois(raw_text, field_name, multiple=False):
-    """Extract field values from raw WHOIS output"""
-    lines = raw_text.split('\n')
-    results = []
-    
-    for line in lines:
-        if field_name in line:
-            try:
-                value = line.split(field_name, 1)[1].strip()
-                if multiple:
-                    results.append(value)
+                    
+                    # For demo API, we might get a status code instead of actual data
+                    if isinstance(api_data.get("status"), int):
+                        serializable_whois["status"] = str(api_data.get("status"))
+                        
+                    # Add a note about using demo API
+                    serializable_whois["note"] = "Using demo API key - limited data available. For full results, configure with your own API keys."
+                    WHOIS_SOURCES.inc('whoapi', 'success')
                 else:
-                    return value
-            except IndexError:
-                continue
+                    raise Exception(f"API returned status code {response.status_code}")
+                    
+            except Exception as api_error:
+                WHOIS_SOURCES.inc('whoapi', 'failure')
+                logger.warning("Every WHOIS source failed for %s; last error: %s", domain, api_error)
+                
+                # If all methods fail, generate some plausible mock data
+                # This ensures the UI always has something to display
+                rng = random.Random(domain)
+                current_year = time.strftime("%Y")
+                expiry_year = str(int(current_year) + rng.randint(1, 10))
+                
+                serializable_whois = {
+                    "domain_name": domain,
+                    "registrar": "Example Registrar, Inc.",
+                    "creation_date": f"{int(current_year) - rng.randint(1, 20)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                    "expiration_date": f"{expiry_year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                    "name_servers": [f"ns1.example-{domain}", f"ns2.example-{domain}"],
+                    "status": "clientTransferProhibited",
+                    "emails": ["admin@" + domain],
+                    "source": "Generated Mock Data (Demo)",
+                    "note": "This is generated mock data. All WHOIS lookup methods failed. For real data, configure API keys."
+                }
+                WHOIS_SOURCES.inc('mock', 'success')
     
-    return results if multiple else None
+    return serializable_whois
 
 @bp.route('/dns', methods=['POST'])
 def domain_dns():
@@ -203,70 +235,80 @@ def domain_dns():
         return jsonify({"error": "Domain is required"}), 400
     
     domain = data['domain']
-    record_types = data.get('record_types', ['A', 'AAAA', 'MX', 'NS', 'TXT', 'SOA', 'CNAME'])
+    record_types = data.get('record_types', DEFAULT_RECORD_TYPES)
     
     try:
-        results = {}
-        
-        # Configure DNS resolver with increased timeout
-        resolver = dns.resolver.Resolver()
-        resolver.timeout = 5.0  # 5 seconds timeout
-        resolver.lifetime = 10.0  # 10 seconds total per resolution
-        
-        # Special handling for TXT records which often take longer
-        txt_resolver = dns.resolver.Resolver()
-        txt_resolver.timeout = 8.0  # 8 seconds timeout for TXT records
-        txt_resolver.lifetime = 15.0  # 15 seconds total for TXT records
-        
-        for record_type in record_types:
-            try:
-                # Use the special resolver for TXT records
-                if record_type == 'TXT':
-                    answers = txt_resolver.resolve(domain, record_type)
-                else:
-                    answers = resolver.resolve(domain, record_type)
-                    
-                # For TXT records, we need to join the strings and decode
-                if record_type == 'TXT':
-                    results[record_type] = [b''.join(rdata.strings).decode('utf-8', errors='replace') for rdata in answers]
-                else:
-                    results[record_type] = [str(rdata) for rdata in answers]
-                    
-            except dns.resolver.NoAnswer:
-                results[record_type] = []
-            except dns.resolver.NXDOMAIN:
-                results[record_type] = ["Domain does not exist"]
-            except dns.exception.Timeout:
-                results[record_type] = ["DNS lookup timed out"]
-            except Exception as e:
-                print(f"DNS error for {domain} ({record_type}): {str(e)}")
-                results[record_type] = [f"Error: {str(e)}"]
-        
-        # If TXT records failed but we have other records, try an alternative approach for TXT
-        if "TXT" in record_types and (not results.get("TXT") or results.get("TXT") and "timed out" in results.get("TXT")[0]):
-            try:
-                # Try using dig command as a fallback for TXT records
-                import subprocess
-                result = subprocess.run(['dig', '+short', 'TXT', domain], capture_output=True, text=True, timeout=10)
-                txt_output = result.stdout.strip()
-                
-                if txt_output:
-                    # Parse the output into a list of TXT records
-                    txt_records = [line.strip(' "') for line in txt_output.split('\n') if line.strip()]
-                    if txt_records:
-                        results["TXT"] = txt_records
-            except Exception as dig_error:
-                print(f"Dig fallback for TXT records failed: {dig_error}")
-        
-        return jsonify({
-            "domain": domain,
-            "dns_records": results
-        })
+        return jsonify(lookup_dns(domain, record_types))
     
     except Exception as e:
-        print(f"DNS general error for {domain}: {str(e)}")
+        logger.warning("DNS error for %s: %s", domain, e)
         return jsonify({"error": str(e)}), 500
 
+def lookup_dns(domain, record_types):
+    """Look up DNS records for a domain, returning the response body"""
+    results = {}
+    
+    # Resolve all record types at once so the slowest query bounds the latency
+    for record_type, records, error in run_concurrently(
+        lambda record_type: lookup_dns_record(domain, record_type),
+        record_types,
+        deadline=DNS_DEADLINE
+    ):
+        # The only error left at this point is the overall deadline expiring
+        results[record_type] = records if error is None else ["DNS lookup timed out"]
+    
+    # Report record types in the order they were requested
+    results = {record_type: results[record_type] for record_type in record_types}
+    
+    return {
+        "domain": domain,
+        "dns_records": results
+    }
+
+def lookup_dns_record(domain, record_type):
+    """Look up one record type, reporting failures as messages in the record list"""
+    try:
+        return lookup_dns_answer(domain, record_type)["records"]
+    
+    except dns.exception.Timeout:
+        return ["DNS lookup timed out"]
+    except Exception as e:
+        logger.warning("DNS error for %s (%s): %s", domain, record_type, e)
+        return [f"Error: {str(e)}"]
+
+def lookup_dns_answer(domain, record_type):
+    """Look up one record type through the cache, returning its records and TTL (errors are raised)"""
+    return cached(
+        'dns',
+        f"{domain}:{record_type}",
+        lambda: resolve_record(domain, record_type),
+        ttl=lambda answer: answer["ttl"]
+    )
+
+def resolve_record(domain, record_type):
+    """Resolve one record type, returning its values and the TTL to cache them for"""
+    # Negative answers are cached too, but only briefly
+    try:
+        try:
+            answers = dns_resolver.resolve(domain, record_type)
+        except dns.exception.Timeout:
+            # UDP answers (large TXT sets especially) can get lost; retry once over TCP
+            answers = dns_resolver.resolve(domain, record_type, tcp=True, lifetime=dns_resolver.DNS_TIMEOUT)
+    except dns.resolver.NoAnswer:
+        return {"records": [], "ttl": CACHE_TTLS['dns_negative']}
+    except dns.resolver.NXDOMAIN:
+        return {"records": ["Domain does not exist"], "ttl": CACHE_TTLS['dns_negative']}
+    
+    # For TXT records, we need to join the strings and decode
+    if record_type == 'TXT':
+        records = [b''.join(rdata.strings).decode('utf-8', errors='replace') for rdata in answers]
+    else:
+        records = [str(rdata) for rdata in answers]
+    
+    # Cache for as long as the record itself says it is valid
+    ttl = answers.rrset.ttl if answers.rrset is not None else CACHE_TTLS['dns']
+    return {"records": records, "ttl": ttl}
+
 @bp.route('/headers', methods=['POST'])
 def domain_headers():
     """Get HTTP headers for a domain"""
@@ -282,35 +324,131 @@ def domain_headers():
         domain = 'https://' + domain
     
     try:
-        # Try HTTPS first
-        try:
-            # Use a browser-like User-Agent to avoid being blocked
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.head(domain, timeout=15, allow_redirects=True, headers=headers)
-        except requests.exceptions.RequestException:
-            # If HTTPS fails, try HTTP
-            if domain.startswith('https://'):
-                http_domain = 'http://' + domain[8:]
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                response = requests.head(http_domain, timeout=15, allow_redirects=True, headers=headers)
-            else:
-                raise
-        
-        # If we get here, one of the requests succeeded
-        return jsonify({
-            "domain": domain,
-            "status_code": response.status_code,
-            "headers": dict(response.headers)
-        })
+        return jsonify(lookup_headers(domain))
     
     except Exception as e:
-        print(f"Headers error for {domain}: {str(e)}")
+        logger.warning("Headers error for %s: %s", domain, e)
         return jsonify({
             "domain": domain,
             "error": str(e),
             "message": "Failed to retrieve HTTP headers. The domain might be unreachable or blocking requests."
-        }), 200  # Return 200 to allow frontend to display partial results 
\ No newline at end of file
+        }), 200  # Return 200 to allow frontend to display partial results
+
+def lookup_headers(domain):
+    """Fetch HTTP headers for a domain, returning the response body"""
+    # Ensure domain has http/https prefix
+    if not domain.startswith(('http://', 'https://')):
+        domain = 'https://' + domain
+    
+    # Query HTTPS and HTTP at the same time so a failing HTTPS costs no extra
+    # round trip; HTTPS is still preferred whenever it answers
+    urls = [domain]
+    if domain.startswith('https://'):
+        urls.append('http://' + domain[8:])
+    
+    executor = ThreadPoolExecutor(max_workers=len(urls))
+    try:
+        probes = [
+            executor.submit(http_client.probe, url, timeout=HEADERS_TIMEOUT, allow_redirects=True, retries=False,
+                            target=True)
+            for url in urls
+        ]
+        https, http = probes[0], probes[-1]
+        
+        wait(probes, return_when=FIRST_COMPLETED)
+        if https.done():
+            if https.exception() is not None:
+                wait(probes)
+        elif http.exception() is None:
+            # HTTP answered first: a black-holed HTTPS port must not hold it for a full timeout
+            wait([https], timeout=HEADERS_HTTPS_GRACE)
+        else:
+            wait([https])
+        
+        for probe in probes:
+            if probe.done() and probe.exception() is None:
+                response = probe.result()
+                return {
+                    "domain": domain,
+                    "status_code": response.status_code,
+                    "headers": dict(response.headers)
+                }
+    finally:
+        executor.shutdown(wait=False)
+    
+    # Every scheme failed; report the HTTPS error
+    raise https.exception()
+
+@bp.route('/subdomains', methods=['POST'])
+def domain_subdomains():
+    """Brute-force subdomains from a wordlist, streaming NDJSON lines as names are found"""
+    data = request.get_json()
+    
+    if not data or 'domain' not in data:
+        return jsonify({"error": "Domain is required"}), 400
+    
+    try:
+        labels = load_wordlist(data.get('wordlist'))
+        enumerator = SubdomainEnumerator(data['domain'], labels)
+    except (ValueError, dns.exception.DNSException) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    def generate():
+        for result in enumerator:
+            yield json.dumps(result) + "\n"
+        
+        # Last line: query counts, wildcard answers and throughput
+        yield json.dumps({"summary": enumerator.summary()}) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+# Per-target lookups shared by the batch and profile endpoints
+TARGET_LOOKUPS = {
+    "whois": lookup_whois,
+    "dns": lambda domain: lookup_dns(domain, DEFAULT_RECORD_TYPES),
+    "headers": lookup_headers,
+}
+
+@bp.route('/batch', methods=['POST'])
+def domain_batch():
+    """Run domain lookups for many domains, streaming NDJSON results as each finishes"""
+    try:
+        targets, selected, concurrency = parse_batch_request(request.get_json(), TARGET_LOOKUPS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return stream_batch(targets, TARGET_LOOKUPS, selected, concurrency)
+
+@bp.route('/profile', methods=['POST'])
+def domain_profile():
+    """Run WHOIS, DNS and headers lookups for one domain concurrently under a shared deadline"""
+    data = request.get_json()
+    
+    if not data or 'domain' not in data:
+        return jsonify({"error": "Domain is required"}), 400
+    
+    # The DNS section honours the same record_types option as /dns
+    record_types = data.get('record_types', DEFAULT_RECORD_TYPES)
+    sections = dict(TARGET_LOOKUPS, dns=lambda domain: lookup_dns(domain, record_types))
+    
+    return profile_response('domain', data['domain'], sections, stream=bool(data.get('stream')))
+
+@bp.route('/stream', methods=['GET'])
+def domain_stream():
+    """Stream WHOIS, each DNS record type and headers as Server-Sent Events as they arrive"""
+    domain = request.args.get('domain')
+    
+    if not domain:
+        return jsonify({"error": "Domain is required"}), 400
+    
+    record_types = request.args.get('record_types')
+    record_types = record_types.split(',') if record_types else DEFAULT_RECORD_TYPES
+    
+    tasks = {
+        "whois": lambda: lookup_whois(domain),
+        "headers": lambda: lookup_headers(domain),
+    }
+    for record_type in record_types:
+        tasks[f"dns:{record_type}"] = partial(lookup_dns_record, domain, record_type)
+    
+    return stream_events(tasks) 
\ No newline at end of file
@@ -1,13 +1,31 @@
 from flask import Blueprint, request, jsonify
-import dns.resolver
 import re
 import os
 import requests
 import random
+from functools import partial
 from datetime import datetime, timedelta
+import hashlib
+import logging
+from services import dns_resolver, http_client, upstream
+from services.batch import parse_batch_request, stream_batch
+from services.breach_index import get_breach_index, normalise_email
+from services.cache import cached
+from services.profile import profile_response
+from services.sse import stream_events
 
 bp = Blueprint('email', __name__, url_prefix='/api/email')
 
+logger = logging.getLogger(__name__)
+
+# HaveIBeenPwned API, used when an address is not in the local breach index
+# (the placeholder key from .env.example counts as no key)
+HIBP_API_KEY = os.environ.get('HIBP_API_KEY', '')
+if HIBP_API_KEY.startswith('your_'):
+    HIBP_API_KEY = ''
+HIBP_API_URL = os.environ.get('HIBP_API_URL', 'https://haveibeenpwned.com/api/v3').rstrip('/')
+http_client.register_host(HIBP_API_URL, 'haveibeenpwned.com')
+
 # Mock data for HaveIBeenPwned API
 MOCK_BREACH_DATA = [
     {
@@ -55,6 +73,10 @@ def validate_email():
     
     email = data['email']
     
+    return jsonify(validate_email_address(email))
+
+def validate_email_address(email):
+    """Check an email address format and its domain's MX records, returning the response body"""
     # Basic format validation
     email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     format_valid = bool(re.match(email_regex, email))
@@ -66,57 +88,115 @@ def validate_email():
         
         try:
             # Check MX records
-            mx_records_result = dns.resolver.resolve(domain, 'MX')
+            mx_records_result = dns_resolver.resolve(domain, 'MX')
             mx_records = [str(mx.exchange) for mx in mx_records_result]
         except Exception:
             # If MX lookup fails, domain might not accept emails
             mx_records = []
     
-    return jsonify({
+    return {
         "email": email,
         "format_valid": format_valid,
         "domain": domain if format_valid else None,
         "has_mx_records": len(mx_records) > 0 if format_valid else False,
         "mx_records": mx_records if format_valid else []
-    })
+    }
 
 @bp.route('/haveibeenpwned', methods=['POST'])
 def check_haveibeenpwned():
-    """Check if email has been in data breaches (uses mock data with placeholder API key)"""
+    """Check if email has been in data breaches (local index, then HaveIBeenPwned; mock data when neither is configured)"""
     data = request.get_json()
     
     if not data or 'email' not in data:
         return jsonify({"error": "Email is required"}), 400
     
     email = data['email']
+    result = lookup_breaches(email)
+    
+    if "error" in result:
+        return jsonify(result), 503
+    
+    return jsonify(result)
+
+def lookup_breaches(email):
+    """Look up data breaches for an email address, returning the response body"""
+    # The local index answers without the network; HIBP only fills in
+    # addresses it does not know about
+    index = get_breach_index()
+    if index is not None:
+        breaches = index.lookup(email)
+        if breaches or not HIBP_API_KEY:
+            return {
+                "email": email,
+                "breached": bool(breaches),
+                "breaches": breaches,
+                "source": "Local breach index"
+            }
     
-    # Note: This is using mock data since the actual HaveIBeenPwned API requires a paid API key
-    # In a real implementation, you would use:
-    # HIBP_API_KEY = os.environ.get('HIBP_API_KEY')
+    if HIBP_API_KEY:
+        try:
+            # Keyed by a hash so the shared cache never stores addresses
+            key = hashlib.sha256(normalise_email(email).encode()).hexdigest()
+            breaches = cached('hibp', key, lambda: fetch_hibp_breaches(email))
+            return {
+                "email": email,
+                "breached": bool(breaches),
+                "breaches": breaches,
+                "source": "HaveIBeenPwned"
+            }
+        except (requests.RequestException, upstream.UpstreamUnavailable, ValueError) as e:
+            logger.warning("HaveIBeenPwned lookup failed: %s", e)
+            if index is not None:
+                return {
+                    "email": email,
+                    "breached": False,
+                    "breaches": [],
+                    "source": "Local breach index",
+                    "note": "Not in the local index; HaveIBeenPwned could not be reached."
+                }
+            # A configured key means real answers are expected; never pass mock data off as one
+            return {"email": email, "error": "HaveIBeenPwned unavailable"}
     
+    return mock_breaches(email)
+
+def fetch_hibp_breaches(email):
+    """Fetch the full breach list for an address from the HaveIBeenPwned API (404 means none)"""
+    response = http_client.get(
+        f"{HIBP_API_URL}/breachedaccount/{requests.utils.quote(normalise_email(email), safe='')}",
+        params={"truncateResponse": "false"},
+        headers={"hibp-api-key": HIBP_API_KEY}
+    )
+    if response.status_code == 404:
+        return []
+    response.raise_for_status()
+    return response.json()
+
+def mock_breaches(email):
+    """Deterministic mock breach data, used when no index or API key is configured"""
     # Deterministically decide if this email has been breached based on its characters
     # This makes the mock data consistent for the same email
     email_sum = sum(ord(c) for c in email)
     has_been_pwned = email_sum % 3 != 0  # 2/3 chance of being pwned
     
     if not has_been_pwned:
-        return jsonify({
+        return {
             "email": email,
             "breached": False,
             "breaches": [],
-            "note": "Using mock data for demonstration purposes. For real data, configure a HaveIBeenPwned API key."
-        })
+            "note": "Using mock data for demonstration purposes. For real data, build a breach index or configure a HaveIBeenPwned API key."
+        }
     
     # Select a random number of breaches for this email
+    # (seeded per email so the same address always gets the same breaches)
     num_breaches = min(len(MOCK_BREACH_DATA), 1 + (email_sum % 3))
-    selected_breaches = random.sample(MOCK_BREACH_DATA, num_breaches)
+    selected_breaches = random.Random(email_sum).sample(MOCK_BREACH_DATA, num_breaches)
     
-    return jsonify({
+    return {
         "email": email,
         "breached": True,
         "breaches": selected_breaches,
-        "note": "Using mock data for demonstration purposes. For real data, configure a HaveIBeenPwned API key."
-    })
+        "note": "Using mock data for demonstration purposes. For real data, build a breach index or configure a HaveIBeenPwned API key."
+    }
 
 @bp.route('/domain-emails', methods=['POST'])
 def find_domain_emails():
@@ -128,13 +208,17 @@ def find_domain_emails():
     
     domain = data['domain']
     
+    return jsonify(generate_domain_emails(domain))
+
+def generate_domain_emails(domain):
+    """Generate deterministic mock email addresses for a domain, returning the response body"""
     # Generate realistic mock data for demonstration purposes
     common_names = ["john", "jane", "david", "sarah", "michael", "emma", "robert", "olivia", "william", "sophia"]
     common_positions = ["info", "contact", "support", "sales", "admin", "help", "marketing", "hr", "careers", "press"]
     
     # Generate a deterministic but seemingly random set of emails for this domain
     domain_hash = sum(ord(c) for c in domain)
-    random.seed(domain_hash)  # Make results consistent for the same domain
+    rng = random.Random(domain_hash)  # Make results consistent for the same domain
     
     num_emails = 5 + (domain_hash % 10)  # Between 5-14 emails
     mock_emails = []
@@ -151,28 +235,65 @@ def find_domain_emails():
     
     # Add name-based emails
     remaining = num_emails - num_positions
-    names_sample = random.sample(common_names, remaining)
+    names_sample = rng.sample(common_names, remaining)
     
     for name in names_sample:
         # Mix up email formats
-        format_type = random.randint(0, 3)
+        format_type = rng.randint(0, 3)
         if format_type == 0:
             email = f"{name}@{domain}"
         elif format_type == 1:
             email = f"{name[0]}@{domain}"
         elif format_type == 2:
-            email = f"{name}.{random.choice(common_names)}@{domain}"
+            email = f"{name}.{rng.choice(common_names)}@{domain}"
         else:
-            email = f"{name}_{random.randint(1, 99)}@{domain}"
+            email = f"{name}_{rng.randint(1, 99)}@{domain}"
             
         mock_emails.append({
             "email": email,
             "source": "Name pattern analysis",
-            "confidence": ["Low", "Medium", "High"][random.randint(0, 2)]
+            "confidence": ["Low", "Medium", "High"][rng.randint(0, 2)]
         })
     
-    return jsonify({
+    return {
         "domain": domain,
         "emails": mock_emails,
         "note": "Using mock data for demonstration purposes. In a production environment, you would integrate with services like TheHarvester or Hunter.io"
-    }) 
\ No newline at end of file
+    }
+
+# Per-target lookups shared by the batch and profile endpoints
+TARGET_LOOKUPS = {
+    "validate": validate_email_address,
+    "haveibeenpwned": lookup_breaches,
+    "domain-emails": lambda email: generate_domain_emails(email.split('@')[-1]),
+}
+
+@bp.route('/batch', methods=['POST'])
+def email_batch():
+    """Run email lookups for many addresses, streaming NDJSON results as each finishes"""
+    try:
+        targets, selected, concurrency = parse_batch_request(request.get_json(), TARGET_LOOKUPS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return stream_batch(targets, TARGET_LOOKUPS, selected, concurrency)
+
+@bp.route('/profile', methods=['POST'])
+def email_profile():
+    """Run every email lookup for one address concurrently under a shared deadline"""
+    data = request.get_json()
+    
+    if not data or 'email' not in data:
+        return jsonify({"error": "Email is required"}), 400
+    
+    return profile_response('email', data['email'], TARGET_LOOKUPS, stream=bool(data.get('stream')))
+
+@bp.route('/stream', methods=['GET'])
+def email_stream():
+    """Stream each email lookup as a Server-Sent Event as soon as it completes"""
+    email = request.args.get('email')
+    
+    if not email:
+        return jsonify({"error": "Email is required"}), 400
+    
+    return stream_events({name: partial(lookup, email) for name, lookup in TARGET_LOOKUPS.items()}) 
\ No newline at end of file
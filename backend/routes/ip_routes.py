@@ -1,14 +1,27 @@
 from flask import Blueprint, request, jsonify
-import requests
+import ipaddress
 import os
 import json
 from ipwhois import IPWhois
-import socket
-import re
+import dns.resolver
+import dns.reversename
+from ipwhois.exceptions import IPDefinedError
 import random
+from functools import partial
+from services import dns_resolver, geo_local, upstream
+from services.batch import parse_batch_request, stream_batch
+from services.cache import cached, is_cached, store
+from services.concurrency import coalesce
+from services.ipapi import geo_batcher
+from services.metrics import CACHE_REQUESTS
+from services.prefix_cache import get_prefix_cache
+from services.profile import profile_response
+from services.sse import stream_events
 
 bp = Blueprint('ip', __name__, url_prefix='/api/ip')
 
+GEO_SOURCES = ('remote', 'local', 'auto')
+
 # Common ports and services for mock data
 COMMON_PORTS = {
     21: {"service": "FTP", "product": "vsftpd", "version": "3.0.3"},
@@ -41,24 +54,77 @@ def ip_geolocation():
     
     ip = data['ip']
     
-    # Validate IP format
-    ip_regex = r'^(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})$'
-    if not re.match(ip_regex, ip):
-        return jsonify({"error": "Invalid IP address format"}), 400
+    # Optional override of the configured backend: "remote", "local" or "auto"
+    source = data.get('source')
     
     try:
-        # Using ip-api.com (free, no API key required)
-        response = requests.get(f"http://ip-api.com/json/{ip}", timeout=10)
-        geo_data = response.json()
-        
         return jsonify({
             "ip": ip,
-            "geolocation": geo_data
+            "geolocation": lookup_geolocation(ip, source)
         })
     
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def parse_ip(ip):
+    """Return ip in canonical form, raising ValueError unless it is an IPv4 or IPv6 address"""
+    if not isinstance(ip, str):
+        raise ValueError("Invalid IP address format")
+    try:
+        return str(ipaddress.ip_address(ip.strip()))
+    except ValueError:
+        raise ValueError("Invalid IP address format") from None
+
+def lookup_geolocation(ip, source=None):
+    """Look up geolocation data for an IP address"""
+    ip = parse_ip(ip)
+    
+    source = source or geo_local.GEO_BACKEND
+    if source not in GEO_SOURCES:
+        raise ValueError(f"Invalid geolocation source. Use one of: {', '.join(GEO_SOURCES)}")
+    
+    # Try the local database first; only go to the network on a miss
+    if source in ('local', 'auto'):
+        location = geo_local.lookup(ip)
+        if location is not None:
+            return location
+        
+        if source == 'local':
+            return {
+                "status": "fail",
+                "message": "not found in local database",
+                "query": ip,
+                "source": "local"
+            }
+    
+    # Using ip-api.com (free, no API key required); concurrent lookups share batch calls
+    return cached('geolocation', ip, lambda: geo_batcher.lookup(ip))
+
+def prefetch_geolocation(ips):
+    """Queue every uncached IP of a bulk request so they go out in as few batch calls as possible"""
+    for ip in ips:
+        # Invalid targets fail on their own in the per-target lookup
+        try:
+            ip = parse_ip(ip)
+        except ValueError:
+            continue
+        if is_cached('geolocation', ip):
+            continue
+        
+        # Addresses answered by the local database never reach the batcher
+        if geo_local.GEO_BACKEND == 'local' or (geo_local.GEO_BACKEND == 'auto' and geo_local.lookup(ip)):
+            continue
+        
+        geo_batcher.submit(ip).add_done_callback(partial(store_prefetched_geolocation, ip))
+
+def store_prefetched_geolocation(ip, future):
+    """Cache a prefetched result so the per-target lookup does not fetch it again"""
+    if future.exception() is None:
+        store('geolocation', ip, future.result())
+
 @bp.route('/whois', methods=['POST'])
 def ip_whois():
     """Get WHOIS information for an IP address"""
@@ -70,18 +136,50 @@ def ip_whois():
     ip = data['ip']
     
     try:
-        # Get WHOIS information
-        obj = IPWhois(ip)
-        whois_data = obj.lookup_rdap()
-        
         return jsonify({
             "ip": ip,
-            "whois_data": whois_data
+            "whois_data": lookup_ip_whois(ip)
         })
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def lookup_ip_whois(ip):
+    """Look up RDAP information for an IP address"""
+    # Any address inside an already-seen allocation is answered from the prefix cache
+    prefixes = get_prefix_cache()
+    whois_data = prefixes.lookup(ip)
+    if whois_data is not None:
+        CACHE_REQUESTS.inc('rdap_prefix', 'hit')
+        return dict(whois_data, query=ip)
+    CACHE_REQUESTS.inc('rdap_prefix', 'miss')
+    
+    return coalesce(f"rdap:{ip}", lambda: fetch_ip_whois(ip))
+
+def fetch_ip_whois(ip):
+    """Query RDAP for an IP address and cache the result for its whole network"""
+    prefixes = get_prefix_cache()
+    
+    # A concurrent request may have cached this network while we waited
+    whois_data = prefixes.lookup(ip)
+    if whois_data is not None:
+        return dict(whois_data, query=ip)
+    
+    # Get WHOIS information
+    # Private and reserved addresses are rejected locally, not by an upstream
+    with upstream.guard('ipwhois', ignore=(IPDefinedError, ValueError)):
+        whois_data = IPWhois(ip).lookup_rdap()
+    prefixes.insert(rdap_networks(whois_data, ip), whois_data)
+    return whois_data
+
+def rdap_networks(whois_data, ip):
+    """Return the CIDRs an RDAP result covers, falling back to the single address"""
+    network = whois_data.get('network') or {}
+    cidrs = network.get('cidr') or whois_data.get('asn_cidr')
+    if cidrs and cidrs != 'NA':
+        return [cidr.strip() for cidr in cidrs.split(',') if cidr.strip()]
+    return [ip]
+
 @bp.route('/reverse-dns', methods=['POST'])
 def reverse_dns():
     """Get reverse DNS information for an IP address"""
@@ -93,23 +191,34 @@ def reverse_dns():
     ip = data['ip']
     
     try:
-        # Get reverse DNS
-        hostname = socket.gethostbyaddr(ip)[0]
-        
-        return jsonify({
-            "ip": ip,
-            "hostname": hostname
-        })
+        hostname = lookup_reverse_dns(ip)
     
-    except socket.herror:
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    
+    if hostname is None:
         return jsonify({
             "ip": ip,
             "hostname": None,
             "message": "No hostname found for this IP address"
         })
     
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return jsonify({
+        "ip": ip,
+        "hostname": hostname
+    })
+
+def lookup_reverse_dns(ip):
+    """Look up the hostname for an IP address, or None if it has no PTR record"""
+    def fetch():
+        try:
+            # Get reverse DNS through the shared resolver
+            answers = dns_resolver.resolve(dns.reversename.from_address(ip), 'PTR')
+            return str(answers[0]).rstrip('.')
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return None
+    
+    return cached('reverse_dns', ip, fetch)
 
 @bp.route('/shodan', methods=['POST'])
 def shodan_search():
@@ -121,19 +230,24 @@ def shodan_search():
     
     ip = data['ip']
     
+    return jsonify(generate_shodan_data(ip))
+
+def generate_shodan_data(ip):
+    """Generate deterministic mock Shodan data for an IP address"""
     # Note: This is using mock data since the actual Shodan API requires an API key
     # In a real implementation, you would use:
     # SHODAN_API_KEY = os.environ.get('SHODAN_API_KEY')
     
     # Generate deterministic but seemingly random data based on the IP
     # This ensures consistent results for the same IP
+    # A per-call generator keeps concurrent requests from disturbing each other's sequence
     ip_seed = sum(int(octet) for octet in ip.split('.'))
-    random.seed(ip_seed)
+    rng = random.Random(ip_seed)
     
     # Select a random number of open ports
-    num_ports = random.randint(2, 8)
+    num_ports = rng.randint(2, 8)
     port_keys = list(COMMON_PORTS.keys())
-    random.shuffle(port_keys)
+    rng.shuffle(port_keys)
     selected_ports = port_keys[:num_ports]
     
     # Generate mock port data
@@ -141,10 +255,10 @@ def shodan_search():
     for port in selected_ports:
         port_info = COMMON_PORTS[port].copy()
         # Add some randomness to versions
-        if random.random() < 0.3:  # 30% chance of a different version
+        if rng.random() < 0.3:  # 30% chance of a different version
             version_parts = port_info["version"].split('.')
             if len(version_parts) > 2:
-                version_parts[-1] = str(random.randint(0, 20))
+                version_parts[-1] = str(rng.randint(0, 20))
                 port_info["version"] = '.'.join(version_parts)
         
         ports_data.append({
@@ -156,17 +270,17 @@ def shodan_search():
         })
     
     # Select a random OS
-    os = random.choice(COMMON_OS)
+    os = rng.choice(COMMON_OS)
     
     # Generate mock Shodan data
     mock_shodan_data = {
         "ip": ip,
         "ports": [p["port"] for p in ports_data],
-        "hostnames": [f"host-{ip.replace('.', '-')}.example.com"] if random.random() < 0.7 else [],
+        "hostnames": [f"host-{ip.replace('.', '-')}.example.com"] if rng.random() < 0.7 else [],
         "country": "United States",
         "city": "New York",
-        "org": f"Example Organization {random.randint(1, 100)}",
-        "isp": f"Example ISP {random.randint(1, 20)}",
+        "org": f"Example Organization {rng.randint(1, 100)}",
+        "isp": f"Example ISP {rng.randint(1, 20)}",
         "os": os,
         "services": ports_data,
         "last_update": "2023-01-01T00:00:00.000Z",
@@ -174,20 +288,61 @@ def shodan_search():
     }
     
     # Add some vulnerabilities with 40% probability
-    if random.random() < 0.4:
-        num_vulns = random.randint(1, 3)
+    if rng.random() < 0.4:
+        num_vulns = rng.randint(1, 3)
         cve_years = [2021, 2022, 2023]
         for _ in range(num_vulns):
-            year = random.choice(cve_years)
-            cve_id = f"CVE-{year}-{random.randint(1000, 9999)}"
+            year = rng.choice(cve_years)
+            cve_id = f"CVE-{year}-{rng.randint(1000, 9999)}"
             mock_shodan_data["vulns"].append({
                 "id": cve_id,
-                "severity": random.choice(["Low", "Medium", "High", "Critical"]),
-                "summary": f"Example vulnerability affecting {random.choice([p['product'] for p in ports_data])}"
+                "severity": rng.choice(["Low", "Medium", "High", "Critical"]),
+                "summary": f"Example vulnerability affecting {rng.choice([p['product'] for p in ports_data])}"
             })
     
-    return jsonify({
+    return {
         "ip": ip,
         "shodan_data": mock_shodan_data,
         "note": "Using mock data for demonstration purposes. For real data, configure a Shodan API key."
-    }) 
\ No newline at end of file
+    }
+
+# Per-target lookups shared by the batch and profile endpoints
+TARGET_LOOKUPS = {
+    "geolocation": lambda ip: {"ip": ip, "geolocation": lookup_geolocation(ip)},
+    "whois": lambda ip: {"ip": ip, "whois_data": lookup_ip_whois(ip)},
+    "reverse-dns": lambda ip: {"ip": ip, "hostname": lookup_reverse_dns(ip)},
+    "shodan": generate_shodan_data,
+}
+
+@bp.route('/batch', methods=['POST'])
+def ip_batch():
+    """Run IP lookups for many addresses, streaming NDJSON results as each finishes"""
+    try:
+        targets, selected, concurrency = parse_batch_request(request.get_json(), TARGET_LOOKUPS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if "geolocation" in selected:
+        prefetch_geolocation(targets)
+    
+    return stream_batch(targets, TARGET_LOOKUPS, selected, concurrency)
+
+@bp.route('/profile', methods=['POST'])
+def ip_profile():
+    """Run every IP lookup for one address concurrently under a shared deadline"""
+    data = request.get_json()
+    
+    if not data or 'ip' not in data:
+        return jsonify({"error": "IP address is required"}), 400
+    
+    return profile_response('ip', data['ip'], TARGET_LOOKUPS, stream=bool(data.get('stream')))
+
+@bp.route('/stream', methods=['GET'])
+def ip_stream():
+    """Stream each IP lookup as a Server-Sent Event as soon as it completes"""
+    ip = request.args.get('ip')
+    
+    if not ip:
+        return jsonify({"error": "IP address is required"}), 400
+    
+    return stream_events({name: partial(lookup, ip) for name, lookup in TARGET_LOOKUPS.items()}) 
\ No newline at end of file
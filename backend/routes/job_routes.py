@@ -0,0 +1,139 @@
+from flask import Blueprint, request, jsonify, Response
+import os
+import time
+from routes import domain_routes, email_routes, username_routes, ip_routes
+from services.batch import parse_batch_request
+from services.jobs import (
+    get_job_store, job_summary, job_types, register_job_type, submit_job, FINISHED_STATUSES
+)
+from services.sse import sse_event
+
+bp = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+# How often a job stream checks the store for new results
+JOBS_STREAM_INTERVAL = float(os.environ.get('JOBS_STREAM_INTERVAL', 0.5))
+
+# Job types run the same per-target lookups as the batch endpoints
+register_job_type('domain', domain_routes.TARGET_LOOKUPS)
+register_job_type('email', email_routes.TARGET_LOOKUPS)
+register_job_type('username', username_routes.TARGET_LOOKUPS)
+register_job_type('ip', ip_routes.TARGET_LOOKUPS)
+
+@bp.route('', methods=['POST'])
+def create_job():
+    """Queue lookups for a set of targets and return the job ID straight away"""
+    data = request.get_json()
+    
+    job_type = data.get('type') if data else None
+    if job_type not in job_types():
+        return jsonify({"error": f"Job type must be one of: {', '.join(job_types())}"}), 400
+    
+    try:
+        targets, selected, concurrency = parse_batch_request(data, job_types()[job_type])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if not all(isinstance(target, str) for target in targets):
+        return jsonify({"error": "Targets must be strings"}), 400
+    
+    job_id = submit_job(job_type, targets, selected, concurrency)
+    
+    response = jsonify(job_summary(get_job_store().get(job_id)))
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job_id}"
+    return response
+
+@bp.route('/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status and progress"""
+    job = get_job_store().get(job_id)
+    
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    return jsonify(job_summary(job))
+
+@bp.route('/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """Page through a job's results in the order they finished (pass the last seq as after)"""
+    store = get_job_store()
+    job = store.get(job_id)
+    
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    try:
+        after = int(request.args.get('after', -1))
+        limit = max(1, min(int(request.args.get('limit', 500)), 5000))
+    except ValueError:
+        return jsonify({"error": "after and limit must be integers"}), 400
+    
+    results = store.results(job_id, after, limit)
+    
+    return jsonify({
+        "job": job_summary(job),
+        "results": results,
+        "next_after": results[-1]["seq"] if results else after
+    })
+
+@bp.route('/<job_id>/stream', methods=['GET'])
+def stream_job(job_id):
+    """Stream a job's results and progress as Server-Sent Events until it finishes"""
+    store = get_job_store()
+    
+    if store.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    # Resume from the standard SSE header when the browser reconnects
+    try:
+        after = int(request.headers.get('Last-Event-ID', request.args.get('after', -1)))
+    except ValueError:
+        after = -1
+    
+    def generate():
+        nonlocal after
+        last_progress = None
+        while True:
+            # Read the status first so results stored just before it finished are not missed
+            job = store.get(job_id)
+            
+            while True:
+                results = store.results(job_id, after)
+                if not results:
+                    break
+                for result in results:
+                    after = result["seq"]
+                    yield f"id: {after}\n" + sse_event('result', result)
+            
+            summary = job_summary(job)
+            if summary["progress"] != last_progress:
+                last_progress = summary["progress"]
+                yield sse_event('progress', summary)
+            
+            if job["status"] in FINISHED_STATUSES:
+                yield sse_event('done', summary)
+                return
+            
+            time.sleep(JOBS_STREAM_INTERVAL)
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Stop reverse proxies from buffering the stream
+        }
+    )
+
+@bp.route('/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job; results stored so far are kept"""
+    store = get_job_store()
+    
+    if store.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    if not store.cancel(job_id):
+        return jsonify({"error": "Job has already finished"}), 409
+    
+    return jsonify(job_summary(store.get(job_id)))
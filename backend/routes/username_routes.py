@@ -1,57 +1,32 @@
 from flask import Blueprint, request, jsonify
-import requests
 import os
 import json
-import time
 import random
+from functools import partial
+from services.batch import parse_batch_request, stream_batch
+from services.concurrency import run_concurrently
+from services.profile import profile_response
+from services.site_catalog import load_catalog
+from services.sse import stream_events
 
 bp = Blueprint('username', __name__, url_prefix='/api/username')
 
-# List of popular sites to check for usernames
-# This is a small sample - a real implementation would have many more
-SITES = [
-    {"name": "GitHub", "url": "https://github.com/{username}", "error_type": "status_code"},
-    {"name": "Twitter", "url": "https://twitter.com/{username}", "error_type": "status_code"},
-    {"name": "Instagram", "url": "https://www.instagram.com/{username}", "error_type": "status_code"},
-    {"name": "Reddit", "url": "https://www.reddit.com/user/{username}", "error_type": "status_code"},
-    {"name": "Medium", "url": "https://medium.com/@{username}", "error_type": "status_code"},
-    {"name": "Pinterest", "url": "https://www.pinterest.com/{username}", "error_type": "status_code"},
-    {"name": "LinkedIn", "url": "https://www.linkedin.com/in/{username}", "error_type": "status_code"}
-]
+# Concurrency settings for the username search fan-out
+SEARCH_MAX_WORKERS = int(os.environ.get('USERNAME_SEARCH_WORKERS', 20))
+SEARCH_DEADLINE = float(os.environ.get('USERNAME_SEARCH_DEADLINE', 20))
+
+# Site catalog (data/sites.json), compiled once at startup
+SITES = load_catalog()
 
-# Extended list of sites for Sherlock mock data
-SHERLOCK_SITES = [
-    {"name": "GitHub", "url": "https://github.com/{username}"},
-    {"name": "Twitter", "url": "https://twitter.com/{username}"},
-    {"name": "Instagram", "url": "https://www.instagram.com/{username}"},
-    {"name": "Reddit", "url": "https://www.reddit.com/user/{username}"},
-    {"name": "Medium", "url": "https://medium.com/@{username}"},
-    {"name": "Pinterest", "url": "https://www.pinterest.com/{username}"},
-    {"name": "LinkedIn", "url": "https://www.linkedin.com/in/{username}"},
-    {"name": "Facebook", "url": "https://www.facebook.com/{username}"},
-    {"name": "TikTok", "url": "https://www.tiktok.com/@{username}"},
-    {"name": "YouTube", "url": "https://www.youtube.com/user/{username}"},
-    {"name": "Twitch", "url": "https://www.twitch.tv/{username}"},
-    {"name": "Snapchat", "url": "https://www.snapchat.com/add/{username}"},
-    {"name": "Spotify", "url": "https://open.spotify.com/user/{username}"},
-    {"name": "SoundCloud", "url": "https://soundcloud.com/{username}"},
-    {"name": "Steam", "url": "https://steamcommunity.com/id/{username}"},
-    {"name": "Patreon", "url": "https://www.patreon.com/{username}"},
-    {"name": "Behance", "url": "https://www.behance.net/{username}"},
-    {"name": "Flickr", "url": "https://www.flickr.com/people/{username}"},
-    {"name": "Vimeo", "url": "https://vimeo.com/{username}"},
-    {"name": "DeviantArt", "url": "https://{username}.deviantart.com"},
-    {"name": "Quora", "url": "https://www.quora.com/profile/{username}"},
-    {"name": "Tumblr", "url": "https://{username}.tumblr.com"},
-    {"name": "Dribbble", "url": "https://dribbble.com/{username}"},
-    {"name": "Gravatar", "url": "https://en.gravatar.com/{username}"},
-    {"name": "GitLab", "url": "https://gitlab.com/{username}"},
-    {"name": "Bitbucket", "url": "https://bitbucket.org/{username}"},
-    {"name": "HackerNews", "url": "https://news.ycombinator.com/user?id={username}"},
-    {"name": "ProductHunt", "url": "https://www.producthunt.com/@{username}"},
-    {"name": "Keybase", "url": "https://keybase.io/{username}"},
-    {"name": "SlideShare", "url": "https://www.slideshare.net/{username}"}
+# The Sherlock placeholder covers a fixed set of sites, so its mock results
+# do not change when sites are added to the catalog
+SHERLOCK_SITE_NAMES = [
+    "GitHub", "Twitter", "Instagram", "Reddit", "Medium", "Pinterest", "LinkedIn", "Facebook", "TikTok",
+    "YouTube", "Twitch", "Snapchat", "Spotify", "SoundCloud", "Steam", "Patreon", "Behance", "Flickr",
+    "Vimeo", "DeviantArt", "Quora", "Tumblr", "Dribbble", "Gravatar", "GitLab", "Bitbucket", "HackerNews",
+    "ProductHunt", "Keybase", "SlideShare"
 ]
+SHERLOCK_SITES = [site for name in SHERLOCK_SITE_NAMES for site in SITES if site.name == name]
 
 @bp.route('/search', methods=['POST'])
 def search_username():
@@ -65,48 +40,53 @@ def search_username():
     
     # Optional parameter to limit number of sites to check
     limit = data.get('limit', len(SITES))
-    sites_to_check = SITES[:limit]
     
-    results = []
+    return jsonify(lookup_username(username, limit))
+
+def lookup_username(username, limit=None):
+    """Check a username across the configured sites, returning the response body"""
+    sites_to_check = SITES[:limit]
     
-    for site in sites_to_check:
-        try:
-            url = site["url"].format(username=username)
-            
-            # Add a user agent to avoid some blocks
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            # Check if the profile exists based on status code
-            # Note: This is a simple check and might not work for all sites
-            # Some sites return 200 even if the profile doesn't exist
-            exists = response.status_code == 200
-            
-            results.append({
-                "site": site["name"],
-                "url": url,
-                "exists": exists,
-                "status_code": response.status_code
-            })
-            
-            # Add a small delay to avoid rate limiting
-            time.sleep(0.5)
-            
-        except Exception as e:
-            results.append({
-                "site": site["name"],
-                "url": url,
+    # Check all sites in parallel; wall-clock time is bounded by the slowest site
+    # (or the overall deadline), not by the sum across sites
+    results_by_site = {}
+    for site, result, error in run_concurrently(
+        lambda site: check_site(site, username),
+        sites_to_check,
+        max_workers=SEARCH_MAX_WORKERS,
+        deadline=SEARCH_DEADLINE
+    ):
+        if error is not None:
+            result = {
+                "site": site.name,
+                "url": site.url_for(username),
                 "exists": False,
-                "error": str(e)
-            })
+                "error": str(error)
+            }
+        results_by_site[site.name] = result
+    
+    # Keep the results in catalog order regardless of completion order
+    results = [results_by_site[site.name] for site in sites_to_check]
     
-    return jsonify({
+    return {
         "username": username,
         "results": results
-    })
+    }
+
+def check_site(site, username):
+    """Check whether a username exists on a single site"""
+    try:
+        # Detection rules come from the catalog entry; the shared client rate
+        # limits each host and sends a browser-like User-Agent
+        return site.check(username)
+        
+    except Exception as e:
+        return {
+            "site": site.name,
+            "url": site.url_for(username),
+            "exists": False,
+            "error": str(e)
+        }
 
 @bp.route('/sherlock', methods=['POST'])
 def sherlock_search():
@@ -118,45 +98,90 @@ def sherlock_search():
     
     username = data['username']
     
+    return jsonify(generate_sherlock_results(username))
+
+def generate_sherlock_results(username):
+    """Generate deterministic mock Sherlock results for a username, returning the response body"""
     # Note: This is using mock data since the actual Sherlock tool would need to be executed
     # In a real implementation, you would integrate with the Sherlock tool
     # https://github.com/sherlock-project/sherlock
     
     # Generate deterministic but seemingly random results based on the username
     # This ensures consistent results for the same username
+    # A per-call generator keeps concurrent requests from disturbing each other's sequence
     username_seed = sum(ord(c) for c in username)
-    random.seed(username_seed)
+    rng = random.Random(username_seed)
     
     # Determine how many sites the username exists on (between 20% and 60%)
     existence_probability = 0.2 + (username_seed % 100) / 250  # Between 0.2 and 0.6
     
     results = []
     for site in SHERLOCK_SITES:
-        url = site["url"].format(username=username)
+        url = site.url_for(username)
         
         # Deterministically decide if the username exists on this site
-        site_hash = sum(ord(c) for c in site["name"])
-        exists = random.random() < existence_probability
+        site_hash = sum(ord(c) for c in site.name)
+        exists = rng.random() < existence_probability
         
         # For some popular sites, make it more likely that common usernames exist
-        if site["name"] in ["GitHub", "Twitter", "Instagram", "Reddit"] and len(username) >= 4 and len(username) <= 10:
-            exists = exists or random.random() < 0.7
+        if site.name in ["GitHub", "Twitter", "Instagram", "Reddit"] and len(username) >= 4 and len(username) <= 10:
+            exists = exists or rng.random() < 0.7
         
         results.append({
-            "site": site["name"],
+            "site": site.name,
             "url": url,
             "exists": exists,
             "status_code": 200 if exists else 404,
-            "response_time": round(random.uniform(0.1, 2.5), 2)
+            "response_time": round(rng.uniform(0.1, 2.5), 2)
         })
     
     # Sort results by existence (found profiles first)
     results.sort(key=lambda x: (not x["exists"], x["site"]))
     
-    return jsonify({
+    return {
         "username": username,
         "found_on": sum(1 for r in results if r["exists"]),
         "total_sites": len(results),
         "results": results,
         "note": "Using mock data for demonstration purposes. In a production environment, you would execute the Sherlock tool and parse its results."
-    }) 
\ No newline at end of file
+    }
+
+# Per-target lookups shared by the batch and profile endpoints
+TARGET_LOOKUPS = {
+    "search": lookup_username,
+    "sherlock": generate_sherlock_results,
+}
+
+@bp.route('/batch', methods=['POST'])
+def username_batch():
+    """Run username lookups for many usernames, streaming NDJSON results as each finishes"""
+    try:
+        targets, selected, concurrency = parse_batch_request(request.get_json(), TARGET_LOOKUPS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return stream_batch(targets, TARGET_LOOKUPS, selected, concurrency)
+
+@bp.route('/profile', methods=['POST'])
+def username_profile():
+    """Run every username lookup concurrently under a shared deadline"""
+    data = request.get_json()
+    
+    if not data or 'username' not in data:
+        return jsonify({"error": "Username is required"}), 400
+    
+    return profile_response('username', data['username'], TARGET_LOOKUPS, stream=bool(data.get('stream')))
+
+@bp.route('/stream', methods=['GET'])
+def username_stream():
+    """Stream each site check and the Sherlock results as Server-Sent Events as they arrive"""
+    username = request.args.get('username')
+    
+    if not username:
+        return jsonify({"error": "Username is required"}), 400
+    
+    tasks = {"sherlock": lambda: generate_sherlock_results(username)}
+    for site in SITES:
+        tasks[f"site:{site.name}"] = partial(check_site, site, username)
+    
+    return stream_events(tasks, deadline=SEARCH_DEADLINE, max_workers=SEARCH_MAX_WORKERS) 
\ No newline at end of file
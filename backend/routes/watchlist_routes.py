@@ -0,0 +1,191 @@
+from flask import Blueprint, request, jsonify
+import ipaddress
+import os
+from datetime import datetime, timezone
+from routes import domain_routes, ip_routes
+from services.cache import CACHE_TTLS
+from services.concurrency import run_concurrently
+from services.watchlist import get_watch_scheduler, get_watch_store, register_watch_lookup, watch_lookups
+
+bp = Blueprint('watchlist', __name__, url_prefix='/api/watchlist')
+
+# Headers carry no TTL, so they are re-checked on a fixed interval
+WATCH_HEADERS_INTERVAL = float(os.environ.get('WATCH_HEADERS_INTERVAL', 3600))
+
+# Headers that differ on every response and would report a change on every check
+VOLATILE_HEADERS = {
+    'date', 'expires', 'age', 'set-cookie', 'etag', 'last-modified', 'x-request-id', 'x-amzn-requestid',
+    'x-amz-cf-id', 'cf-ray', 'x-served-by', 'x-cache', 'x-cache-hits', 'x-timer', 'report-to', 'nel',
+    'server-timing', 'content-length', 'keep-alive',
+}
+
+# WHOIS fields that say how the data was fetched rather than what it is: RDAP
+# and the WHOIS fallbacks fill them differently, so a source switch is not a change
+WHOIS_SOURCE_FIELDS = {'raw_text', 'source', 'whois_server', 'note'}
+
+# WHOIS fields that hold a string or a list depending on the source, compared as sorted lists
+WHOIS_LIST_FIELDS = ('status', 'name_servers', 'emails')
+
+def watch_domain_dns(domain):
+    """DNS records for a domain, re-checked once the shortest record TTL runs out"""
+    answers = {}
+    for record_type, answer, error in run_concurrently(
+        lambda record_type: domain_routes.lookup_dns_answer(domain, record_type),
+        domain_routes.DEFAULT_RECORD_TYPES,
+        deadline=domain_routes.DNS_DEADLINE
+    ):
+        # A failed query is not a change; retry the whole check later
+        if error is not None:
+            raise error
+        answers[record_type] = answer
+    
+    # Sort the records so round-robin answer order does not look like a change
+    records = {
+        record_type: sorted(answers[record_type]["records"]) for record_type in domain_routes.DEFAULT_RECORD_TYPES
+    }
+    # Empty answers carry the short negative TTL; a missing CNAME should not force minutely checks
+    ttls = [answer["ttl"] for answer in answers.values() if answer["records"]]
+    ttl = min(ttls) if ttls else CACHE_TTLS['dns']
+    
+    return {"domain": domain, "dns_records": records}, ttl
+
+def watch_domain_whois(domain):
+    """Registration data, re-checked daily or just after the registration expires"""
+    result = domain_routes.lookup_whois(domain)
+    
+    # The generated placeholder is what failed lookups return; never compare against it
+    if result["whois_data"].get("source") == "Generated Mock Data (Demo)":
+        raise ValueError("Every WHOIS source failed")
+    
+    ttl = CACHE_TTLS['whois']
+    expires_at = parse_date(result["whois_data"].get("expiration_date"))
+    if expires_at is not None:
+        until_expiry = (expires_at - datetime.now(timezone.utc)).total_seconds()
+        if 0 < until_expiry < ttl:
+            ttl = until_expiry + 3600  # Give the registry an hour to publish a renewal
+    
+    return dict(result, whois_data=normalise_whois(result["whois_data"])), ttl
+
+def normalise_whois(whois_data):
+    """Registration data without source details, with list fields always sorted lists"""
+    normalised = {key: value for key, value in whois_data.items() if key not in WHOIS_SOURCE_FIELDS}
+    for key in WHOIS_LIST_FIELDS:
+        value = normalised.get(key)
+        if value is None:
+            continue
+        values = value if isinstance(value, list) else [value]
+        normalised[key] = sorted({str(item) for item in values if item})
+    return normalised
+
+def parse_date(value):
+    """Parse an ISO or WHOIS-style date (the first one, if there are several), or return None"""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if not value:
+        return None
+    
+    text = str(value).strip().replace('Z', '+00:00')
+    for parse in (datetime.fromisoformat, lambda text: datetime.strptime(text[:19], '%Y-%m-%d %H:%M:%S')):
+        try:
+            parsed = parse(text)
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+def watch_domain_headers(domain):
+    """HTTP response headers, without the ones that change on every request"""
+    result = domain_routes.lookup_headers(domain)
+    
+    headers = {
+        name: value for name, value in result["headers"].items() if name.lower() not in VOLATILE_HEADERS
+    }
+    
+    return dict(result, headers=headers), WATCH_HEADERS_INTERVAL
+
+def watch_ip_whois(ip):
+    """RDAP registration data for an IP address"""
+    return {"ip": ip, "whois_data": ip_routes.lookup_ip_whois(ip)}, CACHE_TTLS['rdap']
+
+register_watch_lookup('domain_dns', 'domain', watch_domain_dns)
+register_watch_lookup('domain_whois', 'domain', watch_domain_whois)
+register_watch_lookup('domain_headers', 'domain', watch_domain_headers)
+register_watch_lookup('ip_whois', 'ip', watch_ip_whois)
+
+@bp.route('', methods=['POST'])
+def add_watch():
+    """Start watching a domain or IP; the first check records the baseline"""
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('target'), str) or not data['target'].strip():
+        return jsonify({"error": "Target is required"}), 400
+    
+    target = data['target'].strip().lower()
+    try:
+        ipaddress.ip_address(target)
+        target_type = 'ip'
+    except ValueError:
+        target_type = 'domain'
+    
+    available = watch_lookups(target_type)
+    selected = data.get('lookups') or available
+    unknown = [name for name in selected if name not in available]
+    if unknown:
+        return jsonify({
+            "error": f"Unknown lookups for {target_type} targets: {', '.join(unknown)}. Available: {', '.join(available)}"
+        }), 400
+    
+    store = get_watch_store()
+    watch_id = store.add(target, target_type, list(dict.fromkeys(selected)))
+    get_watch_scheduler().wake()
+    
+    return jsonify(store.get(watch_id)), 201
+
+@bp.route('', methods=['GET'])
+def list_watches():
+    """Every watch with the schedule of its lookups"""
+    return jsonify({"watches": get_watch_store().list()})
+
+@bp.route('/<int:watch_id>', methods=['GET'])
+def get_watch(watch_id):
+    """One watch with the latest result of each lookup"""
+    watch = get_watch_store().get(watch_id, include_state=True)
+    
+    if watch is None:
+        return jsonify({"error": "Watch not found"}), 404
+    
+    return jsonify(watch)
+
+@bp.route('/<int:watch_id>', methods=['DELETE'])
+def remove_watch(watch_id):
+    """Stop watching a target and drop its history"""
+    if not get_watch_store().remove(watch_id):
+        return jsonify({"error": "Watch not found"}), 404
+    
+    return jsonify({"deleted": watch_id})
+
+@bp.route('/<int:watch_id>/check', methods=['POST'])
+def check_watch(watch_id):
+    """Check every lookup of a watch now instead of at its scheduled time"""
+    if not get_watch_store().check_now(watch_id):
+        return jsonify({"error": "Watch not found"}), 404
+    
+    get_watch_scheduler().wake()
+    return jsonify({"scheduled": watch_id}), 202
+
+@bp.route('/changes', methods=['GET'])
+def watch_changes():
+    """Change feed: diffs detected after the given change ID, oldest first"""
+    try:
+        after = int(request.args.get('after', 0))
+        limit = max(1, min(int(request.args.get('limit', 100)), 1000))
+        watch_id = request.args.get('watch_id', type=int)
+    except ValueError:
+        return jsonify({"error": "after and limit must be integers"}), 400
+    
+    changes = get_watch_store().changes(after, watch_id, limit)
+    
+    return jsonify({
+        "changes": changes,
+        "next_after": changes[-1]["id"] if changes else after
+    })
@@ -0,0 +1,58 @@
+import json
+import os
+
+from flask import Response
+
+from services.concurrency import run_concurrently
+
+# Limits for batch requests
+BATCH_MAX_TARGETS = int(os.environ.get('BATCH_MAX_TARGETS', 5000))
+BATCH_DEFAULT_CONCURRENCY = int(os.environ.get('BATCH_DEFAULT_CONCURRENCY', 10))
+BATCH_MAX_CONCURRENCY = int(os.environ.get('BATCH_MAX_CONCURRENCY', 50))
+
+
+def parse_batch_request(data, lookups):
+    """Validate a batch request body against the available lookups.
+
+    Returns (targets, selected lookup names, concurrency) or raises
+    ValueError with a message suitable for a 400 response.
+    """
+    if not data or not isinstance(data.get('targets'), list) or not data['targets']:
+        raise ValueError("A non-empty list of targets is required")
+
+    targets = data['targets']
+    if len(targets) > BATCH_MAX_TARGETS:
+        raise ValueError(f"At most {BATCH_MAX_TARGETS} targets are allowed per batch")
+
+    selected = data.get('lookups') or list(lookups)
+    unknown = [name for name in selected if name not in lookups]
+    if unknown:
+        raise ValueError(f"Unknown lookups: {', '.join(unknown)}. Available: {', '.join(lookups)}")
+
+    try:
+        concurrency = int(data.get('concurrency', BATCH_DEFAULT_CONCURRENCY))
+    except (TypeError, ValueError):
+        raise ValueError("Concurrency must be an integer")
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+
+    return targets, selected, concurrency
+
+
+def stream_batch(targets, lookups, selected, concurrency):
+    """Run every (target, lookup) pair concurrently and stream NDJSON lines as each finishes"""
+    jobs = [(target, name) for target in targets for name in selected]
+
+    def run(job):
+        target, name = job
+        return lookups[name](target)
+
+    def generate():
+        for (target, name), result, error in run_concurrently(run, jobs, max_workers=concurrency):
+            line = {"target": target, "lookup": name}
+            if error is None:
+                line["result"] = result
+            else:
+                line["error"] = str(error)
+            yield json.dumps(line, default=str) + "\n"
+
+    return Response(generate(), mimetype='application/x-ndjson')
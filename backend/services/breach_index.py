@@ -0,0 +1,293 @@
+"""Offline index of breached email addresses.
+
+The index is one file of fixed-width records, sorted so it can be searched
+in place through mmap without loading it:
+
+    header      magic, record count, offsets of the breach table
+    prefix      (65536 + 1) uint64 record numbers: where each 2-byte key prefix starts
+    records     KEY_BYTES of SHA-256(normalised email) + uint16 breach ID, sorted
+    breaches    JSON list of breach objects (HIBP format), indexed by breach ID
+
+Emails are stored only as truncated hashes. Build an index from CSV files of
+"email,BreachName" rows with:
+
+    python -m services.breach_index build --breaches breaches.json --output data/breaches.idx dump1.csv dump2.csv
+"""
+import argparse
+import csv
+import hashlib
+import heapq
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+BREACH_INDEX_PATH = os.environ.get(
+    'BREACH_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'breaches.idx')
+)
+BREACH_INDEX_RELOAD_INTERVAL = float(os.environ.get('BREACH_INDEX_RELOAD_INTERVAL', 60))  # Check for a rebuilt file
+
+MAGIC = b'IYBREACH'
+VERSION = 1
+KEY_BYTES = 16  # 128 bits of the hash: collisions are negligible even across billions of addresses
+RECORD = struct.Struct(f'>{KEY_BYTES}sH')
+HEADER = struct.Struct('>8sHHQQQ')  # magic, version, key bytes, records, breach table offset, length
+PREFIX_BITS = 16
+PREFIX_ENTRIES = (1 << PREFIX_BITS) + 1
+PREFIX_ENTRY = struct.Struct('>Q')
+
+# Records sorted in memory per run when building; runs are merged from disk
+BUILD_RUN_RECORDS = 5_000_000
+
+
+def normalise_email(email):
+    return email.strip().lower()
+
+
+def email_key(email):
+    return hashlib.sha256(normalise_email(email).encode('utf-8')).digest()[:KEY_BYTES]
+
+
+class BreachIndex:
+    """Read-only view of an index file, memory-mapped and searched by binary search"""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, key_bytes, self.records, breaches_offset, breaches_length = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or key_bytes != KEY_BYTES:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {VERSION} breach index")
+
+        self._prefix_offset = HEADER.size
+        self._records_offset = self._prefix_offset + PREFIX_ENTRIES * PREFIX_ENTRY.size
+        self.breaches = json.loads(self._mm[breaches_offset:breaches_offset + breaches_length])
+
+    def close(self):
+        self._mm.close()
+
+    def _record_key(self, index):
+        offset = self._records_offset + index * RECORD.size
+        return self._mm[offset:offset + KEY_BYTES]
+
+    def breach_ids(self, email):
+        """Breach IDs recorded for an email address"""
+        key = email_key(email)
+
+        # The prefix table narrows the search to records sharing the first two bytes
+        prefix = int.from_bytes(key[:PREFIX_BITS // 8], 'big')
+        lo = PREFIX_ENTRY.unpack_from(self._mm, self._prefix_offset + prefix * PREFIX_ENTRY.size)[0]
+        hi = PREFIX_ENTRY.unpack_from(self._mm, self._prefix_offset + (prefix + 1) * PREFIX_ENTRY.size)[0]
+
+        # Leftmost record with this key
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record_key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        ids = []
+        while lo < self.records:
+            record_key, breach_id = RECORD.unpack_from(self._mm, self._records_offset + lo * RECORD.size)
+            if record_key != key:
+                break
+            ids.append(breach_id)
+            lo += 1
+        return ids
+
+    def lookup(self, email):
+        """Breach objects for an email address (empty if it is not in the index)"""
+        return [self.breaches[breach_id] for breach_id in self.breach_ids(email)]
+
+
+def build_index(rows, output, breaches=None):
+    """Write an index from (email, breach name) pairs.
+
+    breaches maps a breach name to its HIBP-style description; names without
+    one get a minimal entry. Rows are sorted in runs of BUILD_RUN_RECORDS and
+    merged from temporary files, so inputs larger than memory work. The file
+    is written to a temporary path and moved into place, so readers never see
+    a partial index. Returns the number of records written.
+    """
+    breaches = breaches or {}
+    breach_ids = {}
+    breach_list = []
+
+    def breach_id(name):
+        if name not in breach_ids:
+            if len(breach_list) > 0xFFFF:
+                raise ValueError("An index holds at most 65536 breaches")
+            breach_ids[name] = len(breach_list)
+            breach_list.append(breaches.get(name) or {"Name": name, "Title": name})
+        return breach_ids[name]
+
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+
+    runs = []
+    try:
+        run = []
+        for email, breach_name in rows:
+            email, breach_name = email.strip(), breach_name.strip()
+            if '@' not in email or not breach_name:
+                continue
+            run.append(RECORD.pack(email_key(email), breach_id(breach_name)))
+            if len(run) >= BUILD_RUN_RECORDS:
+                runs.append(_write_run(run, directory))
+                run = []
+
+        # Merge the sorted runs (and the final in-memory run), dropping duplicates
+        run.sort()
+        sources = [_read_run(path) for path in runs] + [iter(run)]
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.breaches-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(b'\0' * (HEADER.size + PREFIX_ENTRIES * PREFIX_ENTRY.size))
+
+                prefix_counts = [0] * (1 << PREFIX_BITS)
+                count = 0
+                previous = None
+                for record in heapq.merge(*sources):
+                    if record == previous:
+                        continue
+                    previous = record
+                    f.write(record)
+                    prefix_counts[int.from_bytes(record[:PREFIX_BITS // 8], 'big')] += 1
+                    count += 1
+
+                breaches_offset = f.tell()
+                breaches_json = json.dumps(breach_list).encode()
+                f.write(breaches_json)
+
+                # Prefix table: record number where each prefix starts, plus the end
+                prefix_table = bytearray()
+                start = 0
+                for prefix_count in prefix_counts:
+                    prefix_table += PREFIX_ENTRY.pack(start)
+                    start += prefix_count
+                prefix_table += PREFIX_ENTRY.pack(start)
+
+                f.seek(0)
+                f.write(HEADER.pack(MAGIC, VERSION, KEY_BYTES, count, breaches_offset, len(breaches_json)))
+                f.write(prefix_table)
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(tmp_path, output)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    finally:
+        for path in runs:
+            os.unlink(path)
+
+    return count
+
+
+def _write_run(records, directory):
+    records.sort()
+    fd, path = tempfile.mkstemp(dir=directory, prefix='.breaches-run-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(b''.join(records))
+    return path
+
+
+def _read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(RECORD.size * 65536)
+            if not chunk:
+                return
+            for offset in range(0, len(chunk), RECORD.size):
+                yield chunk[offset:offset + RECORD.size]
+
+
+def read_csv_rows(paths):
+    """Yield (email, breach name) from CSV files of email,breach rows.
+
+    A first row whose first column holds no '@' is a header and is skipped.
+    """
+    for path in paths:
+        with open(path, newline='', encoding='utf-8', errors='replace') as f:
+            for line, row in enumerate(csv.reader(f)):
+                if line == 0 and row and '@' not in row[0]:
+                    continue
+                if len(row) >= 2:
+                    yield row[0], row[1]
+
+
+_index = None
+_checked_at = float('-inf')
+_index_lock = threading.Lock()
+
+
+def get_breach_index():
+    """Return the configured index, reopening it when the file is rebuilt, or None if there is none"""
+    global _index, _checked_at
+    if time.monotonic() - _checked_at < BREACH_INDEX_RELOAD_INTERVAL:
+        return _index
+
+    with _index_lock:
+        if time.monotonic() - _checked_at < BREACH_INDEX_RELOAD_INTERVAL:
+            return _index
+        _checked_at = time.monotonic()
+
+        try:
+            mtime = os.path.getmtime(BREACH_INDEX_PATH)
+        except OSError:
+            _index = None
+            return None
+
+        if _index is None or _index.mtime != mtime:
+            try:
+                # The old mapping is left for the garbage collector; lookups may still be using it
+                _index = BreachIndex(BREACH_INDEX_PATH)
+            except (OSError, ValueError) as e:
+                logger.warning("Could not open breach index %s: %s", BREACH_INDEX_PATH, e)
+                _index = None
+        return _index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the offline breach index")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='Build an index from CSV files of email,breach rows')
+    build.add_argument('inputs', nargs='+')
+    build.add_argument('--breaches', help='JSON file of breach descriptions (a HIBP /breaches response)')
+    build.add_argument('--output', default=BREACH_INDEX_PATH)
+
+    query = commands.add_parser('query', help='Look up email addresses in an index')
+    query.add_argument('emails', nargs='+')
+    query.add_argument('--index', default=BREACH_INDEX_PATH)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        breaches = {}
+        if args.breaches:
+            with open(args.breaches) as f:
+                breaches = {breach["Name"]: breach for breach in json.load(f)}
+        started = time.monotonic()
+        count = build_index(read_csv_rows(args.inputs), args.output, breaches)
+        print(f"Wrote {count} records to {args.output} in {time.monotonic() - started:.1f}s")
+    else:
+        index = BreachIndex(args.index)
+        for email in args.emails:
+            print(email, [breach["Name"] for breach in index.lookup(email)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from services.concurrency import coalesce
+from services.metrics import CACHE_REQUESTS
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing stays within one worker
+    fcntl = None
+
+# Cache backend: "memory" (per process) or "sqlite" (shared by all workers on the host)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+CACHE_SQLITE_PATH = os.environ.get(
+    'CACHE_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'iseeyou-cache.sqlite3')
+)
+CACHE_SQLITE_EVICT_EVERY = int(os.environ.get('CACHE_SQLITE_EVICT_EVERY', 100))  # Writes between eviction passes
+CACHE_SQLITE_TOUCH_INTERVAL = 60  # Record reads of an entry at most this often (seconds)
+
+# Also coalesce identical lookups across worker processes (needs the sqlite backend
+# so the waiting workers can read the result the lock holder stored)
+CACHE_COALESCE_WORKERS = os.environ.get('CACHE_COALESCE_WORKERS', '0') == '1'
+CACHE_LOCK_DIR = os.environ.get('CACHE_LOCK_DIR', os.path.join(tempfile.gettempdir(), 'iseeyou-locks'))
+CACHE_LOCK_TIMEOUT = float(os.environ.get('CACHE_LOCK_TIMEOUT', 30))  # Give up waiting and load anyway
+CACHE_LOCK_STRIPES = 256  # Keys hash onto this many lock files, so the directory never grows
+
+# Default time-to-live (seconds) per lookup type
+CACHE_TTLS = {
+    "whois": int(os.environ.get('CACHE_TTL_WHOIS', 86400)),
+    "dns": int(os.environ.get('CACHE_TTL_DNS', 300)),  # Used only when a record carries no TTL
+    "dns_negative": int(os.environ.get('CACHE_TTL_DNS_NEGATIVE', 60)),
+    "rdap": int(os.environ.get('CACHE_TTL_RDAP', 86400)),
+    "geolocation": int(os.environ.get('CACHE_TTL_GEOLOCATION', 3600)),
+    "reverse_dns": int(os.environ.get('CACHE_TTL_REVERSE_DNS', 3600)),
+    "hibp": int(os.environ.get('CACHE_TTL_HIBP', 86400)),
+}
+
+# Returned by backends when a key is absent or expired (None is a valid cached value)
+MISS = object()
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return MISS
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+
+            # Evict least recently used entries once over the size bound
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """Cache stored in a SQLite file so every worker process shares results.
+
+    Entries past the size bound are evicted least recently used first, in a
+    batch every evict_every writes rather than on each one. Reads update an
+    entry's access time at most once per CACHE_SQLITE_TOUCH_INTERVAL, so
+    cache hits rarely need the write lock.
+    """
+
+    def __init__(self, path=CACHE_SQLITE_PATH, max_entries=CACHE_MAX_ENTRIES, evict_every=CACHE_SQLITE_EVICT_EVERY):
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL DEFAULT 0)"
+        )
+        # Files created before access times were tracked
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(cache)")]
+        if 'accessed_at' not in columns:
+            conn.execute("ALTER TABLE cache ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+        conn.commit()
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_with_expiry(self, key):
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM cache WHERE key = ? AND expires_at > ?",
+            (key, now)
+        ).fetchone()
+        if row is None:
+            return MISS, 0
+
+        if row[2] < now - CACHE_SQLITE_TOUCH_INTERVAL:
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return json.loads(row[0]), row[1]
+
+    def get(self, key):
+        return self.get_with_expiry(key)[0]
+
+    def set(self, key, value, ttl):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + ttl, now)
+        )
+        conn.commit()
+
+        with self._writes_lock:
+            self._writes += 1
+            evict = self._writes >= self.evict_every
+            if evict:
+                self._writes = 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Drop expired rows, then the least recently used ones over the size bound"""
+        conn = self._connection()
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        excess = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (excess,)
+            )
+        conn.commit()
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM cache")
+        conn.commit()
+
+
+class TieredCache:
+    """In-process cache in front of a shared backend"""
+
+    def __init__(self, front, back):
+        self.front = front
+        self.back = back
+
+    def get(self, key):
+        value = self.front.get(key)
+        if value is not MISS:
+            return value
+
+        value, expires_at = self.back.get_with_expiry(key)
+        if value is not MISS:
+            self.front.set(key, value, expires_at - time.time())
+        return value
+
+    def set(self, key, value, ttl):
+        self.front.set(key, value, ttl)
+        self.back.set(key, value, ttl)
+
+    def clear(self):
+        self.front.clear()
+        self.back.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide cache for the configured backend"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if CACHE_BACKEND == 'sqlite':
+                    _cache = TieredCache(MemoryCache(), SQLiteCache())
+                else:
+                    _cache = MemoryCache()
+    return _cache
+
+
+def is_cached(namespace, key):
+    """Return True if a live cached result exists for a lookup"""
+    return get_cache().get(f"{namespace}:{key}") is not MISS
+
+
+def store(namespace, key, value, ttl=None):
+    """Cache a lookup result; ttl defaults to the namespace's configured TTL"""
+    if ttl is None:
+        ttl = CACHE_TTLS.get(namespace, 0)
+    if ttl and ttl > 0:
+        get_cache().set(f"{namespace}:{key}", value, ttl)
+
+
+def cached(namespace, key, loader, ttl=None):
+    """Return the cached result for a lookup, calling loader on a miss.
+
+    ttl may be a number of seconds or a function of the loaded value; a
+    ttl of 0 or less means the value is returned but not cached. Exceptions
+    raised by loader are never cached. Concurrent misses for the same key
+    share a single loader call.
+    """
+    cache_key = f"{namespace}:{key}"
+    value = get_cache().get(cache_key)
+    if value is not MISS:
+        CACHE_REQUESTS.inc(namespace, 'hit')
+        return value
+    CACHE_REQUESTS.inc(namespace, 'miss')
+
+    def load():
+        with _worker_lock(cache_key):
+            # Another thread or worker may have stored it while we waited
+            value = get_cache().get(cache_key)
+            if value is not MISS:
+                return value
+
+            value = loader()
+
+            store(namespace, key, value, ttl(value) if callable(ttl) else ttl)
+            return value
+
+    return coalesce(cache_key, load)
+
+
+@contextmanager
+def _worker_lock(cache_key):
+    """Hold a file lock for the key's stripe so only one worker process loads a key at a time.
+
+    Keys that share a stripe wait for each other too; with CACHE_LOCK_STRIPES
+    stripes that is rare, and it keeps the lock directory a fixed size.
+    """
+    if not CACHE_COALESCE_WORKERS or fcntl is None:
+        yield
+        return
+
+    os.makedirs(CACHE_LOCK_DIR, exist_ok=True)
+    stripe = int(hashlib.sha1(cache_key.encode()).hexdigest(), 16) % CACHE_LOCK_STRIPES
+    path = os.path.join(CACHE_LOCK_DIR, f"{stripe:02x}.lock")
+    with open(path, 'w') as lock_file:
+        # Poll instead of blocking so gevent workers keep serving other requests
+        expires_at = time.monotonic() + CACHE_LOCK_TIMEOUT
+        locked = False
+        while not locked and time.monotonic() < expires_at:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked = True
+            except BlockingIOError:
+                time.sleep(0.05)
+
+        try:
+            yield
+        finally:
+            if locked:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
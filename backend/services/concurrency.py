@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Upper bound on worker threads for a single fan-out
+MAX_WORKERS = int(os.environ.get('FANOUT_MAX_WORKERS', 32))
+
+# Shared pool for single blocking calls that need a deadline
+_timeout_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='deadline')
+
+
+def run_concurrently(func, items, max_workers=MAX_WORKERS, deadline=None):
+    """Run func over items on a bounded thread pool.
+
+    Yields (item, result, error) tuples in completion order. If deadline
+    (seconds) passes, the remaining items are yielded with a TimeoutError
+    and their workers are abandoned rather than waited for.
+    """
+    items = list(items)
+    if not items:
+        return
+
+    expires_at = time.monotonic() + deadline if deadline else None
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))))
+    try:
+        pending = {executor.submit(func, item): item for item in items}
+
+        while pending:
+            timeout = None
+            if expires_at is not None:
+                timeout = max(0, expires_at - time.monotonic())
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Deadline reached - report whatever is still outstanding
+                for future, item in pending.items():
+                    future.cancel()
+                    yield item, None, TimeoutError("Deadline exceeded")
+                return
+
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    yield item, future.result(), None
+                except Exception as e:
+                    yield item, None, e
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def call_with_timeout(func, timeout, *args, **kwargs):
+    """Run a blocking call on a worker thread, raising TimeoutError after timeout seconds"""
+    return _timeout_executor.submit(func, *args, **kwargs).result(timeout=timeout)
+
+
+class SingleFlight:
+    """Share one call between threads asking for the same key at the same time.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for it and receive the same result or exception, even
+    one that is not an Exception (e.g. a gevent timeout cancelling the call).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_single_flight = SingleFlight()
+
+
+def coalesce(key, func):
+    """Run func, sharing its result with concurrent callers using the same key"""
+    return _single_flight.do(key, func)
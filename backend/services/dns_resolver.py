@@ -0,0 +1,55 @@
+import os
+import threading
+
+import dns.exception
+import dns.resolver
+
+from services import upstream
+
+# Resolver settings (nameservers default to /etc/resolv.conf)
+DNS_NAMESERVERS = [ns.strip() for ns in os.environ.get('DNS_NAMESERVERS', '').split(',') if ns.strip()]
+DNS_PORT = int(os.environ.get('DNS_PORT', 53))
+DNS_TIMEOUT = float(os.environ.get('DNS_TIMEOUT', 5.0))  # Per nameserver attempt
+DNS_LIFETIME = float(os.environ.get('DNS_LIFETIME', 10.0))  # Total per resolution
+DNS_TXT_LIFETIME = float(os.environ.get('DNS_TXT_LIFETIME', 15.0))  # TXT records often take longer
+DNS_CACHE_SIZE = int(os.environ.get('DNS_CACHE_SIZE', 10000))
+
+# Negative answers mean the resolver is working, so they do not trip the breaker
+DNS_ANSWER_ERRORS = (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer, dns.resolver.YXDOMAIN)
+
+# A timeout is usually one slow or broken zone, not the resolver; only errors from
+# every nameserver (SERVFAIL, REFUSED, connection refused: NoNameservers) trip it
+DNS_NEUTRAL_ERRORS = (dns.exception.Timeout,)
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def _build_resolver():
+    """Create a resolver with the configured nameservers and a shared answer cache"""
+    resolver = dns.resolver.Resolver(configure=not DNS_NAMESERVERS)
+    if DNS_NAMESERVERS:
+        resolver.nameservers = DNS_NAMESERVERS
+    resolver.port = DNS_PORT
+    resolver.timeout = DNS_TIMEOUT
+    resolver.lifetime = DNS_LIFETIME
+    resolver.cache = dns.resolver.LRUCache(DNS_CACHE_SIZE)
+    return resolver
+
+
+def get_resolver():
+    """Return the process-wide resolver, creating it on first use"""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = _build_resolver()
+    return _resolver
+
+
+def resolve(qname, rdtype='A', tcp=False, lifetime=None):
+    """Resolve a query through the shared resolver"""
+    if lifetime is None and rdtype == 'TXT':
+        lifetime = DNS_TXT_LIFETIME
+    with upstream.guard('dns', ignore=DNS_ANSWER_ERRORS, neutral=DNS_NEUTRAL_ERRORS):
+        return get_resolver().resolve(qname, rdtype, tcp=tcp, lifetime=lifetime)
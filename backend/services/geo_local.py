@@ -0,0 +1,173 @@
+"""Offline IPv4 geolocation from a memory-mapped range table.
+
+The database is a sorted binary table compiled from a CSV of IP ranges:
+
+    header:  magic (8 bytes) | record count (u32) | string table offset (u32)
+    records: start ip (u32) | end ip (u32) | data offset (u32) | data length (u32)
+    strings: UTF-8 JSON objects, one per distinct location, shared by ranges
+
+Lookups binary-search the records in place, so only the matching JSON
+object is decoded. Compile a CSV with:
+
+    python -m services.geo_local ranges.csv geo.bin
+"""
+import csv
+import ipaddress
+import json
+import mmap
+import os
+import socket
+import struct
+import sys
+import threading
+
+GEO_DB_PATH = os.environ.get('GEO_DB_PATH', '')
+# Default source for geolocation: "remote" (ip-api.com), "local" or "auto" (local, then remote on a miss)
+GEO_BACKEND = os.environ.get('GEO_BACKEND', 'auto' if GEO_DB_PATH else 'remote')
+
+MAGIC = b'ISYGEO1\x00'
+HEADER = struct.Struct('>8sII')
+RECORD = struct.Struct('>IIII')
+START = struct.Struct('>I')
+
+# CSV columns copied into each location, mapped to ip-api.com field names
+CSV_FIELDS = {
+    "country_code": "countryCode",
+    "country": "country",
+    "region_code": "region",
+    "region": "regionName",
+    "city": "city",
+    "zip": "zip",
+    "latitude": "lat",
+    "longitude": "lon",
+    "timezone": "timezone",
+    "isp": "isp",
+    "org": "org",
+    "as": "as",
+}
+NUMERIC_FIELDS = {"lat", "lon"}
+
+
+def ip_to_int(ip):
+    return int.from_bytes(socket.inet_aton(ip), 'big')
+
+
+class LocalGeoDatabase:
+    """Read-only view over a compiled range table"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, self._strings_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled geolocation database")
+
+    def lookup(self, ip):
+        """Return the location for an IP address, or None if no range contains it.
+
+        The table only holds IPv4 ranges, so IPv6 addresses are always a miss;
+        anything that is not an IP address raises ValueError.
+        """
+        address = ipaddress.ip_address(ip)
+        if address.version != 4:
+            return None
+        target = int(address)
+
+        # Find the last range starting at or before the address
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if START.unpack_from(self._mm, HEADER.size + mid * RECORD.size)[0] <= target:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo == 0:
+            return None
+
+        start, end, offset, length = RECORD.unpack_from(self._mm, HEADER.size + (lo - 1) * RECORD.size)
+        if target > end:
+            return None
+
+        data_start = self._strings_offset + offset
+        location = json.loads(self._mm[data_start:data_start + length])
+        location["query"] = ip
+        return location
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_database():
+    """Return the configured local database, or None if none is configured"""
+    global _database
+    if _database is None and GEO_DB_PATH:
+        with _database_lock:
+            if _database is None:
+                _database = LocalGeoDatabase(GEO_DB_PATH)
+    return _database
+
+
+def lookup(ip):
+    """Look up an IP in the local database; None on a miss or without a database"""
+    database = get_database()
+    if database is None:
+        return None
+    return database.lookup(ip)
+
+
+def compile_csv(csv_path, output_path):
+    """Compile a CSV of IPv4 ranges into a sorted binary range table.
+
+    The CSV needs start_ip and end_ip columns (dotted or integer form) plus
+    any of the location columns in CSV_FIELDS.
+    """
+    ranges = []
+    strings = bytearray()
+    string_offsets = {}
+
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            start = _parse_ip(row['start_ip'])
+            end = _parse_ip(row['end_ip'])
+
+            location = {"status": "success"}
+            for column, field in CSV_FIELDS.items():
+                value = row.get(column)
+                if value in (None, ''):
+                    continue
+                location[field] = float(value) if field in NUMERIC_FIELDS else value
+            location["source"] = "local"
+
+            # Ranges in the same location share one JSON object
+            blob = json.dumps(location, separators=(',', ':'), sort_keys=True).encode('utf-8')
+            if blob not in string_offsets:
+                string_offsets[blob] = len(strings)
+                strings += blob
+            ranges.append((start, end, string_offsets[blob], len(blob)))
+
+    ranges.sort()
+
+    with open(output_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(ranges), HEADER.size + len(ranges) * RECORD.size))
+        for record in ranges:
+            f.write(RECORD.pack(*record))
+        f.write(strings)
+
+    return len(ranges)
+
+
+def _parse_ip(value):
+    value = value.strip()
+    return int(value) if value.isdigit() else ip_to_int(value)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python -m services.geo_local <ranges.csv> <output.bin>")
+        sys.exit(1)
+    count = compile_csv(sys.argv[1], sys.argv[2])
+    print(f"Compiled {count} ranges into {sys.argv[2]}")
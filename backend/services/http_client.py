@@ -0,0 +1,127 @@
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services import upstream
+
+# Connection pool and retry settings
+POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 50))  # Number of hosts to keep pools for
+POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 20))  # Keep-alive connections per host
+DEFAULT_TIMEOUT = float(os.environ.get('HTTP_TIMEOUT', 10))
+
+# Connection failures and 502/503/504 answers are retried; read timeouts are
+# not, so a call with retries takes at most about timeout x (1 + MAX_RETRIES)
+# plus backoff (a connect timeout is retried), and one without at most timeout
+MAX_RETRIES = int(os.environ.get('HTTP_RETRIES', 2))
+BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF', 0.3))
+
+# HEAD responses that mean "this server does not do HEAD" rather than an answer
+HEAD_FALLBACK_STATUSES = frozenset([400, 403, 405, 501])
+
+# Use a browser-like User-Agent to avoid being blocked
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+_sessions = {}  # retries -> session
+_session_lock = threading.Lock()
+
+
+def _build_session(max_retries):
+    """Create a session with keep-alive connection pools and retry/backoff"""
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=0,
+        status=max_retries,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+        raise_on_status=False,
+        respect_retry_after_header=True
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=retry,
+        pool_block=False
+    )
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+
+    # The session is shared by every request thread, so never keep cookies
+    # from one lookup around for the next
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def get_session(retries=True):
+    """Return the process-wide HTTP session, creating it on first use.
+
+    retries=False returns a session that never retries, for probes and
+    fan-out calls where one slow host must cost a single timeout.
+    """
+    session = _sessions.get(retries)
+    if session is None:
+        with _session_lock:
+            session = _sessions.get(retries)
+            if session is None:
+                session = _sessions[retries] = _build_session(MAX_RETRIES if retries else 0)
+    return session
+
+
+def register_host(url, label):
+    """Give the host of a configured API its own rate limit and breaker instead of the shared targets one"""
+    upstream.register(urlsplit(url).hostname, label=label)
+
+
+def request(method, url, retries=True, target=False, **kwargs):
+    """Send a request through the shared connection pools, rate limited per registered host.
+
+    retries=False sends it exactly once (see get_session). target=True marks
+    a request to a lookup target (a probed site, a domain's own web server):
+    it always goes through the targets upstream, so a target that happens to
+    share a host with a configured API can never open that API's breaker.
+    """
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+
+    # Server errors count against the host's circuit breaker; 4xx are normal answers
+    name = upstream.TARGETS if target else urlsplit(url).hostname or url
+    with upstream.guard(name) as attempt:
+        response = get_session(retries).request(method, url, **kwargs)
+        if response.status_code >= 500:
+            attempt.fail()
+    return response
+
+
+def get(url, **kwargs):
+    """Send a GET request through the shared connection pools"""
+    return request('GET', url, **kwargs)
+
+
+def head(url, **kwargs):
+    """Send a HEAD request through the shared connection pools"""
+    return request('HEAD', url, **kwargs)
+
+
+def probe(url, **kwargs):
+    """Fetch only the status line and headers for url.
+
+    Sends HEAD first. If the server rejects HEAD, falls back to a streamed GET
+    that is closed as soon as the headers arrive, so no body is downloaded.
+    """
+    response = head(url, **kwargs)
+    if response.status_code not in HEAD_FALLBACK_STATUSES:
+        return response
+
+    response = get(url, stream=True, **kwargs)
+    response.close()
+    return response
@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from services import http_client
+
+# ip-api.com settings (the base URL can point at a local stand-in)
+IPAPI_URL = os.environ.get('IPAPI_URL', 'http://ip-api.com').rstrip('/')
+http_client.register_host(IPAPI_URL, 'ip-api.com')
+IPAPI_BATCH_SIZE = 100  # Upstream limit per batch call
+IPAPI_BATCH_WINDOW = float(os.environ.get('IPAPI_BATCH_WINDOW', 0.05))  # Seconds to collect concurrent lookups
+IPAPI_MAX_ATTEMPTS = 3
+
+
+class GeoBatcher:
+    """Collect geolocation lookups into ip-api.com batch calls.
+
+    Lookups submitted within a short window (or all at once from a bulk
+    request) are sent as a single POST to the /batch endpoint. A single
+    dispatcher thread sends the calls and honours ip-api's rate-limit
+    headers (X-Rl: requests left, X-Ttl: seconds until the window resets).
+    """
+
+    def __init__(self, base_url=IPAPI_URL, window=IPAPI_BATCH_WINDOW):
+        self.base_url = base_url
+        self.window = window
+        self._pending = {}  # ip -> Future, in submission order
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._blocked_until = 0
+        self._thread = None
+
+    def submit(self, ip):
+        """Queue an IP for the next batch call and return a Future for its result"""
+        with self._lock:
+            future = self._pending.get(ip)
+            if future is None:
+                future = Future()
+                self._pending[ip] = future
+                self._ensure_dispatcher()
+                self._wakeup.notify()
+            return future
+
+    def lookup(self, ip):
+        """Return geolocation data for a single IP, batched with concurrent lookups"""
+        return self.submit(ip).result()
+
+    def _ensure_dispatcher(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._dispatch, name='ipapi-batcher', daemon=True)
+            self._thread.start()
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._wakeup.wait()
+
+            # Give concurrent single lookups a moment to join this batch
+            if self.window:
+                time.sleep(self.window)
+
+            with self._lock:
+                batch = list(self._pending.items())[:IPAPI_BATCH_SIZE]
+
+            try:
+                results = self._fetch(ip for ip, _ in batch)
+            except Exception as e:
+                results = None
+                error = e
+
+            # Resolve futures before dropping them from the pending map so that a
+            # lookup arriving meanwhile sees either the future or its callbacks' effects
+            for ip, future in batch:
+                if results is None:
+                    future.set_exception(error)
+                elif ip in results:
+                    future.set_result(results[ip])
+                else:
+                    future.set_exception(Exception(f"No geolocation result returned for {ip}"))
+
+            with self._lock:
+                for ip, future in batch:
+                    del self._pending[ip]
+
+    def _fetch(self, ips):
+        """Send one batch call, waiting out the upstream rate limit when needed"""
+        payload = [{"query": ip} for ip in ips]
+
+        for attempt in range(IPAPI_MAX_ATTEMPTS):
+            delay = self._blocked_until - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            response = http_client.request('POST', f"{self.base_url}/batch", json=payload, timeout=10)
+            self._update_rate_limit(response)
+
+            if response.status_code == 429:
+                continue
+
+            response.raise_for_status()
+            return {item.get("query"): item for item in response.json()}
+
+        raise Exception("ip-api.com rate limit exceeded")
+
+    def _update_rate_limit(self, response):
+        remaining = response.headers.get('X-Rl')
+        reset_in = response.headers.get('X-Ttl')
+
+        if remaining is None or reset_in is None:
+            # Back off briefly if we were throttled without being told for how long
+            if response.status_code == 429:
+                self._blocked_until = time.monotonic() + 1
+            return
+
+        if int(remaining) <= 0 or response.status_code == 429:
+            self._blocked_until = time.monotonic() + int(reset_in)
+
+
+geo_batcher = GeoBatcher()
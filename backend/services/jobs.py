@@ -0,0 +1,373 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from services.concurrency import run_concurrently
+
+logger = logging.getLogger(__name__)
+
+# Jobs and their results live in a SQLite file shared by every worker process
+JOBS_DB_PATH = os.environ.get('JOBS_DB_PATH', os.path.join(tempfile.gettempdir(), 'iseeyou-jobs.sqlite3'))
+
+# Jobs run at once per worker process (each job fans out to its own concurrency)
+JOBS_WORKERS = int(os.environ.get('JOBS_WORKERS', 4))
+JOBS_POLL_INTERVAL = float(os.environ.get('JOBS_POLL_INTERVAL', 1))
+
+# A running job whose owner has not updated it for this long is taken over by another worker
+JOBS_LEASE_TIMEOUT = float(os.environ.get('JOBS_LEASE_TIMEOUT', 60))
+JOBS_RETENTION = int(os.environ.get('JOBS_RETENTION', 7 * 86400))  # Finished jobs are deleted after this
+
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+# Every jobs column except the target list, which can be large and is only needed to run the job
+JOB_COLUMNS = (
+    "id, type, lookups, concurrency, status, total, completed, failed, error, owner, "
+    "created_at, started_at, finished_at, heartbeat_at"
+)
+
+# Lookups available to jobs, by job type (registered by the route modules)
+_job_types = {}
+
+
+def register_job_type(job_type, lookups):
+    """Make a blueprint's per-target lookups available to jobs of this type"""
+    _job_types[job_type] = lookups
+
+
+def job_types():
+    return _job_types
+
+
+class JobStore:
+    """Job state, progress and per-target results in SQLite"""
+
+    def __init__(self, path=JOBS_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, type TEXT NOT NULL, targets TEXT NOT NULL, lookups TEXT NOT NULL,"
+            "concurrency INTEGER NOT NULL, status TEXT NOT NULL, total INTEGER NOT NULL,"
+            "completed INTEGER NOT NULL DEFAULT 0, failed INTEGER NOT NULL DEFAULT 0, error TEXT,"
+            "owner TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL, heartbeat_at REAL);"
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);"
+            "CREATE TABLE IF NOT EXISTS job_results ("
+            "job_id TEXT NOT NULL, seq INTEGER NOT NULL, target TEXT NOT NULL, lookup TEXT NOT NULL,"
+            "result TEXT, error TEXT, finished_at REAL NOT NULL, PRIMARY KEY (job_id, seq));"
+        )
+        conn.commit()
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_type, targets, lookups, concurrency):
+        # Duplicates would run twice but share one (target, lookup) result when a job resumes
+        targets = list(dict.fromkeys(targets))
+        lookups = list(dict.fromkeys(lookups))
+        job_id = uuid.uuid4().hex
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO jobs (id, type, targets, lookups, concurrency, status, total, created_at) "
+            "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+            (job_id, job_type, json.dumps(targets), json.dumps(lookups), concurrency,
+             len(targets) * len(lookups), time.time())
+        )
+        conn.commit()
+        return job_id
+
+    def get(self, job_id):
+        row = self._connection().execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def targets(self, job_id):
+        row = self._connection().execute("SELECT targets FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def status(self, job_id):
+        row = self._connection().execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def claim(self, owner):
+        """Atomically take the oldest queued job (or one whose owner stopped updating it)"""
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            # BEGIN IMMEDIATE takes the write lock so two workers cannot claim the same job
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND heartbeat_at < ?) ORDER BY created_at LIMIT 1",
+                (now - JOBS_LEASE_TIMEOUT,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, heartbeat_at = ?, "
+                "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                (owner, now, now, row[0])
+            )
+        return self.get(row[0])
+
+    def heartbeat(self, job_ids, owner):
+        if not job_ids:
+            return
+        conn = self._connection()
+        conn.execute(
+            f"UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = 'running' "
+            f"AND id IN ({','.join('?' * len(job_ids))})",
+            (time.time(), owner, *job_ids)
+        )
+        conn.commit()
+
+    def finished_pairs(self, job_id):
+        """(target, lookup) pairs that already have a result, so a resumed job skips them"""
+        rows = self._connection().execute(
+            "SELECT target, lookup FROM job_results WHERE job_id = ?", (job_id,)
+        ).fetchall()
+        return {(json.loads(target), lookup) for target, lookup in rows}
+
+    def add_result(self, job_id, owner, target, lookup, result=None, error=None):
+        """Store one result and bump the job's progress; returns False once the job is no longer ours"""
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            job = conn.execute("SELECT status, owner FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None or job["status"] != 'running' or job["owner"] != owner:
+                return False
+
+            # Number results from the stored ones, not the progress counters, so a
+            # resumed job always continues the sequence its readers are paging through
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), -1) + 1 FROM job_results WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO job_results (job_id, seq, target, lookup, result, error, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, seq, json.dumps(target), lookup,
+                 None if error is not None else json.dumps(result, default=str), error, time.time())
+            )
+            conn.execute(
+                "UPDATE jobs SET completed = completed + ?, failed = failed + ?, heartbeat_at = ? WHERE id = ?",
+                (int(error is None), int(error is not None), time.time(), job_id)
+            )
+        return True
+
+    def results(self, job_id, after=-1, limit=1000):
+        """Results stored after sequence number after, oldest first"""
+        rows = self._connection().execute(
+            "SELECT seq, target, lookup, result, error FROM job_results "
+            "WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (job_id, after, limit)
+        ).fetchall()
+
+        results = []
+        for row in rows:
+            item = {"seq": row["seq"], "target": json.loads(row["target"]), "lookup": row["lookup"]}
+            if row["error"] is None:
+                item["result"] = json.loads(row["result"])
+            else:
+                item["error"] = row["error"]
+            results.append(item)
+        return results
+
+    def finish(self, job_id, owner, status, error=None):
+        conn = self._connection()
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND owner = ? AND status = 'running'",
+            (status, error, time.time(), job_id, owner)
+        )
+        conn.commit()
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns False if it had already finished"""
+        conn = self._connection()
+        cursor = conn.execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+            (time.time(), job_id)
+        )
+        conn.commit()
+        return cursor.rowcount > 0
+
+    def purge(self, older_than):
+        """Delete finished jobs (and their results) that finished before older_than"""
+        conn = self._connection()
+        with conn:
+            expired = [row[0] for row in conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATUSES))}) "
+                f"AND finished_at < ?",
+                (*FINISHED_STATUSES, older_than)
+            )]
+            for job_id in expired:
+                conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+class JobRunner:
+    """Runs queued jobs on a bounded pool of threads in this worker process.
+
+    A dispatcher thread claims jobs from the store whenever a slot is free,
+    so jobs submitted to any worker (or left running by one that died) are
+    picked up by whichever worker has capacity.
+    """
+
+    def __init__(self, store, workers=JOBS_WORKERS, poll_interval=JOBS_POLL_INTERVAL):
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._active = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        """Check for queued jobs now instead of at the next poll"""
+        self._wakeup.set()
+
+    def _dispatch(self):
+        last_purge = 0
+        while True:
+            try:
+                with self._lock:
+                    active = list(self._active)
+                self.store.heartbeat(active, self.owner)
+
+                while len(active) < self.workers:
+                    job = self.store.claim(self.owner)
+                    if job is None:
+                        break
+                    with self._lock:
+                        self._active.add(job["id"])
+                    active.append(job["id"])
+                    self._executor.submit(self._run, job)
+
+                if time.time() - last_purge > 3600:
+                    self.store.purge(time.time() - JOBS_RETENTION)
+                    last_purge = time.time()
+            except Exception:
+                logger.exception("Job dispatcher error")
+
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _run(self, job):
+        job_id = job["id"]
+        try:
+            lookups = _job_types.get(job["type"])
+            if lookups is None:
+                self.store.finish(job_id, self.owner, 'failed', f"Unknown job type: {job['type']}")
+                return
+
+            # Skip pairs a previous owner already finished
+            done = self.store.finished_pairs(job_id)
+            pairs = [
+                (target, name)
+                for target in self.store.targets(job_id) for name in json.loads(job["lookups"])
+                if (target, name) not in done
+            ]
+
+            def run(pair):
+                target, name = pair
+                return lookups[name](target)
+
+            results = run_concurrently(run, pairs, max_workers=job["concurrency"])
+            for (target, name), result, error in results:
+                stored = self.store.add_result(
+                    job_id, self.owner, target, name, result, None if error is None else str(error)
+                )
+                if not stored:
+                    # Cancelled or taken over; stop starting new lookups
+                    results.close()
+                    return
+
+            self.store.finish(job_id, self.owner, 'completed')
+        except Exception as e:
+            logger.warning("Job %s failed: %s", job_id, e)
+            self.store.finish(job_id, self.owner, 'failed', str(e))
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+            self.wake()
+
+
+_store = None
+_runner = None
+_init_lock = threading.Lock()
+
+
+def get_job_store():
+    global _store
+    if _store is None:
+        with _init_lock:
+            if _store is None:
+                _store = JobStore()
+    return _store
+
+
+def get_job_runner():
+    """Return this process's job runner, starting its dispatcher on first use"""
+    global _runner
+    if _runner is None:
+        store = get_job_store()
+        with _init_lock:
+            if _runner is None:
+                _runner = JobRunner(store)
+        _runner.start()
+    return _runner
+
+
+def submit_job(job_type, targets, lookups, concurrency):
+    """Queue a job and return its ID"""
+    runner = get_job_runner()
+    job_id = runner.store.create(job_type, targets, lookups, concurrency)
+    runner.wake()
+    return job_id
+
+
+def job_summary(job):
+    """Public view of a job row"""
+    total = job["total"]
+    finished = job["completed"] + job["failed"]
+    lookups = json.loads(job["lookups"])
+    return {
+        "id": job["id"],
+        "type": job["type"],
+        "status": job["status"],
+        "lookups": lookups,
+        "targets": total // len(lookups) if lookups else 0,
+        "progress": {
+            "total": total,
+            "finished": finished,
+            "completed": job["completed"],
+            "failed": job["failed"],
+            "percent": round(finished / total * 100, 1) if total else 100.0
+        },
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"]
+    }
@@ -0,0 +1,156 @@
+import threading
+from bisect import bisect_left
+
+# Latency buckets (seconds) shared by every histogram
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = []
+
+
+class _Metric:
+    """Base for metrics with a fixed set of label names.
+
+    Values are kept per process in a dict keyed by the tuple of label values,
+    so recording a sample is one dict lookup and an addition under a lock.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _labels(self, labelvalues):
+        if not self.labelnames:
+            return ''
+        pairs = (f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, labelvalues))
+        return '{' + ','.join(pairs) + '}'
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            values = list(self._values.items())
+        for labelvalues, value in sorted(values, key=lambda item: tuple(map(str, item[0]))):
+            lines.append(f"{self.name}{self._labels(labelvalues)} {_format(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labelvalues):
+        # Count per bucket (not cumulative) so each sample touches one slot
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labelvalues)
+            if series is None:
+                series = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            values = [(labelvalues, (list(counts), total, count))
+                      for labelvalues, (counts, total, count) in self._values.items()]
+
+        for labelvalues, (counts, total, count) in sorted(values, key=lambda item: tuple(map(str, item[0]))):
+            labels = self._labels(labelvalues)
+            prefix = labels[:-1] + ',' if labels else '{'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{prefix}le="{_format(bound)}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{labels} {_format(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def render():
+    """Return every metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# Metrics recorded across the app
+HTTP_REQUESTS = Counter(
+    'iseeyou_http_requests_total', 'API requests by endpoint, method and status code',
+    ('endpoint', 'method', 'status')
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'iseeyou_http_request_duration_seconds', 'Time to produce an API response (streams: until the first byte)',
+    ('endpoint',)
+)
+HTTP_IN_FLIGHT = Gauge('iseeyou_http_requests_in_flight', 'API requests currently being handled')
+
+# The upstream label is an upstream kind (dns, whois, rdap, targets, ...), never a raw hostname
+UPSTREAM_REQUESTS = Counter(
+    'iseeyou_upstream_requests_total', 'Outbound calls by upstream and outcome (success, failure, rejected)',
+    ('upstream', 'outcome')
+)
+UPSTREAM_DURATION = Histogram(
+    'iseeyou_upstream_request_duration_seconds', 'Outbound call latency by upstream, including rate limit waits',
+    ('upstream',)
+)
+UPSTREAM_IN_FLIGHT = Gauge('iseeyou_upstream_requests_in_flight', 'Outbound calls currently waiting on an upstream')
+
+CACHE_REQUESTS = Counter(
+    'iseeyou_cache_requests_total', 'Cache lookups by namespace and result (hit, miss)',
+    ('namespace', 'result')
+)
+
+WHOIS_SOURCES = Counter(
+    'iseeyou_whois_source_total', 'Domain WHOIS attempts by source and result',
+    ('source', 'result')
+)
+
+SUBDOMAIN_QUERIES = Counter(
+    'iseeyou_subdomain_queries_total', 'Subdomain enumeration queries by final outcome (found, wildcard, nxdomain, timeout, error)',
+    ('outcome',)
+)
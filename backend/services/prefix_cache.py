@@ -0,0 +1,274 @@
+import atexit
+import ipaddress
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from services.cache import CACHE_TTLS
+
+logger = logging.getLogger(__name__)
+
+# Network-level cache for IP RDAP results, persisted between restarts
+PREFIX_CACHE_PATH = os.environ.get(
+    'PREFIX_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'iseeyou-rdap-prefixes.sqlite3')
+)
+PREFIX_CACHE_MAX_ENTRIES = int(os.environ.get('PREFIX_CACHE_MAX_ENTRIES', 50000))
+PREFIX_CACHE_SAVE_INTERVAL = float(os.environ.get('PREFIX_CACHE_SAVE_INTERVAL', 30))  # Seconds between writes
+
+
+class _Node:
+    __slots__ = ('children', 'network')
+
+    def __init__(self):
+        self.children = [None, None]
+        self.network = None  # Set when a cached network ends at this node
+
+
+class PrefixCache:
+    """Longest-prefix-match cache of values keyed by network CIDR.
+
+    Networks are stored in a binary (radix-2) trie per address family, so a
+    lookup walks at most 32 or 128 bits and returns the most specific cached
+    network containing the address. Entries expire after a TTL, the least
+    recently used are evicted past max_entries. At most once per save_interval
+    the networks inserted since the last save are written to a SQLite table
+    shared by every worker, and the same save reads back only the rows other
+    workers have written since, so neither side touches unchanged entries.
+    """
+
+    def __init__(self, path=PREFIX_CACHE_PATH, max_entries=PREFIX_CACHE_MAX_ENTRIES,
+                 save_interval=PREFIX_CACHE_SAVE_INTERVAL):
+        self.path = path
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+        self._roots = {4: _Node(), 6: _Node()}
+        self._entries = OrderedDict()  # cidr -> (value, expires_at), least recently used first
+        self._lock = threading.Lock()
+        self._save_timer = None
+        self._dirty = set()  # Networks inserted since the last save
+        self._synced_seq = 0  # Last write sequence number read from the table
+        self._local = threading.local()
+        self._load()
+
+    def lookup(self, ip):
+        """Return the value cached for the most specific network containing ip, or None"""
+        address = ipaddress.ip_address(ip)
+        bits = int(address)
+        width = address.max_prefixlen
+
+        with self._lock:
+            node = self._roots[address.version]
+            best = node.network
+            for depth in range(width):
+                node = node.children[(bits >> (width - 1 - depth)) & 1]
+                if node is None:
+                    break
+                if node.network is not None:
+                    best = node.network
+
+            # Walk up to a shorter live prefix if the best match has expired
+            while best is not None:
+                entry = self._entries.get(best)
+                if entry is not None and entry[1] > time.time():
+                    self._entries.move_to_end(best)
+                    return entry[0]
+                self._remove(best)
+                best = self._parent_network(best)
+
+        return None
+
+    def insert(self, cidrs, value, ttl=None):
+        """Cache value for each network in cidrs"""
+        if ttl is None:
+            ttl = CACHE_TTLS['rdap']
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            for cidr in cidrs:
+                network = ipaddress.ip_network(cidr, strict=False)
+                self._insert(network, value, time.time() + ttl)
+                self._dirty.add(str(network))
+            self._evict()
+            self._schedule_save()
+
+    def _insert(self, network, value, expires_at):
+        cidr = str(network)
+        node = self._roots[network.version]
+        bits = int(network.network_address)
+        width = network.max_prefixlen
+        for depth in range(network.prefixlen):
+            bit = (bits >> (width - 1 - depth)) & 1
+            if node.children[bit] is None:
+                node.children[bit] = _Node()
+            node = node.children[bit]
+
+        node.network = cidr
+        self._entries[cidr] = (value, expires_at)
+        self._entries.move_to_end(cidr)
+
+    def _remove(self, cidr):
+        """Drop a network and prune trie branches that no longer lead anywhere"""
+        self._entries.pop(cidr, None)
+        network = ipaddress.ip_network(cidr)
+        bits = int(network.network_address)
+        width = network.max_prefixlen
+
+        path = [self._roots[network.version]]
+        for depth in range(network.prefixlen):
+            node = path[-1].children[(bits >> (width - 1 - depth)) & 1]
+            if node is None:
+                return
+            path.append(node)
+
+        path[-1].network = None
+        for depth in range(network.prefixlen, 0, -1):
+            node = path[depth]
+            if node.network is not None or node.children != [None, None]:
+                break
+            path[depth - 1].children[(bits >> (width - depth)) & 1] = None
+
+    def _parent_network(self, cidr):
+        """Return the most specific cached network strictly containing cidr"""
+        network = ipaddress.ip_network(cidr)
+        for prefixlen in range(network.prefixlen - 1, -1, -1):
+            parent = str(network.supernet(new_prefix=prefixlen))
+            if parent in self._entries:
+                return parent
+        return None
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _schedule_save(self):
+        # Coalesce bursts of inserts into one write
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_interval, self.save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                # seq orders writes across workers, so each one reads only what others saved since its last sync
+                "CREATE TABLE IF NOT EXISTS prefixes ("
+                "cidr TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, seq INTEGER NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS prefixes_seq ON prefixes (seq);"
+                "CREATE INDEX IF NOT EXISTS prefixes_expires ON prefixes (expires_at);"
+            )
+            self._local.conn = conn
+        return conn
+
+    def save(self):
+        """Write the networks inserted since the last save and read those other workers saved"""
+        with self._lock:
+            self._save_timer = None
+            dirty, self._dirty = self._dirty, set()
+            rows = [
+                (cidr, json.dumps(self._entries[cidr][0]), self._entries[cidr][1])
+                for cidr in dirty if cidr in self._entries
+            ]
+
+        now = time.time()
+        try:
+            conn = self._connection()
+            with conn:
+                # BEGIN IMMEDIATE takes the write lock, so seq numbers are handed out in order
+                conn.execute("BEGIN IMMEDIATE")
+                seq = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM prefixes").fetchone()[0]
+                conn.executemany(
+                    "INSERT INTO prefixes (cidr, value, expires_at, seq) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (cidr) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at, "
+                    "seq = excluded.seq WHERE excluded.expires_at > prefixes.expires_at",
+                    [row + (seq,) for row in rows]
+                )
+                found = conn.execute(
+                    "SELECT cidr, value, expires_at FROM prefixes WHERE seq > ? AND seq < ? AND expires_at > ?",
+                    (self._synced_seq, seq, now)
+                ).fetchall()
+                self._trim(conn, now)
+        except sqlite3.Error as e:
+            logger.warning("Failed to save prefix cache to %s: %s", self.path, e)
+            with self._lock:
+                self._dirty |= dirty
+            return
+
+        with self._lock:
+            # Pick up what other workers found since the last sync
+            for cidr, value, expires_at in found:
+                entry = self._entries.get(cidr)
+                if entry is None or entry[1] < expires_at:
+                    self._insert(ipaddress.ip_network(cidr), json.loads(value), expires_at)
+                    self._entries.move_to_end(cidr, last=entry is not None)
+            self._evict()
+            self._synced_seq = seq
+
+    def _trim(self, conn, now):
+        """Drop expired rows, then the soonest to expire past max_entries"""
+        conn.execute("DELETE FROM prefixes WHERE expires_at <= ?", (now,))
+        excess = conn.execute("SELECT COUNT(*) FROM prefixes").fetchone()[0] - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM prefixes WHERE cidr IN (SELECT cidr FROM prefixes ORDER BY expires_at LIMIT ?)",
+                (excess,)
+            )
+
+    def flush(self):
+        """Save now if inserts are waiting for the next scheduled save"""
+        with self._lock:
+            timer = self._save_timer
+        if timer is not None:
+            timer.cancel()
+            self.save()
+
+    def _load(self):
+        now = time.time()
+        try:
+            conn = self._connection()
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM prefixes").fetchone()[0]
+            rows = conn.execute(
+                "SELECT cidr, value, expires_at FROM prefixes WHERE expires_at > ? ORDER BY expires_at", (now,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning("Ignoring unreadable prefix cache %s: %s", self.path, e)
+            return
+
+        for cidr, value, expires_at in rows:
+            self._insert(ipaddress.ip_network(cidr), json.loads(value), expires_at)
+        self._evict()
+        self._synced_seq = seq
+
+
+_prefix_cache = None
+_prefix_cache_lock = threading.Lock()
+
+
+def get_prefix_cache():
+    """Return the process-wide prefix cache, loading it from disk on first use"""
+    global _prefix_cache
+    if _prefix_cache is None:
+        with _prefix_cache_lock:
+            if _prefix_cache is None:
+                _prefix_cache = PrefixCache()
+                atexit.register(_prefix_cache.flush)
+    return _prefix_cache
+
+
+def flush_prefix_cache():
+    """Write pending entries before the process exits (called from gunicorn's worker_exit hook)"""
+    if _prefix_cache is not None:
+        _prefix_cache.flush()
@@ -0,0 +1,48 @@
+import json
+import os
+
+from flask import Response, jsonify
+
+from services.concurrency import run_concurrently
+
+# Shared deadline (seconds) for all sections of a profile
+PROFILE_DEADLINE = float(os.environ.get('PROFILE_DEADLINE', 25))
+
+
+def profile_response(target_key, target, sections, stream=False, deadline=PROFILE_DEADLINE):
+    """Run every section lookup for a target concurrently under one deadline.
+
+    sections maps a section name to a function taking the target. By
+    default the response is a single JSON document with whatever finished
+    before the deadline; with stream=True each section is sent as an
+    NDJSON line as soon as it completes.
+    """
+    names = list(sections)
+
+    def run(name):
+        return sections[name](target)
+
+    results = run_concurrently(run, names, max_workers=len(names), deadline=deadline)
+
+    if stream:
+        def generate():
+            for name, result, error in results:
+                line = {"section": name}
+                if error is None:
+                    line["result"] = result
+                else:
+                    line["error"] = str(error)
+                yield json.dumps(line, default=str) + "\n"
+
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    profile = {target_key: target, "sections": {}, "errors": {}}
+    for name, result, error in results:
+        if error is None:
+            profile["sections"][name] = result
+        else:
+            profile["errors"][name] = str(error)
+
+    # Partial results are still returned when some sections failed or timed out
+    profile["complete"] = not profile["errors"]
+    return jsonify(profile)
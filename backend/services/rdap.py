@@ -0,0 +1,218 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from services import http_client
+
+logger = logging.getLogger(__name__)
+
+# IANA bootstrap registry mapping TLDs to their RDAP servers (RFC 9224)
+RDAP_BOOTSTRAP_URL = os.environ.get('RDAP_BOOTSTRAP_URL', 'https://data.iana.org/rdap/dns.json')
+http_client.register_host(RDAP_BOOTSTRAP_URL, 'rdap')
+RDAP_BOOTSTRAP_PATH = os.environ.get(
+    'RDAP_BOOTSTRAP_PATH', os.path.join(tempfile.gettempdir(), 'iseeyou-rdap-dns.json')
+)
+RDAP_BOOTSTRAP_REFRESH = int(os.environ.get('RDAP_BOOTSTRAP_REFRESH', 86400))  # Seconds between refreshes
+RDAP_BOOTSTRAP_RETRY = int(os.environ.get('RDAP_BOOTSTRAP_RETRY', 300))  # Wait after a failed download
+RDAP_TIMEOUT = float(os.environ.get('RDAP_TIMEOUT', 10))
+
+RDAP_HEADERS = {"Accept": "application/rdap+json, application/json"}
+
+_servers = None  # tld -> base URL
+_loaded_at = 0
+_refreshing = False  # A download is running
+_retry_at = 0  # No download before this time, after one failed
+_lock = threading.Lock()
+
+
+def _parse_bootstrap(data):
+    """Build a TLD -> base URL map from a bootstrap document, preferring HTTPS servers.
+
+    Every registry server listed is registered as an upstream of its own.
+    """
+    servers = {}
+    for tlds, urls in data.get("services", []):
+        urls = sorted(urls, key=lambda url: not url.startswith('https://'))
+        if not urls:
+            continue
+        base = urls[0] if urls[0].endswith('/') else urls[0] + '/'
+        http_client.register_host(base, 'rdap')
+        for tld in tlds:
+            servers[tld.lower()] = base
+    return servers
+
+
+def _load_local():
+    """Load the bootstrap file saved by a previous refresh, if any"""
+    try:
+        with open(RDAP_BOOTSTRAP_PATH) as f:
+            servers = _parse_bootstrap(json.load(f))
+        return servers, os.path.getmtime(RDAP_BOOTSTRAP_PATH)
+    except (OSError, ValueError):
+        return None, 0
+
+
+def _download():
+    """Fetch the bootstrap file from IANA and save it for other workers and restarts"""
+    response = http_client.get(RDAP_BOOTSTRAP_URL, timeout=RDAP_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+    servers = _parse_bootstrap(data)
+
+    # Write atomically so a concurrent reader never sees a partial file
+    tmp_path = f"{RDAP_BOOTSTRAP_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, RDAP_BOOTSTRAP_PATH)
+    return servers
+
+
+def _refresh():
+    """Download the bootstrap map, or hold off further attempts for a while if that fails"""
+    global _servers, _loaded_at, _refreshing, _retry_at
+    try:
+        servers = _download()
+        with _lock:
+            _servers, _loaded_at = servers, time.time()
+    except Exception as e:
+        logger.warning("RDAP bootstrap download failed, retrying in %ss: %s", RDAP_BOOTSTRAP_RETRY, e)
+        with _lock:
+            _retry_at = time.time() + RDAP_BOOTSTRAP_RETRY
+    finally:
+        with _lock:
+            _refreshing = False
+
+
+def get_servers():
+    """Return the TLD -> RDAP server map, loading or refreshing it as needed.
+
+    Raises if there is no map yet, so the caller can fall back to WHOIS
+    instead of waiting on IANA.
+    """
+    global _servers, _loaded_at, _refreshing
+
+    download = False
+    with _lock:
+        if _servers is None:
+            _servers, _loaded_at = _load_local()
+
+        can_download = not _refreshing and time.time() >= _retry_at
+        if _servers is None:
+            if not can_download:
+                raise Exception("RDAP bootstrap file is not available yet")
+            # Nothing on disk yet; this lookup downloads it (outside the lock, so
+            # concurrent lookups fall through to WHOIS instead of queueing behind it)
+            _refreshing = download = True
+        elif time.time() - _loaded_at > RDAP_BOOTSTRAP_REFRESH and can_download:
+            # Keep serving the stale map while a fresh copy downloads
+            _refreshing = True
+            threading.Thread(target=_refresh, daemon=True).start()
+
+        servers = _servers
+
+    if download:
+        _refresh()
+        servers = _servers
+        if servers is None:
+            raise Exception("RDAP bootstrap file could not be downloaded")
+    return servers
+
+
+def server_for(domain):
+    """Return the RDAP base URL for a domain, or None if its TLD has no RDAP service"""
+    servers = get_servers()
+    labels = domain.lower().rstrip('.').split('.')
+
+    # Longest registered suffix wins
+    for i in range(len(labels)):
+        server = servers.get('.'.join(labels[i:]))
+        if server:
+            return server
+    return None
+
+
+def lookup_domain(domain):
+    """Look up a domain over RDAP and return it in the same shape as WHOIS data"""
+    server = server_for(domain)
+    if not server:
+        raise Exception(f"No RDAP server for {domain}")
+
+    url = f"{server}domain/{domain}"
+    response = http_client.get(url, headers=RDAP_HEADERS, timeout=RDAP_TIMEOUT)
+    if response.status_code == 404:
+        raise Exception(f"{domain} not found in RDAP")
+    response.raise_for_status()
+
+    whois_data = parse_domain(response.json())
+    whois_data["source"] = f"RDAP ({server})"
+    return whois_data
+
+
+def parse_domain(data):
+    """Map an RDAP domain object onto the WHOIS field names used by the frontend"""
+    events = {event.get("eventAction"): event.get("eventDate") for event in data.get("events", [])}
+
+    registrar = None
+    org = None
+    emails = []
+    for entity in _walk_entities(data.get("entities", [])):
+        card = _vcard(entity)
+        roles = entity.get("roles", [])
+        if "registrar" in roles and registrar is None:
+            registrar = card.get("fn")
+        if "registrant" in roles and org is None:
+            org = card.get("org") or card.get("fn")
+        for email in card.get("email", []):
+            email = email.lower()
+            if email not in emails:
+                emails.append(email)
+
+    secure_dns = data.get("secureDNS") or {}
+    dnssec = None
+    if "delegationSigned" in secure_dns:
+        dnssec = "signedDelegation" if secure_dns["delegationSigned"] else "unsigned"
+
+    return {
+        "domain_name": (data.get("ldhName") or "").lower() or None,
+        "registrar": registrar,
+        "creation_date": events.get("registration"),
+        "expiration_date": events.get("expiration"),
+        "updated_date": events.get("last changed"),
+        "name_servers": [ns["ldhName"].lower() for ns in data.get("nameservers", []) if ns.get("ldhName")],
+        "status": data.get("status", []),
+        "emails": emails,
+        "dnssec": dnssec,
+        "org": org
+    }
+
+
+def _walk_entities(entities):
+    """Yield entities and their nested entities (e.g. a registrar's abuse contact)"""
+    for entity in entities:
+        yield entity
+        yield from _walk_entities(entity.get("entities", []))
+
+
+def _vcard(entity):
+    """Pull fn, org and email out of an entity's jCard"""
+    card = {"email": []}
+    vcard_array = entity.get("vcardArray") or []
+    if len(vcard_array) < 2:
+        return card
+
+    for prop in vcard_array[1]:
+        if len(prop) < 4:
+            continue
+        name, value = prop[0], prop[3]
+        if isinstance(value, list):
+            value = " ".join(str(part) for part in value if part)
+        if not value:
+            continue
+        if name == "email":
+            card["email"].append(value)
+        elif name in ("fn", "org") and name not in card:
+            card[name] = value
+    return card
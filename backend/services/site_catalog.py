@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from urllib.parse import urljoin
+
+from services import http_client
+
+logger = logging.getLogger(__name__)
+
+# Sherlock-style data.json describing the sites to check (Sherlock's own file works too)
+USERNAME_SITES_PATH = os.environ.get(
+    'USERNAME_SITES_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'sites.json')
+)
+
+# Most "not found" messages appear near the top of a page; stop reading after this many bytes
+USERNAME_MAX_BODY_BYTES = int(os.environ.get('USERNAME_MAX_BODY_BYTES', 512 * 1024))
+CHUNK_SIZE = 16 * 1024
+
+# HEAD is given up on at once for these statuses, which say the method is not
+# implemented; other rejections (400, 403) may be rate limiting or bot checks,
+# so HEAD is only given up after this many in a row. Either way it is tried
+# again after USERNAME_HEAD_RETRY_AFTER seconds.
+HEAD_UNSUPPORTED_STATUSES = frozenset([405, 501])
+USERNAME_HEAD_FAILURES = int(os.environ.get('USERNAME_HEAD_FAILURES', 3))
+USERNAME_HEAD_RETRY_AFTER = float(os.environ.get('USERNAME_HEAD_RETRY_AFTER', 3600))
+
+DETECTION_TYPES = ('status_code', 'message', 'response_url')
+
+
+class Site:
+    """One catalog entry with its URL template and detection rules precompiled"""
+
+    __slots__ = (
+        'name', 'url_main', 'url_parts', 'probe_parts', 'method', 'headers',
+        'error_types', 'error_codes', 'error_pattern', 'error_url', 'username_regex',
+        'head_failures', 'head_disabled_until', '_head_lock'
+    )
+
+    def __init__(self, name, entry):
+        self.name = name
+        self.url_main = entry.get("urlMain")
+
+        # Split templates once so building a URL is a single join
+        self.url_parts = entry["url"].split("{}")
+        self.probe_parts = entry.get("urlProbe", entry["url"]).split("{}")
+
+        error_types = entry.get("errorType", "status_code")
+        self.error_types = tuple(error_types if isinstance(error_types, list) else [error_types])
+        for error_type in self.error_types:
+            if error_type not in DETECTION_TYPES:
+                raise ValueError(f"unsupported errorType {error_type!r}")
+
+        error_codes = entry.get("errorCode")
+        if isinstance(error_codes, int):
+            error_codes = [error_codes]
+        self.error_codes = frozenset(error_codes or ())
+
+        # errorMsg holds literal strings (as in Sherlock); errorRegex a regular expression
+        patterns = []
+        error_msgs = entry.get("errorMsg") or []
+        for message in error_msgs if isinstance(error_msgs, list) else [error_msgs]:
+            patterns.append(re.escape(message.encode('utf-8')))
+        if entry.get("errorRegex"):
+            patterns.append(entry["errorRegex"].encode('utf-8'))
+        self.error_pattern = re.compile(b'|'.join(patterns)) if patterns else None
+        if 'message' in self.error_types and self.error_pattern is None:
+            raise ValueError("errorType 'message' needs errorMsg or errorRegex")
+
+        # A relative errorUrl is on the site's own host
+        self.error_url = urljoin(entry["url"], entry["errorUrl"]) if entry.get("errorUrl") else None
+        self.username_regex = re.compile(entry["regexCheck"]) if entry.get("regexCheck") else None
+        self.headers = entry.get("headers")
+
+        # No request_method means HEAD first, unless the body has to be read
+        self.method = entry.get("request_method")
+        if self.method:
+            self.method = self.method.upper()
+        elif 'message' in self.error_types:
+            self.method = 'GET'
+        if self.method == 'HEAD' and 'message' in self.error_types:
+            raise ValueError("errorType 'message' cannot use HEAD")
+        self.head_failures = 0
+        self.head_disabled_until = 0
+        self._head_lock = threading.Lock()  # Concurrent searches share the Site
+
+    def url_for(self, username):
+        return username.join(self.url_parts)
+
+    def accepts(self, username):
+        """Return False if the site could never have an account with this name"""
+        return self.username_regex is None or self.username_regex.search(username) is not None
+
+    def check(self, username):
+        """Probe the site and report whether a profile exists for username"""
+        url = self.url_for(username)
+        if not self.accepts(username):
+            return {
+                "site": self.name,
+                "url": url,
+                "exists": False,
+                "error": "Username is not valid on this site"
+            }
+
+        probe_url = username.join(self.probe_parts)
+
+        # Redirects are the signal for response_url sites, so they are only
+        # followed when there is an errorUrl to compare the final URL with
+        allow_redirects = 'response_url' not in self.error_types or bool(self.error_url)
+
+        response = None
+        if self.method is None and time.monotonic() >= self.head_disabled_until:
+            response = http_client.head(probe_url, headers=self.headers, allow_redirects=allow_redirects,
+                                        retries=False, target=True)
+            if response.status_code in http_client.HEAD_FALLBACK_STATUSES:
+                self._head_rejected(response.status_code)
+                response = None
+            else:
+                with self._head_lock:
+                    self.head_failures = 0
+
+        if response is not None:
+            exists = self.detect(response)
+        else:
+            with http_client.request(
+                self.method or 'GET',
+                probe_url,
+                headers=self.headers,
+                stream=True,
+                allow_redirects=allow_redirects,
+                retries=False,
+                target=True
+            ) as response:
+                exists = self.detect(response)
+
+        return {
+            "site": self.name,
+            "url": url,
+            "exists": exists,
+            "status_code": response.status_code
+        }
+
+    def _head_rejected(self, status):
+        """Count a rejected HEAD; go straight to GET for a while once the site clearly does not support it"""
+        with self._head_lock:
+            self.head_failures += 1
+            if status in HEAD_UNSUPPORTED_STATUSES or self.head_failures >= USERNAME_HEAD_FAILURES:
+                self.head_failures = 0
+                self.head_disabled_until = time.monotonic() + USERNAME_HEAD_RETRY_AFTER
+
+    def detect(self, response):
+        """Apply every detection rule; the profile exists only if none says otherwise"""
+        status = response.status_code
+
+        for error_type in self.error_types:
+            if error_type == 'status_code':
+                # errorCode names extra "absent" codes (e.g. a 200 soft-404); any non-2xx still means absent
+                if status in self.error_codes or not 200 <= status < 300:
+                    return False
+
+            elif error_type == 'response_url':
+                # Without errorUrl any redirect means absent; with it, redirects were
+                # followed and landing on errorUrl means absent
+                if not 200 <= status < 300 or (self.error_url and response.url.startswith(self.error_url)):
+                    return False
+
+            elif error_type == 'message':
+                if status >= 400 or self._body_matches(response):
+                    return False
+
+        return True
+
+    def _body_matches(self, response):
+        """Search the body for the error pattern, reading only as far as needed"""
+        # Keep a tail of the previous chunk so matches spanning two chunks are found
+        overlap = 1024
+        tail = b''
+        read = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            window = tail + chunk
+            if self.error_pattern.search(window):
+                return True
+            read += len(chunk)
+            if read >= USERNAME_MAX_BODY_BYTES:
+                break
+            tail = window[-overlap:]
+        return False
+
+
+def load_catalog(path=USERNAME_SITES_PATH):
+    """Load and precompile the site catalog, skipping entries that cannot be used"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    sites = []
+    for name, entry in data.items():
+        # Sherlock's file carries a "$schema" key alongside the sites
+        if name.startswith('$') or not isinstance(entry, dict):
+            continue
+        if entry.get("request_payload"):
+            logger.warning("Skipping site %s: request payloads are not supported", name)
+            continue
+        try:
+            sites.append(Site(name, entry))
+        except (KeyError, ValueError, re.error) as e:
+            logger.warning("Skipping site %s: %s", name, e)
+    return sites
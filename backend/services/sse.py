@@ -0,0 +1,42 @@
+import json
+
+from flask import Response
+
+from services.concurrency import run_concurrently, MAX_WORKERS
+from services.profile import PROFILE_DEADLINE
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def stream_events(tasks, deadline=PROFILE_DEADLINE, max_workers=MAX_WORKERS):
+    """Run named zero-argument tasks concurrently and stream each result as an SSE event.
+
+    Every finished task produces a "result" event with its section name and
+    either a result or an error; a final "done" event reports the totals.
+    """
+    names = list(tasks)
+
+    def generate():
+        failed = 0
+        for name, result, error in run_concurrently(lambda name: tasks[name](), names, max_workers, deadline):
+            payload = {"section": name}
+            if error is None:
+                payload["result"] = result
+            else:
+                payload["error"] = str(error)
+                failed += 1
+            yield sse_event('result', payload)
+
+        yield sse_event('done', {"total": len(names), "failed": failed})
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Stop reverse proxies from buffering the stream
+        }
+    )
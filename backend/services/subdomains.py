@@ -0,0 +1,366 @@
+import os
+import random
+import re
+import select
+import socket
+import string
+import struct
+import time
+from collections import OrderedDict
+from itertools import islice
+
+import dns.exception
+import dns.message
+import dns.name
+import dns.rcode
+import dns.rdatatype
+
+from services import dns_resolver, upstream
+from services.metrics import SUBDOMAIN_QUERIES
+
+# Queries in flight at once: start here and adapt between the bounds
+SUBDOMAIN_INITIAL_CONCURRENCY = int(os.environ.get('SUBDOMAIN_INITIAL_CONCURRENCY', 200))
+SUBDOMAIN_MIN_CONCURRENCY = int(os.environ.get('SUBDOMAIN_MIN_CONCURRENCY', 10))
+SUBDOMAIN_MAX_CONCURRENCY = int(os.environ.get('SUBDOMAIN_MAX_CONCURRENCY', 2000))
+SUBDOMAIN_CONCURRENCY_STEP = int(os.environ.get('SUBDOMAIN_CONCURRENCY_STEP', 20))  # Additive increase
+
+# Halve the concurrency when more than this fraction of queries in a window time out
+SUBDOMAIN_TARGET_TIMEOUT_RATE = float(os.environ.get('SUBDOMAIN_TARGET_TIMEOUT_RATE', 0.05))
+
+SUBDOMAIN_TIMEOUT = float(os.environ.get('SUBDOMAIN_TIMEOUT', 2))  # Per attempt
+SUBDOMAIN_RETRIES = int(os.environ.get('SUBDOMAIN_RETRIES', 2))  # After timeouts and SERVFAIL
+SUBDOMAIN_DEADLINE = float(os.environ.get('SUBDOMAIN_DEADLINE', 600))  # Wall-clock limit per enumeration
+
+# Queries per second sent by this worker, shared by every running enumeration,
+# so a large wordlist cannot flood the resolvers the rest of the API relies on
+SUBDOMAIN_MAX_QPS = float(os.environ.get('SUBDOMAIN_MAX_QPS', 1000))
+upstream.register('dns-enumeration', SUBDOMAIN_MAX_QPS, SUBDOMAIN_MAX_QPS)
+
+# Wordlists are either sent with the request or named files in the wordlist directory
+SUBDOMAIN_WORDLIST_DIR = os.environ.get(
+    'SUBDOMAIN_WORDLIST_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'wordlists')
+)
+SUBDOMAIN_DEFAULT_WORDLIST = os.environ.get('SUBDOMAIN_DEFAULT_WORDLIST', 'subdomains')
+SUBDOMAIN_MAX_LABELS = int(os.environ.get('SUBDOMAIN_MAX_LABELS', 1000000))
+
+# Random labels probed to detect wildcard DNS
+WILDCARD_PROBES = 3
+
+SOCKET_BUFFER_BYTES = 4 * 1024 * 1024
+
+
+def load_wordlist(wordlist=None):
+    """Return an iterable of labels from a list sent by the client or the name of a bundled wordlist.
+
+    Named wordlists are read lazily, so large files are never held in memory.
+    Raises ValueError with a message suitable for a 400 response.
+    """
+    if wordlist is None:
+        wordlist = SUBDOMAIN_DEFAULT_WORDLIST
+
+    if isinstance(wordlist, list):
+        if not all(isinstance(label, str) for label in wordlist):
+            raise ValueError("Wordlist entries must be strings")
+        if len(wordlist) > SUBDOMAIN_MAX_LABELS:
+            raise ValueError(f"At most {SUBDOMAIN_MAX_LABELS} labels are allowed per enumeration")
+        return wordlist
+
+    if not isinstance(wordlist, str) or not re.fullmatch(r'[\w-]+', wordlist):
+        raise ValueError("Wordlist must be a list of labels or the name of a bundled wordlist")
+
+    path = os.path.join(SUBDOMAIN_WORDLIST_DIR, wordlist + '.txt')
+    if not os.path.isfile(path):
+        raise ValueError(f"Unknown wordlist: {wordlist}. Available: {', '.join(available_wordlists())}")
+
+    def read():
+        with open(path, encoding='utf-8', errors='replace') as f:
+            yield from islice(f, SUBDOMAIN_MAX_LABELS)
+
+    return read()
+
+
+def available_wordlists():
+    if not os.path.isdir(SUBDOMAIN_WORDLIST_DIR):
+        return []
+    return sorted(name[:-4] for name in os.listdir(SUBDOMAIN_WORDLIST_DIR) if name.endswith('.txt'))
+
+
+def _query_wire(query_id, wire_name):
+    """A recursive IN A query, packed directly (much cheaper than building a dns.message per name)"""
+    return struct.pack('>HHHHHH', query_id, 0x0100, 1, 0, 0, 0) + wire_name + b'\x00\x01\x00\x01'
+
+
+class _Query:
+    __slots__ = ('label', 'qname', 'wire_name', 'attempts', 'sent_at')
+
+    def __init__(self, label, qname):
+        self.label = label
+        self.qname = qname
+        self.wire_name = qname.to_wire()
+        self.attempts = 0
+        self.sent_at = 0
+
+
+class AIMDWindow:
+    """Additive-increase, multiplicative-decrease limit on queries in flight.
+
+    Every time a window's worth of queries (the current limit) has finished,
+    the limit grows by step if few of them timed out, or halves if more than
+    target_timeout_rate did.
+    """
+
+    def __init__(self, initial=SUBDOMAIN_INITIAL_CONCURRENCY, minimum=SUBDOMAIN_MIN_CONCURRENCY,
+                 maximum=SUBDOMAIN_MAX_CONCURRENCY, step=SUBDOMAIN_CONCURRENCY_STEP,
+                 target_timeout_rate=SUBDOMAIN_TARGET_TIMEOUT_RATE):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.step = step
+        self.target_timeout_rate = target_timeout_rate
+        self.limit = max(minimum, min(initial, maximum))
+        self._finished = 0
+        self._timeouts = 0
+
+    def record(self, timed_out):
+        self._finished += 1
+        self._timeouts += timed_out
+        if self._finished < self.limit:
+            return
+
+        if self._timeouts / self._finished > self.target_timeout_rate:
+            self.limit = max(self.minimum, self.limit // 2)
+        else:
+            self.limit = min(self.maximum, self.limit + self.step)
+        self._finished = self._timeouts = 0
+
+
+class SubdomainEnumerator:
+    """Brute-force subdomains of one domain with pipelined A queries over a single UDP socket.
+
+    Queries are sent without waiting for earlier answers, up to an adaptive
+    number in flight, and matched to responses by message ID and name.
+    Iterating yields a dict per name that exists, as soon as it is found;
+    names whose answers only repeat the wildcard records are skipped.
+    """
+
+    def __init__(self, domain, labels, nameservers=None, port=None, timeout=SUBDOMAIN_TIMEOUT,
+                 retries=SUBDOMAIN_RETRIES, window=None, deadline=SUBDOMAIN_DEADLINE):
+        self.domain = dns.name.from_text(domain)
+        self.labels = labels
+        self.nameservers = nameservers or dns_resolver.get_resolver().nameservers
+        self.port = port or dns_resolver.DNS_PORT
+        self.timeout = timeout
+        self.retries = retries
+        self.window = window or AIMDWindow()
+        self.deadline = deadline
+        self.rate_limit = upstream.get_upstream('dns-enumeration').bucket
+        self.wildcard = None  # Set of wildcard answers, or empty if the domain has no wildcard
+        self.stats = {"queries": 0, "answers": 0, "timeouts": 0, "retries": 0, "errors": 0, "found": 0,
+                      "wildcard_filtered": 0, "invalid_labels": 0, "deadline_exceeded": False}
+
+    def __iter__(self):
+        self.started = time.monotonic()
+        self.deadline_at = self.started + self.deadline
+
+        # One socket per address family, so IPv4 and IPv6 nameservers can be mixed
+        sockets = {}
+        try:
+            for nameserver in self.nameservers:
+                family = socket.AF_INET6 if ':' in nameserver else socket.AF_INET
+                if family not in sockets:
+                    sock = sockets[family] = socket.socket(family, socket.SOCK_DGRAM)
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_BYTES)
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_BYTES)
+                    sock.setblocking(False)
+            servers = [
+                (sockets[socket.AF_INET6 if ':' in nameserver else socket.AF_INET], (nameserver, self.port))
+                for nameserver in self.nameservers
+            ]
+
+            self.wildcard = self._detect_wildcard(servers)
+            yield from self._run(servers, iter(self.labels))
+        finally:
+            for sock in sockets.values():
+                sock.close()
+            self.stats["elapsed"] = round(time.monotonic() - self.started, 3)
+
+    def _detect_wildcard(self, servers):
+        """Resolve random labels; anything they resolve to is what every name resolves to"""
+        labels = [''.join(random.choices(string.ascii_lowercase + string.digits, k=16)) for _ in range(WILDCARD_PROBES)]
+        answers = set()
+        for result in self._run(servers, iter(labels), probing=True):
+            answers.update(result["records"] or ['NODATA'])
+        return answers
+
+    def _run(self, servers, labels, probing=False):
+        """Resolve labels through (socket, address) servers in turn; probing skips wildcard filtering and metrics"""
+        sockets = list({id(sock): sock for sock, _ in servers}.values())
+        in_flight = OrderedDict()  # Message ID -> query, oldest send first
+        retry_queue = []
+        free_ids = list(range(65536))
+        random.shuffle(free_ids)
+        next_server = 0
+        exhausted = False
+
+        while True:
+            if time.monotonic() >= self.deadline_at:
+                self.stats["deadline_exceeded"] = True
+                return
+
+            # Fill the window: retries first, then new labels, as fast as the rate limit allows
+            throttled = 0
+            while len(in_flight) < self.window.limit and (retry_queue or not exhausted):
+                throttled = self.rate_limit.reserve()
+                if throttled > 0:
+                    self.rate_limit.refund()
+                    break
+
+                if retry_queue:
+                    query = retry_queue.pop()
+                else:
+                    label = next(labels, None)
+                    if label is None:
+                        exhausted = True
+                        self.rate_limit.refund()
+                        break
+                    query = self._make_query(label)
+                    if query is None:
+                        self.rate_limit.refund()
+                        continue
+
+                query_id = free_ids.pop()
+                sock, address = servers[next_server % len(servers)]
+                next_server += 1
+                try:
+                    sock.sendto(_query_wire(query_id, query.wire_name), address)
+                except BlockingIOError:
+                    # Send buffer full: put the query back and read answers first
+                    free_ids.append(query_id)
+                    retry_queue.append(query)
+                    self.rate_limit.refund()
+                    break
+                query.attempts += 1
+                query.sent_at = time.monotonic()
+                in_flight[query_id] = query
+                self.stats["queries"] += 1
+
+            if not in_flight:
+                if exhausted and not retry_queue:
+                    return
+                if throttled:
+                    time.sleep(min(throttled, max(0, self.deadline_at - time.monotonic())))
+                continue
+
+            # Wait for answers until the oldest query times out (or more may be sent, or time is up)
+            oldest = next(iter(in_flight.values()))
+            wait = max(0, min(oldest.sent_at + self.timeout, self.deadline_at) - time.monotonic())
+            if throttled:
+                wait = min(wait, throttled)
+            readable, _, _ = select.select(sockets, [], [], wait)
+
+            for sock in readable:
+                for result in self._receive(sock, in_flight, free_ids, retry_queue, probing):
+                    yield result
+
+            # Expire queries that have waited too long (in_flight is in send order)
+            now = time.monotonic()
+            while in_flight:
+                query_id, query = next(iter(in_flight.items()))
+                if query.sent_at + self.timeout > now:
+                    break
+                del in_flight[query_id]
+                free_ids.append(query_id)
+                self.stats["timeouts"] += 1
+                self.window.record(timed_out=True)
+                self._retry_or_drop(query, retry_queue, 'timeout', probing)
+
+    def _make_query(self, label):
+        label = label.strip().lower().rstrip('.')
+        if not label or label.startswith('#'):
+            return None
+        try:
+            return _Query(label, dns.name.from_text(label, origin=self.domain))
+        except (dns.exception.DNSException, UnicodeError, ValueError):
+            self.stats["invalid_labels"] += 1
+            return None
+
+    def _receive(self, sock, in_flight, free_ids, retry_queue, probing):
+        """Read every datagram waiting on the socket"""
+        while True:
+            try:
+                data, _ = sock.recvfrom(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # ICMP errors (e.g. port unreachable) surface here on some platforms
+                return
+
+            try:
+                response = dns.message.from_wire(data, ignore_trailing=True)
+            except dns.exception.DNSException:
+                continue
+
+            query = in_flight.get(response.id)
+            # Ignore late answers to retried queries and anything we did not ask
+            if query is None or not response.question or response.question[0].name.to_wire() != query.wire_name:
+                continue
+            del in_flight[response.id]
+            free_ids.append(response.id)
+            self.stats["answers"] += 1
+            self.window.record(timed_out=False)
+
+            rcode = response.rcode()
+            if rcode == dns.rcode.NXDOMAIN:
+                if not probing:
+                    SUBDOMAIN_QUERIES.inc('nxdomain')
+                continue
+            if rcode != dns.rcode.NOERROR:
+                self._retry_or_drop(query, retry_queue, 'error', probing)
+                continue
+
+            result = self._result(query, response)
+            if probing:
+                yield result
+                continue
+            if self.wildcard and set(result["records"] or ['NODATA']) <= self.wildcard:
+                self.stats["wildcard_filtered"] += 1
+                SUBDOMAIN_QUERIES.inc('wildcard')
+                continue
+            self.stats["found"] += 1
+            SUBDOMAIN_QUERIES.inc('found')
+            yield result
+
+    def _retry_or_drop(self, query, retry_queue, outcome, probing=False):
+        if query.attempts <= self.retries:
+            self.stats["retries"] += 1
+            retry_queue.append(query)
+        else:
+            self.stats["errors"] += 1
+            if not probing:
+                SUBDOMAIN_QUERIES.inc(outcome)
+
+    def _result(self, query, response):
+        records = []
+        cname = None
+        for rrset in response.answer:
+            if rrset.rdtype == dns.rdatatype.A:
+                records.extend(rdata.to_text() for rdata in rrset)
+            elif rrset.rdtype == dns.rdatatype.CNAME and cname is None:
+                cname = rrset[0].target.to_text()
+
+        result = {
+            "subdomain": query.qname.to_text(omit_final_dot=True),
+            "records": sorted(records)
+        }
+        if cname:
+            result["cname"] = cname
+        return result
+
+    def summary(self):
+        elapsed = self.stats.get("elapsed") or (time.monotonic() - self.started)
+        return dict(
+            self.stats,
+            wildcard=sorted(self.wildcard) if self.wildcard else [],
+            concurrency=self.window.limit,
+            queries_per_second=round(self.stats["queries"] / elapsed, 1) if elapsed else None
+        )
@@ -0,0 +1,288 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from services.metrics import UPSTREAM_REQUESTS, UPSTREAM_DURATION, UPSTREAM_IN_FLIGHT
+
+# Default token bucket per known upstream: sustained requests/second and burst size
+UPSTREAM_RATE = float(os.environ.get('UPSTREAM_RATE', 5))
+UPSTREAM_BURST = int(os.environ.get('UPSTREAM_BURST', 10))
+
+# Hosts that are lookup targets (username sites, probed domains) rather than
+# configured upstreams share one bucket and have no circuit breaker
+UPSTREAM_TARGETS_RATE = float(os.environ.get('UPSTREAM_TARGETS_RATE', 50))
+UPSTREAM_TARGETS_BURST = int(os.environ.get('UPSTREAM_TARGETS_BURST', 100))
+TARGETS = 'targets'
+UPSTREAM_MAX_WAIT = float(os.environ.get('UPSTREAM_MAX_WAIT', 10))  # Fail instead of queueing longer than this
+
+# Circuit breaker: open after this many consecutive failures, retry after the reset timeout
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', 5))
+BREAKER_RESET_TIMEOUT = float(os.environ.get('BREAKER_RESET_TIMEOUT', 30))
+
+# Known limits that differ from the default (rate, burst)
+UPSTREAM_LIMITS = {
+    "dns": (200, 400),  # Configured recursive resolvers
+    "ip-api.com": (0.25, 15),  # Batch endpoint allows 15 requests/minute
+    "ipwhois": (10, 20),  # RIR RDAP servers reached through the ipwhois library
+    "haveibeenpwned.com": (10 / 60, 10),  # Lowest HIBP subscription: 10 requests/minute
+}
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream whose breaker is open or whose rate limit is exhausted"""
+
+
+class TokenBucket:
+    """Allow rate calls per second on average, with bursts of up to burst calls"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how long to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # Tokens may go negative: each waiter reserves the next future token
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0
+            return -self._tokens / self.rate
+
+    def refund(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    @property
+    def tokens(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._updated
+            return min(self.burst, self._tokens + elapsed * self.rate)
+
+
+class CircuitBreaker:
+    """Stop calling an upstream after repeated failures until a trial call succeeds"""
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self._opened_at = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go ahead"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+
+            # Half open: let exactly one trial call through
+            if self.state == 'half_open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """End a call without a verdict, so a half-open breaker can let another trial through"""
+        with self._lock:
+            self._trial_running = False
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a trial call through"""
+        with self._lock:
+            if self.state != 'open':
+                return 0
+            return max(0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+
+class NullBreaker:
+    """Breaker for the shared targets upstream, which must never open because one site is down"""
+    state = 'closed'
+    failures = 0
+
+    def allow(self):
+        return True
+
+    def record_success(self):
+        pass
+
+    def record_failure(self):
+        pass
+
+    def release(self):
+        pass
+
+    def retry_in(self):
+        return 0
+
+
+class Upstream:
+    """Rate limit and circuit breaker for one upstream host"""
+
+    def __init__(self, name, rate, burst, breaker=None, label=None):
+        self.name = name
+        self.label = label or name  # Metrics label, shared by upstreams of the same kind
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker()
+
+    def acquire(self, max_wait=None):
+        """Wait for a rate limit token, or raise UpstreamUnavailable straight away"""
+        delay = self.bucket.reserve()
+        if delay > (UPSTREAM_MAX_WAIT if max_wait is None else min(max_wait, UPSTREAM_MAX_WAIT)):
+            self.bucket.refund()
+            raise UpstreamUnavailable(f"Rate limit for {self.name} exceeded")
+
+        if not self.breaker.allow():
+            self.bucket.refund()
+            raise UpstreamUnavailable(
+                f"{self.name} is failing; retrying in {self.breaker.retry_in():.0f}s"
+            )
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def status(self):
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "tokens": round(self.bucket.tokens, 2)
+        }
+
+
+class _Attempt:
+    """Lets a guarded block report a failure that did not raise (e.g. an HTTP 503)"""
+    __slots__ = ('failed',)
+
+    def __init__(self):
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+
+_upstreams = {TARGETS: Upstream(TARGETS, UPSTREAM_TARGETS_RATE, UPSTREAM_TARGETS_BURST, NullBreaker())}
+_registered = {}  # name -> (rate, burst, label) of upstreams configured outside UPSTREAM_LIMITS
+_upstreams_lock = threading.Lock()
+
+
+def register(name, rate=None, burst=None, label=None):
+    """Give a configured upstream (an API host, a registry server) its own limiter and breaker.
+
+    Limits in UPSTREAM_LIMITS take precedence; the first registration of a
+    name wins. Names that are never registered share the targets upstream.
+    label groups the upstream's metrics with others of its kind (e.g. every
+    registry WHOIS server under "whois") so hostnames never become labels.
+    """
+    if name:
+        with _upstreams_lock:
+            _registered.setdefault(name, (rate or UPSTREAM_RATE, burst or UPSTREAM_BURST, label))
+
+
+def get_upstream(name):
+    """Return the limiter/breaker for an upstream, creating it on first use.
+
+    Only names in UPSTREAM_LIMITS or passed to register() get their own;
+    any other host is a lookup target and gets the shared targets upstream,
+    so arbitrary hostnames never add entries here.
+    """
+    upstream = _upstreams.get(name)
+    if upstream is None:
+        with _upstreams_lock:
+            upstream = _upstreams.get(name)
+            if upstream is None:
+                if name in UPSTREAM_LIMITS:
+                    upstream = Upstream(name, *UPSTREAM_LIMITS[name])
+                elif name in _registered:
+                    rate, burst, label = _registered[name]
+                    upstream = Upstream(name, rate, burst, label=label)
+                else:
+                    return _upstreams[TARGETS]
+                _upstreams[name] = upstream
+    return upstream
+
+
+@contextmanager
+def guard(name, ignore=(), neutral=(), max_wait=None):
+    """Rate limit a call to an upstream and feed its outcome to the circuit breaker.
+
+    Exceptions listed in ignore are answers rather than outages (e.g. NXDOMAIN)
+    and count as successes. Exceptions listed in neutral say nothing about the
+    upstream as a whole (e.g. one name timing out) and count as neither. The
+    block can call fail() on the yielded attempt to record a failure without
+    raising. max_wait lowers UPSTREAM_MAX_WAIT for callers with a deadline.
+    """
+    upstream = get_upstream(name)
+    started = time.perf_counter()
+    try:
+        upstream.acquire(max_wait)
+    except UpstreamUnavailable:
+        UPSTREAM_REQUESTS.inc(upstream.label, 'rejected')
+        raise
+
+    attempt = _Attempt()
+    UPSTREAM_IN_FLIGHT.inc()
+    try:
+        yield attempt
+    except ignore:
+        upstream.breaker.record_success()
+        _record(upstream.label, 'success', started)
+        raise
+    except neutral:
+        upstream.breaker.release()
+        _record(upstream.label, 'failure', started)
+        raise
+    except Exception:
+        upstream.breaker.record_failure()
+        _record(upstream.label, 'failure', started)
+        raise
+    except BaseException:
+        # Cancelled (e.g. a gevent timeout or shutdown): no verdict, but never keep the trial slot
+        upstream.breaker.release()
+        raise
+    finally:
+        UPSTREAM_IN_FLIGHT.dec()
+
+    if attempt.failed:
+        upstream.breaker.record_failure()
+        _record(upstream.label, 'failure', started)
+    else:
+        upstream.breaker.record_success()
+        _record(upstream.label, 'success', started)
+
+
+def _record(label, outcome, started):
+    UPSTREAM_REQUESTS.inc(label, outcome)
+    UPSTREAM_DURATION.observe(time.perf_counter() - started, label)
+
+
+def upstream_status():
+    """Return the limiter and breaker state of every known upstream used so far, plus the targets one"""
+    with _upstreams_lock:
+        upstreams = dict(_upstreams)
+    return {name: upstream.status() for name, upstream in sorted(upstreams.items())}
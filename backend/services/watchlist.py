@@ -0,0 +1,380 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Watches, their latest results and the change feed live in a SQLite file shared by every worker
+WATCHLIST_DB_PATH = os.environ.get(
+    'WATCHLIST_DB_PATH', os.path.join(tempfile.gettempdir(), 'iseeyou-watchlist.sqlite3')
+)
+
+# Refreshes run at once per worker process
+WATCH_WORKERS = int(os.environ.get('WATCH_WORKERS', 4))
+WATCH_POLL_INTERVAL = float(os.environ.get('WATCH_POLL_INTERVAL', 5))
+
+# Bounds on the time between two checks of one lookup, whatever its TTL says
+WATCH_MIN_INTERVAL = float(os.environ.get('WATCH_MIN_INTERVAL', 60))
+WATCH_MAX_INTERVAL = float(os.environ.get('WATCH_MAX_INTERVAL', 86400))
+WATCH_RETRY_INTERVAL = float(os.environ.get('WATCH_RETRY_INTERVAL', 300))  # After a failed check
+WATCH_JITTER = 0.1  # Spread checks by +/-10% so watches added together do not stay in lockstep
+
+# A claimed check not finished within this long is handed to another worker
+WATCH_LEASE_TIMEOUT = float(os.environ.get('WATCH_LEASE_TIMEOUT', 300))
+
+# Lookups that can be watched, by name: function(target) -> (result, seconds until it may change)
+_watch_lookups = {}
+
+
+def register_watch_lookup(name, target_type, func):
+    """Make a lookup available to watches on targets of target_type ("domain" or "ip")"""
+    _watch_lookups[name] = (target_type, func)
+
+
+def watch_lookups(target_type=None):
+    return [name for name, (kind, _) in _watch_lookups.items() if target_type in (None, kind)]
+
+
+def fingerprint(value):
+    """Stable hash of a JSON-serialisable result"""
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def diff(old, new, path=''):
+    """List the differences between two JSON-like values.
+
+    Dicts are compared key by key and lists of plain values as sets (DNS
+    answers come back in any order); anything else is compared whole.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in sorted(set(old) | set(new), key=str):
+            child = f"{path}.{key}" if path else str(key)
+            if key not in old:
+                changes.append({"path": child, "op": "added", "new": new[key]})
+            elif key not in new:
+                changes.append({"path": child, "op": "removed", "old": old[key]})
+            else:
+                changes.extend(diff(old[key], new[key], child))
+        return changes
+
+    if isinstance(old, list) and isinstance(new, list) and _is_flat(old) and _is_flat(new):
+        old_items = {json.dumps(item, sort_keys=True) for item in old}
+        new_items = {json.dumps(item, sort_keys=True) for item in new}
+        changes = [{"path": path, "op": "added", "new": json.loads(item)} for item in sorted(new_items - old_items)]
+        changes += [{"path": path, "op": "removed", "old": json.loads(item)} for item in sorted(old_items - new_items)]
+        return changes
+
+    if old != new:
+        return [{"path": path, "op": "changed", "old": old, "new": new}]
+    return []
+
+
+def _is_flat(items):
+    return all(not isinstance(item, (dict, list)) for item in items)
+
+
+def next_check_delay(ttl):
+    """Seconds until the next check, from the result's TTL, bounded and jittered"""
+    delay = min(max(ttl or WATCH_MAX_INTERVAL, WATCH_MIN_INTERVAL), WATCH_MAX_INTERVAL)
+    return delay * random.uniform(1 - WATCH_JITTER, 1 + WATCH_JITTER)
+
+
+class WatchStore:
+    """Watches, the latest result of each watched lookup and the diffs between results"""
+
+    def __init__(self, path=WATCHLIST_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS watches ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, target TEXT NOT NULL, type TEXT NOT NULL,"
+            "created_at REAL NOT NULL);"
+            # One row per watched lookup: only the latest result is kept, with its hash
+            "CREATE TABLE IF NOT EXISTS watch_items ("
+            "watch_id INTEGER NOT NULL, lookup TEXT NOT NULL, hash TEXT, state TEXT,"
+            "checked_at REAL, changed_at REAL, next_check_at REAL NOT NULL, lease_until REAL NOT NULL DEFAULT 0,"
+            "checks INTEGER NOT NULL DEFAULT 0, last_error TEXT, PRIMARY KEY (watch_id, lookup));"
+            "CREATE INDEX IF NOT EXISTS watch_items_due ON watch_items (next_check_at);"
+            "CREATE TABLE IF NOT EXISTS watch_changes ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, watch_id INTEGER NOT NULL, target TEXT NOT NULL,"
+            "lookup TEXT NOT NULL, detected_at REAL NOT NULL, changes TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS watch_changes_watch ON watch_changes (watch_id, id);"
+        )
+        conn.commit()
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, target, target_type, lookups):
+        """Create a watch; its first check (the baseline) is due straight away"""
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO watches (target, type, created_at) VALUES (?, ?, ?)",
+                (target, target_type, time.time())
+            )
+            watch_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO watch_items (watch_id, lookup, next_check_at) VALUES (?, ?, ?)",
+                [(watch_id, lookup, 0) for lookup in lookups]
+            )
+        return watch_id
+
+    def remove(self, watch_id):
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM watches WHERE id = ?", (watch_id,))
+            conn.execute("DELETE FROM watch_items WHERE watch_id = ?", (watch_id,))
+            conn.execute("DELETE FROM watch_changes WHERE watch_id = ?", (watch_id,))
+        return cursor.rowcount > 0
+
+    def get(self, watch_id, include_state=False):
+        conn = self._connection()
+        watch = conn.execute("SELECT * FROM watches WHERE id = ?", (watch_id,)).fetchone()
+        if watch is None:
+            return None
+        items = conn.execute(
+            "SELECT * FROM watch_items WHERE watch_id = ? ORDER BY lookup", (watch_id,)
+        ).fetchall()
+        return _watch_view(watch, items, include_state)
+
+    def list(self):
+        conn = self._connection()
+        items = {}
+        for item in conn.execute("SELECT * FROM watch_items ORDER BY watch_id, lookup"):
+            items.setdefault(item["watch_id"], []).append(item)
+        return [
+            _watch_view(watch, items.get(watch["id"], []), include_state=False)
+            for watch in conn.execute("SELECT * FROM watches ORDER BY id")
+        ]
+
+    def check_now(self, watch_id):
+        """Make every lookup of a watch due immediately"""
+        conn = self._connection()
+        cursor = conn.execute("UPDATE watch_items SET next_check_at = 0 WHERE watch_id = ?", (watch_id,))
+        conn.commit()
+        return cursor.rowcount > 0
+
+    def claim_due(self, limit):
+        """Atomically lease up to limit due checks to the caller"""
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            # BEGIN IMMEDIATE takes the write lock so two workers cannot claim the same check
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT i.watch_id, i.lookup, i.hash, i.state, w.target FROM watch_items i "
+                "JOIN watches w ON w.id = i.watch_id "
+                "WHERE i.next_check_at <= ? AND i.lease_until <= ? ORDER BY i.next_check_at LIMIT ?",
+                (now, now, limit)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE watch_items SET lease_until = ? WHERE watch_id = ? AND lookup = ?",
+                [(now + WATCH_LEASE_TIMEOUT, row["watch_id"], row["lookup"]) for row in rows]
+            )
+        return [dict(row) for row in rows]
+
+    def next_due_at(self):
+        row = self._connection().execute("SELECT MIN(next_check_at) FROM watch_items").fetchone()
+        return row[0]
+
+    def record_unchanged(self, watch_id, lookup, next_check_at):
+        conn = self._connection()
+        conn.execute(
+            "UPDATE watch_items SET checked_at = ?, next_check_at = ?, lease_until = 0, "
+            "checks = checks + 1, last_error = NULL WHERE watch_id = ? AND lookup = ?",
+            (time.time(), next_check_at, watch_id, lookup)
+        )
+        conn.commit()
+
+    def record_changed(self, watch_id, target, lookup, state, state_hash, changes, next_check_at):
+        """Replace the stored result and append its diff to the change feed (the baseline has no diff)"""
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE watch_items SET hash = ?, state = ?, checked_at = ?, changed_at = ?, "
+                "next_check_at = ?, lease_until = 0, checks = checks + 1, last_error = NULL "
+                "WHERE watch_id = ? AND lookup = ?",
+                (state_hash, json.dumps(state, default=str), now, now, next_check_at, watch_id, lookup)
+            )
+            # The watch may have been removed while the check ran
+            if cursor.rowcount and changes:
+                conn.execute(
+                    "INSERT INTO watch_changes (watch_id, target, lookup, detected_at, changes) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (watch_id, target, lookup, now, json.dumps(changes, default=str))
+                )
+
+    def record_error(self, watch_id, lookup, error, next_check_at):
+        conn = self._connection()
+        conn.execute(
+            "UPDATE watch_items SET next_check_at = ?, lease_until = 0, last_error = ? "
+            "WHERE watch_id = ? AND lookup = ?",
+            (next_check_at, error, watch_id, lookup)
+        )
+        conn.commit()
+
+    def changes(self, after=0, watch_id=None, limit=100):
+        """Changes with an ID greater than after, oldest first"""
+        query = "SELECT * FROM watch_changes WHERE id > ?"
+        params = [after]
+        if watch_id is not None:
+            query += " AND watch_id = ?"
+            params.append(watch_id)
+        query += " ORDER BY id LIMIT ?"
+        params.append(limit)
+
+        return [
+            {
+                "id": row["id"],
+                "watch_id": row["watch_id"],
+                "target": row["target"],
+                "lookup": row["lookup"],
+                "detected_at": row["detected_at"],
+                "changes": json.loads(row["changes"])
+            }
+            for row in self._connection().execute(query, params)
+        ]
+
+
+def _watch_view(watch, items, include_state):
+    lookups = {}
+    for item in items:
+        view = {
+            "checked_at": item["checked_at"],
+            "changed_at": item["changed_at"],
+            "next_check_at": item["next_check_at"],
+            "checks": item["checks"],
+            "last_error": item["last_error"]
+        }
+        if include_state:
+            view["result"] = json.loads(item["state"]) if item["state"] else None
+        lookups[item["lookup"]] = view
+
+    return {
+        "id": watch["id"],
+        "target": watch["target"],
+        "type": watch["type"],
+        "created_at": watch["created_at"],
+        "lookups": lookups
+    }
+
+
+class WatchScheduler:
+    """Runs due watch checks on a bounded pool of threads in this worker process.
+
+    Each check runs the lookup and compares the hash of its result with the
+    stored one; only when they differ is the diff computed and stored and
+    the latest result replaced. The next check is scheduled from the TTL
+    the lookup reports.
+    """
+
+    def __init__(self, store, workers=WATCH_WORKERS, poll_interval=WATCH_POLL_INTERVAL):
+        self.store = store
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='watch')
+        self._running = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name='watch-scheduler', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def _dispatch(self):
+        while True:
+            try:
+                with self._lock:
+                    free = self.workers - self._running
+                if free > 0:
+                    for item in self.store.claim_due(free):
+                        with self._lock:
+                            self._running += 1
+                        self._executor.submit(self._run, item)
+            except Exception:
+                logger.exception("Watch scheduler error")
+
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _run(self, item):
+        try:
+            self.check(item)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self.wake()
+
+    def check(self, item):
+        watch_id, lookup = item["watch_id"], item["lookup"]
+        try:
+            _, func = _watch_lookups[lookup]
+            result, ttl = func(item["target"])
+        except Exception as e:
+            logger.warning("Watch check failed for %s (%s): %s", item['target'], lookup, e)
+            self.store.record_error(watch_id, lookup, str(e), time.time() + WATCH_RETRY_INTERVAL)
+            return
+
+        next_check_at = time.time() + next_check_delay(ttl)
+        result_hash = fingerprint(result)
+
+        # The common case: nothing changed, so nothing new is stored
+        if result_hash == item["hash"]:
+            self.store.record_unchanged(watch_id, lookup, next_check_at)
+            return
+
+        changes = diff(json.loads(item["state"]), result) if item["state"] else []
+        self.store.record_changed(watch_id, item["target"], lookup, result, result_hash, changes, next_check_at)
+
+
+_store = None
+_scheduler = None
+_init_lock = threading.Lock()
+
+
+def get_watch_store():
+    global _store
+    if _store is None:
+        with _init_lock:
+            if _store is None:
+                _store = WatchStore()
+    return _store
+
+
+def get_watch_scheduler():
+    """Return this process's watch scheduler, starting it on first use"""
+    global _scheduler
+    if _scheduler is None:
+        store = get_watch_store()
+        with _init_lock:
+            if _scheduler is None:
+                _scheduler = WatchScheduler(store)
+        _scheduler.start()
+    return _scheduler
@@ -0,0 +1,268 @@
+import os
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+from services import upstream
+
+WHOIS_PORT = int(os.environ.get('WHOIS_PORT', 43))
+WHOIS_SOCKET_TIMEOUT = float(os.environ.get('WHOIS_SOCKET_TIMEOUT', 10))
+WHOIS_MAX_REFERRALS = 2
+WHOIS_MAX_RESPONSE = 256 * 1024
+
+# Per-server limits so a burst of lookups does not get us blocked by a registry
+WHOIS_SERVER_CONCURRENCY = int(os.environ.get('WHOIS_SERVER_CONCURRENCY', 4))
+WHOIS_SERVER_INTERVAL = float(os.environ.get('WHOIS_SERVER_INTERVAL', 0.2))
+
+# IANA knows the WHOIS server of every TLD; used for TLDs not listed below
+IANA_WHOIS_SERVER = os.environ.get('IANA_WHOIS_SERVER', 'whois.iana.org')
+
+# Registry WHOIS servers for common TLDs
+TLD_SERVERS = {
+    "com": "whois.verisign-grs.com",
+    "net": "whois.verisign-grs.com",
+    "org": "whois.pir.org",
+    "info": "whois.nic.info",
+    "biz": "whois.nic.biz",
+    "io": "whois.nic.io",
+    "co": "whois.nic.co",
+    "me": "whois.nic.me",
+    "us": "whois.nic.us",
+    "uk": "whois.nic.uk",
+    "de": "whois.denic.de",
+    "fr": "whois.nic.fr",
+    "nl": "whois.domain-registry.nl",
+    "eu": "whois.eu",
+    "ca": "whois.cira.ca",
+    "au": "whois.auda.org.au",
+    "in": "whois.registry.in",
+    "jp": "whois.jprs.jp",
+    "ru": "whois.tcinet.ru",
+    "app": "whois.nic.google",
+    "dev": "whois.nic.google",
+    "xyz": "whois.nic.xyz",
+}
+
+# Servers that need a different query syntax
+QUERY_FORMATS = {
+    "whois.denic.de": "-T dn,ace {domain}",
+    "whois.verisign-grs.com": "domain {domain}",
+}
+
+# Lower-cased field labels -> (result key, collects multiple values)
+FIELD_MAP = {
+    "domain name": ("domain_name", False),
+    "domain": ("domain_name", False),
+    "registrar": ("registrar", False),
+    "registrar name": ("registrar", False),
+    "sponsoring registrar": ("registrar", False),
+    "creation date": ("creation_date", False),
+    "created": ("creation_date", False),
+    "created on": ("creation_date", False),
+    "registered on": ("creation_date", False),
+    "registration time": ("creation_date", False),
+    "registry expiry date": ("expiration_date", False),
+    "registrar registration expiration date": ("expiration_date", False),
+    "expiry date": ("expiration_date", False),
+    "expiration date": ("expiration_date", False),
+    "expires on": ("expiration_date", False),
+    "paid-till": ("expiration_date", False),
+    "updated date": ("updated_date", False),
+    "last updated": ("updated_date", False),
+    "last modified": ("updated_date", False),
+    "changed": ("updated_date", False),
+    "name server": ("name_servers", True),
+    "nserver": ("name_servers", True),
+    "nameserver": ("name_servers", True),
+    "domain status": ("status", True),
+    "status": ("status", True),
+    "dnssec": ("dnssec", False),
+    "registrant organization": ("org", False),
+    "registrant country": ("country", False),
+}
+
+# Labels that point at a more specific WHOIS server
+REFERRAL_LABELS = ("registrar whois server", "whois server", "refer", "whois", "referralserver")
+
+EMAIL_REGEX = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+
+# Connection slots are kept for this many recently used servers; referrals
+# can name any registrar, so the map must not grow without bound
+WHOIS_MAX_SERVER_SLOTS = 1024
+
+_tld_server_cache = {}
+_server_slots = OrderedDict()
+_server_slots_lock = threading.Lock()
+
+
+def _register_server(server):
+    """Give a registry server its own rate limit and breaker; registrar referrals share the targets one"""
+    upstream.register(server, 1 / WHOIS_SERVER_INTERVAL, 1, label='whois')
+
+
+for _server in {IANA_WHOIS_SERVER, *TLD_SERVERS.values()}:
+    _register_server(_server)
+
+
+def parse_whois(raw_text):
+    """Extract every known field from a WHOIS response in a single pass over its lines"""
+    fields = {}
+    emails = []
+    referral = None
+
+    for line in raw_text.splitlines():
+        label, sep, value = line.partition(':')
+        if not sep:
+            continue
+
+        label = label.strip().lower()
+        value = value.strip()
+        if not value:
+            continue
+
+        if label in REFERRAL_LABELS and referral is None:
+            referral = value
+
+        mapped = FIELD_MAP.get(label)
+        if mapped is not None:
+            key, multiple = mapped
+            if key == "name_servers":
+                value = value.split()[0].lower().rstrip('.')
+            if multiple:
+                values = fields.setdefault(key, [])
+                if value not in values:
+                    values.append(value)
+            elif key not in fields:
+                fields[key] = value
+
+        if 'email' in label:
+            for email in EMAIL_REGEX.findall(value):
+                email = email.lower()
+                if email not in emails:
+                    emails.append(email)
+
+    if emails:
+        fields["emails"] = emails
+    return fields, _referral_host(referral)
+
+
+def _referral_host(value):
+    """Turn a referral value (hostname or whois:// URL) into a hostname"""
+    if not value:
+        return None
+    value = re.sub(r'^(r?whois|https?)://', '', value.strip(), flags=re.I)
+    host = value.split('/')[0].split(':')[0].strip().lower()
+    return host if '.' in host else None
+
+
+def query(server, text, timeout=WHOIS_SOCKET_TIMEOUT):
+    """Send one query to a WHOIS server and return the decoded response.
+
+    timeout bounds the whole exchange, including the wait for a connection
+    slot and the rate limit, not each socket operation on its own (a server
+    trickling bytes would otherwise hold the caller indefinitely).
+    """
+    ends_at = time.monotonic() + timeout
+    slot = _server_slot(server)
+    if not slot.acquire(timeout=timeout):
+        raise socket.timeout(f"No free connection to {server} within {timeout:.1f}s")
+
+    try:
+        with upstream.guard(server, max_wait=_remaining(ends_at)):
+            chunks = []
+            size = 0
+            with socket.create_connection((server, WHOIS_PORT), timeout=_remaining(ends_at)) as sock:
+                sock.sendall(text.encode('utf-8') + b"\r\n")
+                while size < WHOIS_MAX_RESPONSE:
+                    sock.settimeout(_remaining(ends_at))
+                    chunk = sock.recv(4096)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    size += len(chunk)
+    finally:
+        slot.release()
+
+    return b''.join(chunks).decode('utf-8', errors='replace')
+
+
+def _remaining(ends_at):
+    """Seconds left before ends_at, raising socket.timeout once it has passed"""
+    remaining = ends_at - time.monotonic()
+    if remaining <= 0:
+        raise socket.timeout("WHOIS query timed out")
+    return remaining
+
+
+def _server_slot(server):
+    """Semaphore bounding concurrent connections to one WHOIS server"""
+    with _server_slots_lock:
+        slot = _server_slots.get(server)
+        if slot is None:
+            slot = _server_slots[server] = threading.BoundedSemaphore(WHOIS_SERVER_CONCURRENCY)
+            if len(_server_slots) > WHOIS_MAX_SERVER_SLOTS:
+                _server_slots.popitem(last=False)
+        else:
+            _server_slots.move_to_end(server)
+        return slot
+
+
+def server_for(domain, timeout=WHOIS_SOCKET_TIMEOUT):
+    """Return the registry WHOIS server for a domain's TLD"""
+    tld = domain.rsplit('.', 1)[-1].lower()
+    server = TLD_SERVERS.get(tld) or _tld_server_cache.get(tld)
+    if server:
+        return server
+
+    # Ask IANA once per TLD and remember the answer
+    _, server = parse_whois(query(IANA_WHOIS_SERVER, tld, timeout=timeout))
+    if not server:
+        raise Exception(f"No WHOIS server known for .{tld}")
+    _register_server(server)
+    _tld_server_cache[tld] = server
+    return server
+
+
+def lookup(domain, deadline=None):
+    """Look up a domain, following registry -> registrar referrals.
+
+    Fields from the more specific (registrar) response take precedence.
+    The result includes the raw text of the last response.
+    """
+    expires_at = time.monotonic() + deadline if deadline else None
+    server = server_for(domain, timeout=min(WHOIS_SOCKET_TIMEOUT, deadline) if deadline else WHOIS_SOCKET_TIMEOUT)
+    result = {}
+    raw_text = ''
+    visited = set()
+
+    for _ in range(WHOIS_MAX_REFERRALS + 1):
+        visited.add(server)
+
+        timeout = WHOIS_SOCKET_TIMEOUT
+        if expires_at is not None:
+            timeout = min(timeout, expires_at - time.monotonic())
+            if timeout <= 0:
+                break
+
+        query_format = QUERY_FORMATS.get(server, "{domain}")
+        try:
+            text = query(server, query_format.format(domain=domain), timeout=timeout)
+        except (OSError, upstream.UpstreamUnavailable):
+            # A failing registrar server should not discard what the registry told us
+            if result:
+                break
+            raise
+
+        fields, referral = parse_whois(text)
+        result.update(fields)
+        raw_text = text
+        result["whois_server"] = server
+
+        if not referral or referral in visited:
+            break
+        server = referral
+
+    result["raw_text"] = raw_text
+    return result
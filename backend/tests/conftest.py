@@ -0,0 +1,41 @@
+"""Shared fixtures: the app with throwaway state, and a threaded server in front of it."""
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Set before the app is imported: configuration is read at import time, and
+# load_dotenv() never overrides variables that are already set
+_state_dir = tempfile.mkdtemp(prefix='iseeyou-tests-')
+os.environ.update({
+    'CACHE_BACKEND': 'memory',
+    'JOBS_DB_PATH': os.path.join(_state_dir, 'jobs.sqlite3'),
+    'WATCHLIST_DB_PATH': os.path.join(_state_dir, 'watchlist.sqlite3'),
+    'PREFIX_CACHE_PATH': os.path.join(_state_dir, 'rdap-prefixes.sqlite3'),
+    'RDAP_BOOTSTRAP_PATH': os.path.join(_state_dir, 'rdap-dns.json'),
+    'BREACH_INDEX_PATH': os.path.join(_state_dir, 'breaches.idx'),
+    'HIBP_API_KEY': '',
+})
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    return app
+
+
+@pytest.fixture(scope='session')
+def live_server(app):
+    """The app behind a multi-threaded WSGI server, so requests really run concurrently"""
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
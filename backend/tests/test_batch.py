@@ -0,0 +1,80 @@
+"""Batch request validation and the NDJSON stream of results."""
+import json
+
+import pytest
+
+from services import batch
+from services.batch import parse_batch_request, stream_batch
+
+
+def upper(target):
+    if not isinstance(target, str):
+        raise ValueError(f"not a name: {target!r}")
+    return target.upper()
+
+
+LOOKUPS = {"upper": upper, "length": lambda target: len(str(target))}
+
+
+@pytest.mark.parametrize('data, message', [
+    (None, "A non-empty list of targets is required"),
+    ({}, "A non-empty list of targets is required"),
+    ({"targets": []}, "A non-empty list of targets is required"),
+    ({"targets": "example.com"}, "A non-empty list of targets is required"),
+    ({"targets": ["a"], "lookups": ["upper", "nope"]}, "Unknown lookups: nope. Available: upper, length"),
+    ({"targets": ["a"], "concurrency": "many"}, "Concurrency must be an integer"),
+    ({"targets": ["a"], "concurrency": None}, "Concurrency must be an integer"),
+])
+def test_invalid_requests_are_rejected(data, message):
+    with pytest.raises(ValueError, match=f"^{message}$"):
+        parse_batch_request(data, LOOKUPS)
+
+
+def test_target_limit(monkeypatch):
+    monkeypatch.setattr(batch, 'BATCH_MAX_TARGETS', 2)
+    assert parse_batch_request({"targets": ["a", "b"]}, LOOKUPS)[0] == ["a", "b"]
+    with pytest.raises(ValueError, match="At most 2 targets"):
+        parse_batch_request({"targets": ["a", "b", "c"]}, LOOKUPS)
+
+
+def test_defaults_and_concurrency_bounds():
+    assert parse_batch_request({"targets": ["a"]}, LOOKUPS) == (["a"], ["upper", "length"],
+                                                                 batch.BATCH_DEFAULT_CONCURRENCY)
+    assert parse_batch_request({"targets": ["a"], "concurrency": 0}, LOOKUPS)[2] == 1
+    assert parse_batch_request({"targets": ["a"], "concurrency": "10000"}, LOOKUPS)[2] == batch.BATCH_MAX_CONCURRENCY
+    assert parse_batch_request({"targets": ["a"], "lookups": ["length"]}, LOOKUPS)[1] == ["length"]
+
+
+def ndjson(body):
+    assert body.endswith("\n")
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_stream_has_one_line_per_target_and_lookup(app):
+    with app.test_request_context():
+        response = stream_batch(["ab", 3], LOOKUPS, ["upper", "length"], concurrency=4)
+        lines = ndjson(''.join(response.response))
+
+    assert response.mimetype == 'application/x-ndjson'
+    key = lambda line: (str(line["target"]), line["lookup"])
+    assert sorted(lines, key=key) == sorted([
+        {"target": "ab", "lookup": "upper", "result": "AB"},
+        {"target": "ab", "lookup": "length", "result": 2},
+        {"target": 3, "lookup": "upper", "error": "not a name: 3"},
+        {"target": 3, "lookup": "length", "result": 1},
+    ], key=key)
+
+
+def test_batch_endpoint_streams_errors_for_bad_targets(app):
+    client = app.test_client()
+
+    response = client.post('/api/ip/batch', json={"targets": ["bad-ip", "256.1.1.1"], "lookups": ["geolocation"]})
+    assert response.status_code == 200
+    assert sorted(ndjson(response.get_data(as_text=True)), key=lambda line: line["target"]) == [
+        {"target": "256.1.1.1", "lookup": "geolocation", "error": "Invalid IP address format"},
+        {"target": "bad-ip", "lookup": "geolocation", "error": "Invalid IP address format"},
+    ]
+
+    response = client.post('/api/ip/batch', json={"targets": ["192.0.2.1"], "lookups": ["traceroute"]})
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("Unknown lookups: traceroute.")
@@ -0,0 +1,111 @@
+"""Building and searching the offline breach index."""
+import os
+
+import pytest
+
+from services import breach_index
+from services.breach_index import BreachIndex, build_index, email_key, read_csv_rows
+
+
+def names(index, email):
+    return [breach["Name"] for breach in index.lookup(email)]
+
+
+def test_csv_header_row_is_skipped_only_when_it_holds_no_address(tmp_path):
+    with_header = tmp_path / 'with_header.csv'
+    with_header.write_text("email,breach\nalice@example.com,Adobe\n")
+    without_header = tmp_path / 'without_header.csv'
+    without_header.write_text("bob@example.com,LinkedIn\nshort-row\ncarol@example.com,Adobe\n")
+
+    assert list(read_csv_rows([str(with_header), str(without_header)])) == [
+        ("alice@example.com", "Adobe"),
+        ("bob@example.com", "LinkedIn"),
+        ("carol@example.com", "Adobe"),
+    ]
+
+
+def test_build_and_lookup(tmp_path):
+    path = str(tmp_path / 'breaches.idx')
+    rows = [
+        ("Alice@Example.com ", "Adobe"),
+        ("alice@example.com", "Adobe"),  # Duplicate once normalised
+        ("alice@example.com", "LinkedIn"),
+        ("bob@example.com", "LinkedIn"),
+        ("not-an-address", "Adobe"),
+        ("carol@example.com", ""),
+    ]
+    breaches = {"Adobe": {"Name": "Adobe", "Title": "Adobe", "BreachDate": "2013-10-04"}}
+
+    assert build_index(rows, path, breaches) == 3
+    index = BreachIndex(path)
+    assert sorted(names(index, " ALICE@example.com")) == ["Adobe", "LinkedIn"]
+    assert names(index, "bob@example.com") == ["LinkedIn"]
+    assert names(index, "carol@example.com") == []
+    assert index.lookup("alice@example.com")[0]["BreachDate"] == "2013-10-04"
+    # Breaches without a description get a minimal entry
+    assert {"Name": "LinkedIn", "Title": "LinkedIn"} in index.breaches
+
+
+def test_external_merge_matches_an_in_memory_build(tmp_path, monkeypatch):
+    rows = [(f"user{i % 40}@example.com", f"Breach{i % 4}") for i in range(100)]
+
+    in_memory = str(tmp_path / 'memory' / 'breaches.idx')
+    assert build_index(rows, in_memory) == 40
+
+    monkeypatch.setattr(breach_index, 'BUILD_RUN_RECORDS', 7)
+    merged = str(tmp_path / 'merged' / 'breaches.idx')
+    assert build_index(rows, merged) == 40
+
+    with open(in_memory, 'rb') as a, open(merged, 'rb') as b:
+        assert a.read() == b.read()
+    # The sorted runs are removed once merged
+    assert os.listdir(tmp_path / 'merged') == ['breaches.idx']
+
+
+def test_lookup_narrows_by_prefix_without_mixing_neighbours(tmp_path):
+    # Find two addresses whose keys share the 2-byte prefix used by the prefix table
+    seen = {}
+    for i in range(100000):
+        email = f"user{i}@example.com"
+        prefix = email_key(email)[:2]
+        if prefix in seen:
+            pair = (seen[prefix], email)
+            break
+        seen[prefix] = email
+
+    path = str(tmp_path / 'breaches.idx')
+    rows = [(pair[0], "First"), (pair[1], "Second")] + [(f"other{i}@example.com", "Other") for i in range(200)]
+    build_index(rows, path)
+    index = BreachIndex(path)
+
+    assert names(index, pair[0]) == ["First"]
+    assert names(index, pair[1]) == ["Second"]
+    assert all(names(index, f"other{i}@example.com") == ["Other"] for i in range(200))
+
+
+@pytest.fixture
+def configured_index(tmp_path, monkeypatch):
+    path = str(tmp_path / 'breaches.idx')
+    monkeypatch.setattr(breach_index, 'BREACH_INDEX_PATH', path)
+    monkeypatch.setattr(breach_index, 'BREACH_INDEX_RELOAD_INTERVAL', 0)
+    monkeypatch.setattr(breach_index, '_index', None)
+    monkeypatch.setattr(breach_index, '_checked_at', float('-inf'))
+    return path
+
+
+def test_rebuilt_file_is_reopened_when_its_mtime_changes(configured_index):
+    path = configured_index
+    assert breach_index.get_breach_index() is None
+
+    build_index([("alice@example.com", "Adobe")], path)
+    first = breach_index.get_breach_index()
+    assert names(first, "alice@example.com") == ["Adobe"]
+    assert breach_index.get_breach_index() is first
+
+    build_index([("alice@example.com", "LinkedIn")], path)
+    os.utime(path, (first.mtime + 10, first.mtime + 10))
+    second = breach_index.get_breach_index()
+    assert second is not first and names(second, "alice@example.com") == ["LinkedIn"]
+
+    os.unlink(path)
+    assert breach_index.get_breach_index() is None
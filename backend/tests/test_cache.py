@@ -0,0 +1,57 @@
+"""SQLite cache eviction and cross-worker load locks."""
+import sqlite3
+
+import pytest
+
+from services import cache
+from services.cache import MISS, SQLiteCache
+
+
+def count(store):
+    return store._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+def test_evicts_least_recently_used_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_SQLITE_TOUCH_INTERVAL', -1)  # Record every read
+    store = SQLiteCache(path=str(tmp_path / 'cache.sqlite3'), max_entries=10, evict_every=5)
+
+    for i in range(10):
+        store.set(f"key{i}", i, 60)
+    assert store.get('key0') == 0
+
+    # Over the bound until the next eviction pass, then back to it
+    for i in range(10, 14):
+        store.set(f"key{i}", i, 60)
+    assert count(store) == 14
+    store.set('key14', 14, 60)
+    assert count(store) == 10
+
+    assert store.get('key0') == 0
+    assert [store.get(f"key{i}") for i in range(1, 6)] == [MISS] * 5
+    assert store.get('key14') == 14
+
+
+def test_adds_access_times_to_an_existing_file(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+    conn.execute("INSERT INTO cache VALUES ('old', '1', 1e12)")
+    conn.commit()
+    conn.close()
+
+    store = SQLiteCache(path=path)
+    assert store.get('old') == 1
+    store.set('new', 2, 60)
+    assert store.get('new') == 2
+
+
+@pytest.mark.skipif(cache.fcntl is None, reason="file locks need fcntl")
+def test_load_locks_use_a_fixed_set_of_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_COALESCE_WORKERS', True)
+    monkeypatch.setattr(cache, 'CACHE_LOCK_DIR', str(tmp_path))
+
+    for i in range(1000):
+        with cache._worker_lock(f"whois:example{i}.com"):
+            pass
+
+    assert 0 < len(list(tmp_path.iterdir())) <= cache.CACHE_LOCK_STRIPES
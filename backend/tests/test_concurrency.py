@@ -0,0 +1,85 @@
+"""Sharing one in-flight call between threads."""
+import threading
+import time
+
+import pytest
+
+from services.concurrency import SingleFlight
+
+
+class Cancelled(BaseException):
+    """Stands in for a gevent Timeout or GreenletExit, which are not Exceptions"""
+
+
+def run_follower(flight, key, started):
+    outcome = {}
+
+    def follower():
+        try:
+            outcome["result"] = flight.do(key, lambda: "follower ran")
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=follower)
+    started.wait()
+    thread.start()
+    return thread, outcome
+
+
+def wait_for_follower():
+    # Long enough for the follower to join the leader's call; if it came too
+    # late it would run its own function and the assertions would say so
+    time.sleep(0.1)
+
+
+@pytest.mark.parametrize('error', [ValueError("failed"), Cancelled()])
+def test_followers_receive_the_leaders_error(error):
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    holder = {}
+
+    def leader_call():
+        started.set()
+        release.wait()
+        raise error
+
+    def leader():
+        try:
+            flight.do('key', leader_call)
+        except BaseException as e:
+            holder["error"] = e
+
+    leader_thread = threading.Thread(target=leader)
+    leader_thread.start()
+    follower_thread, outcome = run_follower(flight, 'key', started)
+    wait_for_follower()
+    release.set()
+    leader_thread.join(5)
+    follower_thread.join(5)
+
+    assert holder["error"] is error
+    assert outcome == {"error": error}
+    assert flight._calls == {}
+
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def leader_call():
+        started.set()
+        release.wait()
+        return "leader ran"
+
+    results = []
+    leader_thread = threading.Thread(target=lambda: results.append(flight.do('key', leader_call)))
+    leader_thread.start()
+    follower_thread, outcome = run_follower(flight, 'key', started)
+    wait_for_follower()
+    release.set()
+    leader_thread.join(5)
+    follower_thread.join(5)
+
+    assert results == ["leader ran"] and outcome == {"result": "leader ran"}
@@ -0,0 +1,44 @@
+"""Header lookups probe HTTPS and HTTP together."""
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from routes import domain_routes
+
+
+class _PlainHTTPOnlyHandler(socketserver.BaseRequestHandler):
+    """Answers plain HTTP; swallows TLS handshakes without replying, like a filtered HTTPS port"""
+
+    def handle(self):
+        first = self.request.recv(1, socket.MSG_PEEK)
+        if first == b'\x16':
+            self.server.stopped.wait()
+            return
+        self.request.recv(65536)
+        self.request.sendall(b"HTTP/1.1 200 OK\r\nServer: plain\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+
+
+@pytest.fixture
+def plain_http_server():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _PlainHTTPOnlyHandler)
+    server.daemon_threads = True
+    server.stopped = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"127.0.0.1:{server.server_address[1]}"
+    server.stopped.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_answer_is_used_after_the_grace_period_when_https_never_answers(plain_http_server, monkeypatch):
+    monkeypatch.setattr(domain_routes, 'HEADERS_TIMEOUT', 5)
+    monkeypatch.setattr(domain_routes, 'HEADERS_HTTPS_GRACE', 0.3)
+
+    started = time.monotonic()
+    result = domain_routes.lookup_headers(plain_http_server)
+
+    assert result["status_code"] == 200 and result["headers"]["Server"] == "plain"
+    assert time.monotonic() - started < 2
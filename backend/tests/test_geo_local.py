@@ -0,0 +1,78 @@
+"""The compiled local geolocation range table, and IP validation in front of it."""
+import pytest
+
+from services import geo_local
+
+CSV = """start_ip,end_ip,country_code,country,city,latitude,longitude
+198.51.100.0,198.51.100.255,NL,Netherlands,Amsterdam,52.37,4.89
+192.0.2.0,192.0.2.127,US,United States,Chicago,41.88,-87.63
+3221226112,3221226239,US,United States,Chicago,41.88,-87.63
+203.0.113.10,203.0.113.10,JP,Japan,Tokyo,35.68,139.69
+"""
+
+
+@pytest.fixture
+def database(tmp_path):
+    csv_path = tmp_path / 'ranges.csv'
+    csv_path.write_text(CSV)
+    db_path = tmp_path / 'geo.bin'
+    assert geo_local.compile_csv(str(csv_path), str(db_path)) == 4
+    return geo_local.LocalGeoDatabase(str(db_path))
+
+
+def test_build_sorts_ranges_and_shares_location_strings(database, tmp_path):
+    assert database.count == 4
+    # Two ranges, one in integer form, share the Chicago object: three strings for four ranges
+    strings = (tmp_path / 'geo.bin').read_bytes()[database._strings_offset:]
+    assert strings.count(b'"city":') == 3
+
+
+@pytest.mark.parametrize('ip, city', [
+    ('192.0.2.0', 'Chicago'),  # First address of a range
+    ('192.0.2.127', 'Chicago'),  # Last address of a range
+    ('192.0.2.200', 'Chicago'),  # Range given as integers (192.0.2.128-192.0.2.255)
+    ('198.51.100.77', 'Amsterdam'),
+    ('203.0.113.10', 'Tokyo'),  # Single-address range
+])
+def test_lookup_finds_the_containing_range(database, ip, city):
+    location = database.lookup(ip)
+    assert location["city"] == city and location["query"] == ip
+    assert location["status"] == "success" and location["source"] == "local"
+    assert isinstance(location["lat"], float)
+
+
+@pytest.mark.parametrize('ip', [
+    '0.0.0.0',  # Before the first range
+    '192.0.1.255',  # Just before a range
+    '198.51.101.0',  # Just after a range
+    '203.0.113.9',  # Gap before a single-address range
+    '203.0.113.11',
+    '255.255.255.255',  # After the last range
+    '2001:db8::1',  # IPv6: the table holds IPv4 ranges only
+])
+def test_lookup_misses_outside_every_range(database, ip):
+    assert database.lookup(ip) is None
+
+
+@pytest.mark.parametrize('ip', ['256.1.1.1', '1.2.3', 'example.com'])
+def test_lookup_rejects_invalid_addresses(database, ip):
+    with pytest.raises(ValueError):
+        database.lookup(ip)
+
+
+@pytest.mark.parametrize('ip', ['256.1.1.1', '1.2.3.4.5', 42])
+def test_geolocation_route_answers_400_for_invalid_addresses(app, ip):
+    response = app.test_client().post('/api/ip/geolocation', json={"ip": ip, "source": "local"})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid IP address format"}
+
+
+def test_prefetch_skips_invalid_addresses(app, monkeypatch):
+    from routes import ip_routes
+
+    monkeypatch.setattr(geo_local, 'GEO_BACKEND', 'auto')
+    looked_up = []
+    monkeypatch.setattr(geo_local, 'lookup', lambda ip: looked_up.append(ip) or {"status": "success"})
+
+    ip_routes.prefetch_geolocation(['256.1.1.1', None, ' 192.0.2.1 ', '2001:DB8::1'])
+    assert looked_up == ['192.0.2.1', '2001:db8::1']
@@ -0,0 +1,76 @@
+"""Retry and breaker behaviour of the shared HTTP client."""
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from services import http_client, upstream
+
+
+@pytest.fixture
+def silent_server():
+    """Accepts connections and reads requests but never answers them"""
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(16)
+    accepted = []
+
+    def accept():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            accepted.append(conn)
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield f"http://127.0.0.1:{listener.getsockname()[1]}", accepted
+    listener.close()
+    for conn in accepted:
+        conn.close()
+
+
+@pytest.mark.parametrize('retries', [True, False])
+def test_read_timeouts_are_never_retried(silent_server, retries):
+    url, accepted = silent_server
+    started = time.monotonic()
+    with pytest.raises(requests.RequestException):
+        http_client.get(url, timeout=0.3, retries=retries)
+
+    assert time.monotonic() - started < 0.6
+    assert len(accepted) == 1
+
+
+@pytest.fixture
+def failing_server():
+    """Answers every request with a 503"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://localhost:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_lookup_targets_never_trip_the_breaker_of_an_api_on_the_same_host(failing_server):
+    http_client.register_host(failing_server, 'test-api')
+    breaker = upstream.get_upstream('localhost').breaker
+
+    for _ in range(breaker.failure_threshold + 1):
+        assert http_client.get(failing_server, retries=False, target=True).status_code == 503
+    assert breaker.state == 'closed'
+
+    for _ in range(breaker.failure_threshold):
+        http_client.get(failing_server, retries=False)
+    assert breaker.state == 'open'
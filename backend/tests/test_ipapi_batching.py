@@ -0,0 +1,46 @@
+"""Concurrent geolocation lookups share ip-api batch calls and respect its rate-limit headers."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bench import fakes
+
+
+@pytest.fixture
+def ipapi(monkeypatch, app):
+    """A fake ip-api server with a fresh batcher pointed at it"""
+    from routes import ip_routes
+    from services.ipapi import GeoBatcher
+
+    server = fakes.http_server({}, fakes.UpstreamBehaviour(latency=0)).start()
+    monkeypatch.setattr(ip_routes, 'geo_batcher', GeoBatcher(base_url=f"http://127.0.0.1:{server.port}", window=0.2))
+    yield server.server
+    server.stop()
+
+
+def test_concurrent_lookups_share_one_batch_call(ipapi):
+    from routes.ip_routes import lookup_geolocation
+
+    ips = [f"203.0.113.{i}" for i in range(1, 21)]
+    with ThreadPoolExecutor(max_workers=len(ips)) as pool:
+        results = list(pool.map(lambda ip: lookup_geolocation(ip, 'remote'), ips))
+
+    assert [result["query"] for result in results] == ips
+    assert len(ipapi.batch_calls) == 1
+    assert sorted(ipapi.batch_calls[0][1]) == sorted(ips)
+
+
+def test_exhausted_rate_limit_delays_the_next_batch_call(ipapi):
+    from routes.ip_routes import lookup_geolocation
+
+    # The first answer says no requests are left for the next 2 seconds
+    ipapi.ipapi_headers = {'X-Rl': '0', 'X-Ttl': '2'}
+    lookup_geolocation('203.0.113.101', 'remote')
+    ipapi.ipapi_headers = {'X-Rl': '1000', 'X-Ttl': '60'}
+
+    lookup_geolocation('203.0.113.102', 'remote')
+
+    assert len(ipapi.batch_calls) == 2
+    (first_at, _), (second_at, _) = ipapi.batch_calls
+    assert second_at - first_at >= 1.9
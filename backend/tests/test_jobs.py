@@ -0,0 +1,43 @@
+"""Background job bookkeeping in the SQLite job store."""
+import time
+
+from services import jobs
+from services.jobs import JobRunner, JobStore, job_summary
+
+
+def test_duplicate_targets_run_once(tmp_path):
+    store = JobStore(path=str(tmp_path / 'jobs.sqlite3'))
+    job_id = store.create('test', ['a', 'b', 'a'], ['x', 'x'], 2)
+
+    summary = job_summary(store.get(job_id))
+    assert summary["targets"] == 2
+    assert summary["lookups"] == ['x']
+    assert summary["progress"]["total"] == 2
+    assert store.targets(job_id) == ['a', 'b']
+
+
+def test_resumed_job_continues_the_result_sequence(tmp_path, monkeypatch):
+    store = JobStore(path=str(tmp_path / 'jobs.sqlite3'))
+    monkeypatch.setitem(jobs._job_types, 'test', {"upper": str.upper})
+    job_id = store.create('test', ['a', 'b', 'c'], ['upper'], 2)
+
+    # The first owner finishes one lookup, then stops updating the job
+    assert store.claim('dead-worker')["id"] == job_id
+    assert store.add_result(job_id, 'dead-worker', 'a', 'upper', 'A')
+    store._connection().execute("UPDATE jobs SET heartbeat_at = 0 WHERE id = ?", (job_id,))
+    store._connection().commit()
+
+    runner = JobRunner(store, workers=1, poll_interval=0.05)
+    runner.start()
+    for _ in range(100):
+        if store.status(job_id) == 'completed':
+            break
+        time.sleep(0.05)
+
+    summary = job_summary(store.get(job_id))
+    assert summary["status"] == 'completed'
+    assert summary["progress"]["finished"] == summary["progress"]["total"] == 3
+
+    results = store.results(job_id)
+    assert [item["seq"] for item in results] == [0, 1, 2]
+    assert sorted(item["result"] for item in results) == ['A', 'B', 'C']
@@ -0,0 +1,62 @@
+"""The mock endpoints must return the same bytes for the same input however many requests run at once."""
+import json
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+THREADS = 32
+RUNS = 3
+
+# (path, JSON body) for every deterministic mock endpoint
+MOCK_REQUESTS = (
+    [('/api/username/sherlock', {"username": f"user{i}"}) for i in range(20)] +
+    [('/api/email/haveibeenpwned', {"email": f"person{i}@example.com"}) for i in range(20)] +
+    [('/api/email/domain-emails', {"domain": f"example{i}.com"}) for i in range(20)] +
+    [('/api/ip/shodan', {"ip": f"198.51.100.{i}"}) for i in range(20)]
+)
+
+
+def fetch(session, base_url, path, body):
+    response = session.post(base_url + path, json=body, timeout=30)
+    assert response.status_code == 200, response.text
+    return response.content
+
+
+def test_mock_responses_are_identical_under_concurrency(live_server):
+    with requests.Session() as session:
+        expected = [fetch(session, live_server, path, body) for path, body in MOCK_REQUESTS]
+
+    # Every request several times over, interleaved differently on each run
+    work = list(range(len(MOCK_REQUESTS))) * RUNS
+    random.Random(0).shuffle(work)
+
+    def run(index):
+        with requests.Session() as session:
+            path, body = MOCK_REQUESTS[index]
+            return index, fetch(session, live_server, path, body)
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        for index, content in pool.map(run, work):
+            assert content == expected[index], MOCK_REQUESTS[index]
+
+
+def test_mock_lookups_are_identical_in_batch(app):
+    # Batch runs the same lookups on a thread pool; each line must match the single-target endpoint
+    client = app.test_client()
+    usernames = [f"user{i}" for i in range(20)]
+
+    singles = {
+        username: client.post('/api/username/sherlock', json={"username": username}).get_json()
+        for username in usernames
+    }
+    response = client.post('/api/username/batch', json={
+        "targets": usernames, "lookups": ["sherlock"], "concurrency": THREADS
+    })
+
+    assert response.status_code == 200
+    lines = [line for line in response.get_data(as_text=True).splitlines() if line]
+    assert len(lines) == len(usernames)
+    for line in lines:
+        result = json.loads(line)
+        assert result["result"] == singles[result["target"]]
@@ -0,0 +1,63 @@
+"""The RDAP prefix cache table is shared by every worker process."""
+import sqlite3
+
+from services.prefix_cache import PrefixCache
+
+
+def rows(path):
+    with sqlite3.connect(str(path)) as conn:
+        return conn.execute("SELECT cidr, seq FROM prefixes ORDER BY cidr").fetchall()
+
+
+def test_saves_merge_entries_from_other_workers(tmp_path):
+    path = str(tmp_path / 'prefixes.sqlite3')
+    first = PrefixCache(path=path, save_interval=3600)
+    second = PrefixCache(path=path, save_interval=3600)
+
+    first.insert(['192.0.2.0/24'], {"network": "first"}, ttl=60)
+    second.insert(['198.51.100.0/24'], {"network": "second"}, ttl=60)
+    first.flush()
+    second.flush()
+
+    reloaded = PrefixCache(path=path)
+    assert reloaded.lookup('192.0.2.10') == {"network": "first"}
+    assert reloaded.lookup('198.51.100.10') == {"network": "second"}
+    # The second save also taught that worker what the first one had found
+    assert second.lookup('192.0.2.10') == {"network": "first"}
+
+
+def test_flush_writes_pending_inserts_only(tmp_path):
+    path = tmp_path / 'prefixes.sqlite3'
+    cache = PrefixCache(path=str(path), save_interval=3600)
+
+    cache.flush()
+    assert rows(path) == []
+
+    cache.insert(['203.0.113.0/24'], {"network": "pending"}, ttl=60)
+    cache.flush()
+    assert PrefixCache(path=str(path)).lookup('203.0.113.1') == {"network": "pending"}
+
+
+def test_saves_write_only_new_networks(tmp_path):
+    path = tmp_path / 'prefixes.sqlite3'
+    cache = PrefixCache(path=str(path), save_interval=3600)
+
+    cache.insert(['192.0.2.0/24'], {"network": "old"}, ttl=60)
+    cache.flush()
+    cache.insert(['198.51.100.0/24'], {"network": "new"}, ttl=60)
+    cache.flush()
+
+    # The first network was not rewritten by the second save
+    assert rows(path) == [('192.0.2.0/24', 1), ('198.51.100.0/24', 2)]
+
+
+def test_table_is_trimmed_to_max_entries(tmp_path):
+    path = tmp_path / 'prefixes.sqlite3'
+    cache = PrefixCache(path=str(path), max_entries=2, save_interval=3600)
+
+    for i, ttl in enumerate([30, 10, 20]):
+        cache.insert([f'10.{i}.0.0/16'], {"n": i}, ttl=ttl)
+        cache.flush()
+
+    # The network that expires soonest goes first
+    assert [cidr for cidr, _ in rows(path)] == ['10.0.0.0/16', '10.2.0.0/16']
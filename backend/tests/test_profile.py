@@ -0,0 +1,57 @@
+"""Profile sections run concurrently under one shared deadline."""
+import json
+import threading
+import time
+
+from services.profile import profile_response
+
+
+def sections(release):
+    def slow(target):
+        release.wait(5)
+        return "late"
+
+    def failing(target):
+        raise ValueError(f"no data for {target}")
+
+    return {"fast": lambda target: f"fast {target}", "slow": slow, "failing": failing}
+
+
+def test_sections_missing_the_deadline_are_reported_as_errors(app):
+    release = threading.Event()
+    with app.test_request_context():
+        started = time.monotonic()
+        response = profile_response('domain', 'example.com', sections(release), deadline=0.3)
+        elapsed = time.monotonic() - started
+    release.set()
+
+    assert elapsed < 2
+    assert response.get_json() == {
+        "domain": "example.com",
+        "sections": {"fast": "fast example.com"},
+        "errors": {"slow": "Deadline exceeded", "failing": "no data for example.com"},
+        "complete": False,
+    }
+
+
+def test_complete_profile(app):
+    with app.test_request_context():
+        response = profile_response('ip', '192.0.2.1', {"a": lambda ip: 1, "b": lambda ip: [ip]})
+
+    assert response.get_json() == {"ip": "192.0.2.1", "sections": {"a": 1, "b": ["192.0.2.1"]},
+                                   "errors": {}, "complete": True}
+
+
+def test_streamed_sections_arrive_as_ndjson_in_completion_order(app):
+    release = threading.Event()
+    with app.test_request_context():
+        response = profile_response('domain', 'example.com', sections(release), stream=True, deadline=5)
+        lines = response.response
+        first = json.loads(next(lines))
+        second = json.loads(next(lines))
+        release.set()
+        last = json.loads(next(lines))
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert {first["section"], second["section"]} == {"fast", "failing"}
+    assert last == {"section": "slow", "result": "late"}
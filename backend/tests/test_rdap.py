@@ -0,0 +1,59 @@
+"""Loading the IANA RDAP bootstrap map."""
+import time
+
+import pytest
+
+from bench import fakes
+from services import rdap
+
+
+@pytest.fixture
+def bootstrap(monkeypatch, tmp_path):
+    """Start with no map loaded and nothing on disk"""
+    monkeypatch.setattr(rdap, 'RDAP_BOOTSTRAP_PATH', str(tmp_path / 'dns.json'))
+    monkeypatch.setattr(rdap, '_servers', None)
+    monkeypatch.setattr(rdap, '_loaded_at', 0)
+    monkeypatch.setattr(rdap, '_refreshing', False)
+    monkeypatch.setattr(rdap, '_retry_at', 0)
+
+
+def test_failed_download_is_not_retried_until_the_back_off_ends(bootstrap, monkeypatch):
+    downloads = []
+
+    def fail():
+        downloads.append(time.time())
+        raise OSError("unreachable")
+
+    monkeypatch.setattr(rdap, '_download', fail)
+
+    for _ in range(3):
+        with pytest.raises(Exception):
+            rdap.server_for('example.test')
+    assert len(downloads) == 1
+
+    monkeypatch.setattr(rdap, '_retry_at', 0)
+    with pytest.raises(Exception):
+        rdap.server_for('example.test')
+    assert len(downloads) == 2
+
+
+def test_lookups_during_the_first_download_do_not_wait_for_it(bootstrap, monkeypatch):
+    monkeypatch.setattr(rdap, '_refreshing', True)
+
+    started = time.monotonic()
+    with pytest.raises(Exception):
+        rdap.server_for('example.test')
+    assert time.monotonic() - started < 0.1
+
+
+def test_downloads_and_saves_the_map(bootstrap, monkeypatch):
+    server = fakes.http_server({}, fakes.UpstreamBehaviour(latency=0)).start()
+    try:
+        monkeypatch.setattr(rdap, 'RDAP_BOOTSTRAP_URL', f"http://127.0.0.1:{server.port}/rdap/dns.json")
+        assert rdap.server_for('example.test') == f"http://127.0.0.1:{server.port}/rdap/"
+    finally:
+        server.stop()
+
+    # Another worker starting now reads the saved copy
+    monkeypatch.setattr(rdap, '_servers', None)
+    assert rdap.server_for('example.test') == f"http://127.0.0.1:{server.port}/rdap/"
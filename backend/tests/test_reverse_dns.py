@@ -0,0 +1,30 @@
+"""Reverse DNS goes through the shared resolver."""
+import dns.name
+import dns.resolver
+import pytest
+
+from routes import ip_routes
+
+
+@pytest.fixture
+def queries(monkeypatch):
+    sent = []
+
+    def resolve(qname, rdtype='A', **kwargs):
+        sent.append((qname.to_text(), rdtype))
+        if qname.labels[0] == b'1':
+            raise dns.resolver.NXDOMAIN
+        return [dns.name.from_text('host.example.')]
+
+    monkeypatch.setattr(ip_routes.dns_resolver, 'resolve', resolve)
+    return sent
+
+
+def test_ptr_answer_is_returned_without_the_trailing_dot(queries):
+    assert ip_routes.lookup_reverse_dns('192.0.2.10') == 'host.example'
+    assert queries == [('10.2.0.192.in-addr.arpa.', 'PTR')]
+
+
+def test_missing_ptr_record_is_none(queries):
+    assert ip_routes.lookup_reverse_dns('2001:db8::1') is None
+    assert queries[0][0].endswith('.ip6.arpa.')
@@ -0,0 +1,51 @@
+"""The HEAD fallback for username sites, against the fake profile sites."""
+import pytest
+
+from bench import fakes
+from services import site_catalog
+from services.site_catalog import Site
+
+
+@pytest.fixture
+def sites_server():
+    server = fakes.http_server({}, fakes.UpstreamBehaviour(latency=0)).start()
+    yield server
+    server.stop()
+
+
+def site_for(server, kind):
+    return Site(kind, {"url": f"http://127.0.0.1:{server.port}/site/{kind}/{{}}", "errorType": "status_code"})
+
+
+def username(exists):
+    return next(f"user{i}" for i in range(1000) if fakes.username_exists(f"user{i}") == exists)
+
+
+def test_head_is_given_up_on_405_and_retried_later(sites_server, monkeypatch):
+    site = site_for(sites_server, 'nohead')
+
+    assert site.check(username(True))["exists"]
+    assert site.head_disabled_until > 0
+    assert not site.check(username(False))["exists"]
+
+    # Once the retry period is over HEAD is tried (and given up on) again
+    monkeypatch.setattr(site, 'head_disabled_until', 0)
+    site.check(username(True))
+    assert site.head_disabled_until > 0
+
+
+def test_other_head_rejections_need_several_in_a_row(sites_server, monkeypatch):
+    site = site_for(sites_server, 'status')
+    monkeypatch.setattr(site_catalog.http_client, 'HEAD_FALLBACK_STATUSES', frozenset([404]))
+
+    # The fake answers HEAD for a missing profile with 404, standing in for a 403 bot check
+    for _ in range(site_catalog.USERNAME_HEAD_FAILURES - 1):
+        site.check(username(False))
+    assert site.head_disabled_until == 0
+
+    site.check(username(True))
+    assert site.head_failures == 0
+
+    for _ in range(site_catalog.USERNAME_HEAD_FAILURES):
+        site.check(username(False))
+    assert site.head_disabled_until > 0
@@ -0,0 +1,75 @@
+"""Username site detection rules."""
+import threading
+
+import pytest
+
+from bench import fakes
+from services.site_catalog import USERNAME_HEAD_FAILURES, Site
+
+
+class FakeResponse:
+    def __init__(self, status_code, url='https://example.test/user'):
+        self.status_code = status_code
+        self.url = url
+        self.headers = {}
+
+
+def test_error_codes_add_to_the_non_2xx_rule():
+    site = Site('Example', {"url": "https://example.test/{}", "errorType": "status_code", "errorCode": 200})
+
+    assert not site.detect(FakeResponse(200))
+    assert not site.detect(FakeResponse(404))
+    assert not site.detect(FakeResponse(500))
+    assert site.detect(FakeResponse(204))
+
+
+def test_response_url_without_error_url_treats_any_redirect_as_absent():
+    site = Site('Example', {"url": "https://example.test/{}", "errorType": "response_url"})
+
+    assert site.detect(FakeResponse(200))
+    assert not site.detect(FakeResponse(302))
+    assert not site.detect(FakeResponse(404))
+
+
+def test_response_url_compares_the_final_url_with_a_relative_error_url():
+    site = Site('Example', {"url": "https://example.test/users/{}", "errorType": "response_url",
+                            "errorUrl": "/login"})
+
+    assert site.error_url == 'https://example.test/login'
+    assert site.detect(FakeResponse(200, 'https://example.test/users/alice'))
+    assert not site.detect(FakeResponse(200, 'https://example.test/login?next=/users/alice'))
+
+
+@pytest.fixture
+def sites_server():
+    server = fakes.http_server({}, fakes.UpstreamBehaviour(latency=0)).start()
+    yield server
+    server.stop()
+
+
+def username(exists):
+    return next(f"user{i}" for i in range(1000) if fakes.username_exists(f"user{i}") == exists)
+
+
+@pytest.mark.parametrize('rules', [{}, {"errorUrl": "/login"}])
+def test_response_url_sites_against_the_fake(sites_server, rules):
+    # The fake redirects missing profiles to /login, which answers 200
+    site = Site('Redirect', dict(rules, url=f"http://127.0.0.1:{sites_server.port}/site/redirect/{{}}",
+                                 errorType="response_url"))
+
+    assert site.check(username(True))["exists"]
+    assert not site.check(username(False))["exists"]
+
+
+def test_concurrent_head_rejections_are_all_counted():
+    site = Site('Example', {"url": "https://example.test/{}"})
+    rejections = USERNAME_HEAD_FAILURES * 200
+
+    threads = [threading.Thread(target=site._head_rejected, args=(403,)) for _ in range(rejections)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Every USERNAME_HEAD_FAILURES-th rejection disables HEAD and resets the count
+    assert site.head_failures == 0 and site.head_disabled_until > 0
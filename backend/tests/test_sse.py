@@ -0,0 +1,57 @@
+"""Server-Sent Events framing for streamed lookups."""
+import json
+import threading
+
+from services.sse import sse_event, stream_events
+
+
+def parse_events(body):
+    """Split an SSE body into (event, data) pairs, checking the framing on the way"""
+    assert body.endswith("\n\n")
+    events = []
+    for message in body[:-2].split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in message.split("\n"))
+        assert set(fields) == {"event", "data"}
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_event_is_one_framed_message_even_with_newlines_in_the_data():
+    message = sse_event('result', {"section": "dns", "result": "line one\nline two"})
+
+    assert message == 'event: result\ndata: {"section": "dns", "result": "line one\\nline two"}\n\n'
+    assert parse_events(message) == [("result", {"section": "dns", "result": "line one\nline two"})]
+
+
+def test_each_task_is_a_result_event_followed_by_done(app):
+    def failing():
+        raise ValueError("lookup failed")
+
+    with app.test_request_context():
+        response = stream_events({"ok": lambda: {"a": 1}, "failing": failing})
+        body = ''.join(response.response)
+
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert response.headers['X-Accel-Buffering'] == 'no'
+
+    events = parse_events(body)
+    assert sorted(events[:2], key=lambda event: event[1]["section"]) == [
+        ("result", {"section": "failing", "error": "lookup failed"}),
+        ("result", {"section": "ok", "result": {"a": 1}}),
+    ]
+    assert events[2] == ("done", {"total": 2, "failed": 1})
+
+
+def test_tasks_past_the_deadline_are_reported_as_failed(app):
+    release = threading.Event()
+
+    with app.test_request_context():
+        response = stream_events({"slow": lambda: release.wait(5)}, deadline=0.2)
+        body = ''.join(response.response)
+    release.set()
+
+    assert parse_events(body) == [
+        ("result", {"section": "slow", "error": "Deadline exceeded"}),
+        ("done", {"total": 1, "failed": 1}),
+    ]
@@ -0,0 +1,93 @@
+"""Subdomain enumeration limits, against the fake DNS server."""
+import socket
+import socketserver
+
+import pytest
+
+from bench import fakes
+from services import upstream
+from services.metrics import SUBDOMAIN_QUERIES
+from services.subdomains import SubdomainEnumerator
+
+DOMAIN = 'enum.test'
+
+
+def exists(name):
+    label = name.split('.')[0]
+    return label.startswith('www')
+
+
+@pytest.fixture
+def dns_server():
+    server = fakes.dns_server(fakes.UpstreamBehaviour(latency=0), exists=exists).start()
+    yield server
+    server.stop()
+
+
+def enumerate_labels(dns_server, labels, **kwargs):
+    enumerator = SubdomainEnumerator(DOMAIN, labels, nameservers=['127.0.0.1'], port=dns_server.port, **kwargs)
+    return enumerator, [result["subdomain"] for result in enumerator]
+
+
+def test_finds_existing_names_and_keeps_wildcard_probes_out_of_the_metrics(dns_server):
+    found_before = SUBDOMAIN_QUERIES._values.get(('found',), 0)
+
+    enumerator, found = enumerate_labels(dns_server, ['www', 'www2', 'mail', 'ftp'])
+
+    assert sorted(found) == ['www.enum.test', 'www2.enum.test']
+    assert SUBDOMAIN_QUERIES._values.get(('found',), 0) - found_before == 2
+    assert enumerator.summary()["wildcard"] == []
+
+
+def test_stops_at_the_deadline():
+    behaviour = fakes.UpstreamBehaviour(latency=0, drop_rate=1.0)
+    server = fakes.dns_server(behaviour).start()
+    try:
+        enumerator, found = enumerate_labels(
+            server, (f"w{i}" for i in range(100000)), timeout=0.1, retries=100, deadline=0.5
+        )
+    finally:
+        server.stop()
+
+    summary = enumerator.summary()
+    assert found == []
+    assert summary["deadline_exceeded"]
+    assert summary["elapsed"] < 1.5
+
+
+def test_sends_no_faster_than_the_rate_limit(dns_server):
+    enumerator = SubdomainEnumerator(
+        DOMAIN, [f"w{i}" for i in range(400)], nameservers=['127.0.0.1'], port=dns_server.port
+    )
+    enumerator.rate_limit = upstream.TokenBucket(200, 100)
+
+    list(enumerator)
+
+    # 100 queries from the burst, the remaining ~300 (plus wildcard probes) at 200 per second
+    assert enumerator.stats["queries"] >= 400
+    assert enumerator.stats["elapsed"] >= 1.4
+
+
+class _UDP6Server(socketserver.UDPServer):
+    address_family = socket.AF_INET6
+
+
+def test_mixes_ipv4_and_ipv6_nameservers(dns_server):
+    # The port setting is shared, so the IPv6 fake listens on the same port number
+    try:
+        server6 = _UDP6Server(('::1', dns_server.port), fakes._DNSHandler)
+    except OSError:
+        pytest.skip("IPv6 loopback is not available")
+    server6.behaviour = fakes.UpstreamBehaviour(latency=0)
+    server6.exists = exists
+    server6 = fakes._Server(server6).start()
+    try:
+        enumerator = SubdomainEnumerator(
+            DOMAIN, ['www', 'www2', 'mail', 'ftp'] * 5, nameservers=['127.0.0.1', '::1'], port=dns_server.port
+        )
+        found = [result["subdomain"] for result in enumerator]
+    finally:
+        server6.stop()
+
+    assert sorted(set(found)) == ['www.enum.test', 'www2.enum.test']
+    assert enumerator.stats["timeouts"] == 0
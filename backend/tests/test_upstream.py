@@ -0,0 +1,74 @@
+"""Circuit breaker bookkeeping in upstream.guard."""
+import pytest
+
+from services import upstream
+from services.metrics import UPSTREAM_REQUESTS
+
+
+def open_then_half_open(name):
+    upstream.register(name)
+    breaker = upstream.get_upstream(name).breaker
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(OSError):
+            with upstream.guard(name):
+                raise OSError("down")
+    assert breaker.state == 'open'
+    breaker.reset_timeout = 0
+    return breaker
+
+
+def test_cancelled_trial_call_releases_the_half_open_breaker():
+    breaker = open_then_half_open('test-cancelled')
+
+    with pytest.raises(KeyboardInterrupt):
+        with upstream.guard('test-cancelled'):
+            raise KeyboardInterrupt
+
+    # The next caller gets the trial instead of being rejected forever
+    with upstream.guard('test-cancelled'):
+        pass
+    assert breaker.state == 'closed'
+
+
+def test_neutral_errors_neither_trip_nor_close_the_breaker():
+    name = 'test-neutral'
+    upstream.register(name)
+    breaker = upstream.get_upstream(name).breaker
+    for _ in range(breaker.failure_threshold * 2):
+        with pytest.raises(TimeoutError):
+            with upstream.guard(name, neutral=(TimeoutError,)):
+                raise TimeoutError
+    assert breaker.state == 'closed' and breaker.failures == 0
+
+    breaker = open_then_half_open('test-neutral-trial')
+    with pytest.raises(TimeoutError):
+        with upstream.guard('test-neutral-trial', neutral=(TimeoutError,)):
+            raise TimeoutError
+    assert breaker.state == 'half_open'
+    with upstream.guard('test-neutral-trial'):
+        pass
+    assert breaker.state == 'closed'
+
+
+def test_unregistered_hosts_share_the_targets_upstream_without_a_breaker():
+    before = set(upstream.upstream_status())
+    for i in range(50):
+        with pytest.raises(OSError):
+            with upstream.guard(f'site-{i}.example'):
+                raise OSError("down")
+
+    assert set(upstream.upstream_status()) == before
+    targets = upstream.get_upstream('site-0.example')
+    assert targets.name == upstream.TARGETS and targets.breaker.allow()
+
+
+def test_metrics_label_upstreams_by_kind_not_by_host():
+    upstream.register('test-registry.example', label='whois')
+    with upstream.guard('test-registry.example'):
+        pass
+    with upstream.guard('some-site.example'):
+        pass
+
+    labels = {labels[0] for labels in UPSTREAM_REQUESTS._values}
+    assert 'whois' in labels and upstream.TARGETS in labels
+    assert not {'test-registry.example', 'some-site.example'} & labels
@@ -0,0 +1,107 @@
+"""Change detection for watched lookups."""
+import pytest
+
+from routes import watchlist_routes
+from services import watchlist
+
+
+def test_diff_compares_dicts_by_key_and_flat_lists_as_sets():
+    old = {"a": 1, "records": ["x", "y"], "gone": True, "nested": {"b": [1, {"c": 2}]}}
+    new = {"a": 2, "records": ["y", "z"], "added": "new", "nested": {"b": [1, {"c": 3}]}}
+
+    assert watchlist.diff(old, new) == [
+        {"path": "a", "op": "changed", "old": 1, "new": 2},
+        {"path": "added", "op": "added", "new": "new"},
+        {"path": "gone", "op": "removed", "old": True},
+        # Lists holding dicts are compared whole
+        {"path": "nested.b", "op": "changed", "old": [1, {"c": 2}], "new": [1, {"c": 3}]},
+        {"path": "records", "op": "added", "new": "z"},
+        {"path": "records", "op": "removed", "old": "x"},
+    ]
+    assert watchlist.diff({"records": ["b", "a"]}, {"records": ["a", "b"]}) == []
+
+
+def test_fingerprint_ignores_key_order_only():
+    assert watchlist.fingerprint({"a": 1, "b": [1, 2]}) == watchlist.fingerprint({"b": [1, 2], "a": 1})
+    assert watchlist.fingerprint({"a": 1}) != watchlist.fingerprint({"a": "1"})
+    assert watchlist.fingerprint({"b": [1, 2]}) != watchlist.fingerprint({"b": [2, 1]})
+
+
+def test_whois_results_from_different_sources_fingerprint_the_same():
+    from_rdap = {
+        "registrar": "Example Registrar", "status": ["clientTransferProhibited", "active"],
+        "name_servers": ["ns1.example.com", "ns2.example.com"], "source": "RDAP (https://rdap.example/)",
+    }
+    from_port_43 = {
+        "registrar": "Example Registrar", "status": ["active", "clientTransferProhibited"],
+        "name_servers": ["ns2.example.com", "ns1.example.com"], "raw_text": "Domain Name: EXAMPLE.COM\n...",
+        "whois_server": "whois.example",
+    }
+    assert watchlist.fingerprint(watchlist_routes.normalise_whois(from_rdap)) == \
+        watchlist.fingerprint(watchlist_routes.normalise_whois(from_port_43))
+
+    single_status = watchlist_routes.normalise_whois({"status": "ok"})
+    assert single_status == {"status": ["ok"]}
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    results = []
+
+    def lookup(target):
+        value = results.pop(0)
+        if isinstance(value, Exception):
+            raise value
+        return value, 3600
+
+    monkeypatch.setitem(watchlist._watch_lookups, 'test_lookup', ('domain', lookup))
+    store = watchlist.WatchStore(str(tmp_path / 'watchlist.sqlite3'))
+    return watchlist.WatchScheduler(store, workers=1), results
+
+
+def check_due(scheduler):
+    for item in scheduler.store.claim_due(10):
+        scheduler.check(item)
+
+
+def test_scheduler_records_a_baseline_then_only_real_changes(scheduler):
+    scheduler, results = scheduler
+    store = scheduler.store
+    watch_id = store.add('example.com', 'domain', ['test_lookup'])
+    results.extend([
+        {"records": ["a", "b"]},
+        {"records": ["b", "a"]},  # Reordered, but the same records
+        OSError("resolver down"),
+        {"records": ["a", "c"]},
+    ])
+
+    for _ in range(4):
+        check_due(scheduler)
+        store.check_now(watch_id)
+
+    watch = store.get(watch_id, include_state=True)["lookups"]["test_lookup"]
+    assert watch["checks"] == 3 and watch["last_error"] is None
+    assert watch["result"] == {"records": ["a", "c"]}
+
+    # The baseline, the reorder and the failed check add nothing to the feed
+    changes = store.changes()
+    assert [change["changes"] for change in changes] == [[
+        {"path": "records", "op": "added", "new": "c"},
+        {"path": "records", "op": "removed", "old": "b"},
+    ]]
+    assert changes[0]["watch_id"] == watch_id and changes[0]["target"] == 'example.com'
+
+
+def test_scheduler_keeps_the_stored_result_after_a_failed_check(scheduler):
+    scheduler, results = scheduler
+    store = scheduler.store
+    watch_id = store.add('example.com', 'domain', ['test_lookup'])
+    results.extend([{"records": ["a"]}, OSError("resolver down")])
+
+    check_due(scheduler)
+    store.check_now(watch_id)
+    check_due(scheduler)
+
+    watch = store.get(watch_id, include_state=True)["lookups"]["test_lookup"]
+    assert watch["last_error"] == "resolver down" and watch["result"] == {"records": ["a"]}
+    assert watch["next_check_at"] > 0
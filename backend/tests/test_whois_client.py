@@ -0,0 +1,56 @@
+"""The WHOIS client's timeout covers the whole query."""
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+
+import pytest
+
+from services import whois_client
+
+
+class _TrickleHandler(socketserver.BaseRequestHandler):
+    """Answers one byte at a time, slowly enough never to trip a per-recv timeout"""
+
+    def handle(self):
+        self.request.recv(1024)
+        try:
+            while not self.server.stopped.is_set():
+                self.request.sendall(b'x')
+                time.sleep(0.1)
+        except OSError:
+            pass
+
+
+@pytest.fixture
+def trickle_server(monkeypatch):
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _TrickleHandler)
+    server.daemon_threads = True
+    server.stopped = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(whois_client, 'WHOIS_PORT', server.server_address[1])
+    yield server
+    server.stopped.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_a_trickling_server_cannot_outlast_the_timeout(trickle_server):
+    started = time.monotonic()
+    with pytest.raises(socket.timeout):
+        whois_client.query('127.0.0.1', 'example.test', timeout=0.5)
+    assert time.monotonic() - started < 1
+
+
+def test_waiting_for_a_connection_slot_counts_against_the_timeout(trickle_server, monkeypatch):
+    monkeypatch.setattr(whois_client, '_server_slots', OrderedDict({'127.0.0.1': threading.BoundedSemaphore(1)}))
+    slot = whois_client._server_slot('127.0.0.1')
+    slot.acquire()
+    try:
+        started = time.monotonic()
+        with pytest.raises(socket.timeout):
+            whois_client.query('127.0.0.1', 'example.test', timeout=0.3)
+        assert time.monotonic() - started < 0.6
+    finally:
+        slot.release()
@@ -55,80 +55,60 @@ const DomainPage = () => {
       headers: true
     });
 
-    try {
-      // Get WHOIS information (don't await here to allow parallel requests)
-      const whoisPromise = domainApi.getWhois(domainValue)
-        .then(response => {
-          setResults(prev => ({ ...prev, whois: response.data }));
-          setLoadingStates(prev => ({ ...prev, whois: false }));
-        })
-        .catch(err => {
-          console.error('WHOIS error:', err);
-          setLoadingStates(prev => ({ ...prev, whois: false }));
-          // Don't set global error, just mark this result as having an error
-          setResults(prev => ({ 
-            ...prev, 
-            whois: { 
-              domain: domainValue,
-              error: err.message,
-              message: "Oops! We couldn't fetch the WHOIS data. Might be rate limiting or network gremlins."
-            } 
-          }));
-        });
-      
-      // Get DNS records
-      const dnsPromise = domainApi.getDns(
-        domainValue,
-        selectedOptions.length > 0 ? selectedOptions : undefined
-      )
-        .then(response => {
-          setResults(prev => ({ ...prev, dns: response.data }));
-          setLoadingStates(prev => ({ ...prev, dns: false }));
-        })
-        .catch(err => {
-          console.error('DNS error:', err);
-          setLoadingStates(prev => ({ ...prev, dns: false }));
-          setResults(prev => ({ 
-            ...prev, 
-            dns: { 
-              domain: domainValue,
-              error: err.message,
-              message: "Hmm, couldn't grab those DNS records. The internet's being a bit dodgy."
-            } 
+    const errorMessages = {
+      whois: "Oops! We couldn't fetch the WHOIS data. Might be rate limiting or network gremlins.",
+      dns: "Hmm, couldn't grab those DNS records. The internet's being a bit dodgy.",
+      headers: "Couldn't fetch the HTTP headers. The domain might be playing hard to get.",
+    };
+
+    // Each section (and each DNS record type) is rendered as soon as the server sends it
+    await new Promise((resolve) => {
+      domainApi.stream(domainValue, selectedOptions.length > 0 ? selectedOptions : undefined, {
+        onResult: ({ section, result, error: sectionError }) => {
+          if (section.startsWith('dns:')) {
+            const recordType = section.slice(4);
+            setResults(prev => ({
+              ...prev,
+              dns: {
+                domain: domainValue,
+                dns_records: {
+                  ...(prev.dns?.dns_records || {}),
+                  [recordType]: sectionError ? [`Error: ${sectionError}`] : result,
+                },
+              },
+            }));
+            setLoadingStates(prev => ({ ...prev, dns: false }));
+            return;
+          }
+
+          setResults(prev => ({
+            ...prev,
+            [section]: sectionError
+              ? { domain: domainValue, error: sectionError, message: errorMessages[section] }
+              : result,
           }));
-        });
-      
-      // Get HTTP headers
-      const headersPromise = domainApi.getHeaders(domainValue)
-        .then(response => {
-          setResults(prev => ({ ...prev, headers: response.data }));
-          setLoadingStates(prev => ({ ...prev, headers: false }));
-        })
-        .catch(err => {
-          console.error('Headers error:', err);
-          setLoadingStates(prev => ({ ...prev, headers: false }));
-          setResults(prev => ({ 
-            ...prev, 
-            headers: { 
-              domain: domainValue,
-              error: err.message,
-              message: "Couldn't fetch the HTTP headers. The domain might be playing hard to get."
-            } 
+          setLoadingStates(prev => ({ ...prev, [section]: false }));
+        },
+        onDone: resolve,
+        onError: (err) => {
+          console.error('Domain stream error:', err);
+          // Don't set global error, just mark whatever never arrived as having an error
+          setResults(prev => ({
+            whois: prev.whois || { domain: domainValue, error: 'Connection lost', message: errorMessages.whois },
+            dns: prev.dns || { domain: domainValue, error: 'Connection lost', message: errorMessages.dns },
+            headers: prev.headers || { domain: domainValue, error: 'Connection lost', message: errorMessages.headers },
           }));
-        });
+          resolve();
+        },
+      });
+    });
 
-      // Wait for all promises to settle (whether resolved or rejected)
-      await Promise.allSettled([whoisPromise, dnsPromise, headersPromise]);
-      
-    } catch (err) {
-      console.error('Error fetching domain information:', err);
-      setError(
-        err.response?.data?.error ||
-          'Something went wrong while digging up info on this domain. Give it another go?'
-      );
-    } finally {
-      setLoading(false);
-    }
+    setLoadingStates({
+      whois: false,
+      dns: false,
+      headers: false
+    });
+    setLoading(false);
   };
 
   const handleTabChange = (event, newValue) => {
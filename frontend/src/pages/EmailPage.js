@@ -7,7 +7,7 @@ import SearchIcon from '@mui/icons-material/Search';
 
 import SearchForm from '../components/SearchForm';
 import ResultCard from '../components/ResultCard';
-import { emailApi } from '../services/api';
+import { emailApi, profileSection } from '../services/api';
 
 const EmailPage = () => {
   const [email, setEmail] = useState('');
@@ -26,23 +26,16 @@ const EmailPage = () => {
     setError(null);
 
     try {
-      // Validate email
-      const validationResponse = await emailApi.validate(emailValue);
-      
-      // Check for breaches (note: this is a placeholder in our backend)
-      const breachesResponse = await emailApi.checkBreaches(emailValue);
-      
-      // If it's a domain, try to find associated emails
-      let domainEmailsResponse = null;
-      if (emailValue.includes('@')) {
-        const domain = emailValue.split('@')[1];
-        domainEmailsResponse = await emailApi.findDomainEmails(domain);
-      }
+      // Validation, breach check and domain emails all come back from one request
+      const response = await emailApi.getProfile(emailValue);
+      const profile = response.data;
 
       setResults({
-        validation: validationResponse.data,
-        breaches: breachesResponse.data,
-        domainEmails: domainEmailsResponse?.data || null,
+        validation: profileSection(profile, 'validate', "Couldn't validate this email address."),
+        breaches: profileSection(profile, 'haveibeenpwned', "Couldn't check this email for data breaches."),
+        domainEmails: emailValue.includes('@')
+          ? profileSection(profile, 'domain-emails', "Couldn't find emails for this domain.")
+          : null,
       });
     } catch (err) {
       console.error('Error fetching email information:', err);
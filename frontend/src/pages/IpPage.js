@@ -8,7 +8,7 @@ import SecurityIcon from '@mui/icons-material/Security';
 
 import SearchForm from '../components/SearchForm';
 import ResultCard from '../components/ResultCard';
-import { ipApi } from '../services/api';
+import { ipApi, profileSection } from '../services/api';
 
 const IpPage = () => {
   const [ip, setIp] = useState('');
@@ -28,23 +28,15 @@ const IpPage = () => {
     setError(null);
 
     try {
-      // Get geolocation information
-      const geoResponse = await ipApi.getGeolocation(ipValue);
-      
-      // Get WHOIS information
-      const whoisResponse = await ipApi.getWhois(ipValue);
-      
-      // Get reverse DNS information
-      const dnsResponse = await ipApi.getReverseDns(ipValue);
-      
-      // Get Shodan information (note: this is a placeholder in our backend)
-      const shodanResponse = await ipApi.getShodan(ipValue);
+      // Get every section in one round trip; the backend runs them in parallel
+      const response = await ipApi.getProfile(ipValue);
+      const profile = response.data;
 
       setResults({
-        geolocation: geoResponse.data,
-        whois: whoisResponse.data,
-        reverseDns: dnsResponse.data,
-        shodan: shodanResponse.data,
+        geolocation: profileSection(profile, 'geolocation', "Couldn't fetch geolocation information for this IP."),
+        whois: profileSection(profile, 'whois', "Couldn't fetch WHOIS information for this IP."),
+        reverseDns: profileSection(profile, 'reverse-dns', "Couldn't look up reverse DNS for this IP."),
+        shodan: profileSection(profile, 'shodan', "Couldn't fetch Shodan information for this IP."),
       });
     } catch (err) {
       console.error('Error fetching IP information:', err);
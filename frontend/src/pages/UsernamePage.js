@@ -19,25 +19,35 @@ const UsernamePage = () => {
     setUsername(usernameValue);
     setLoading(true);
     setError(null);
+    setResults({ username: usernameValue, results: [] });
+    setSherlockResults(null);
 
-    try {
-      // Search for username across platforms
-      const searchResponse = await usernameApi.search(usernameValue);
-      
-      // Get Sherlock results (note: this is a placeholder in our backend)
-      const sherlockResponse = await usernameApi.sherlockSearch(usernameValue);
-      
-      setResults(searchResponse.data);
-      setSherlockResults(sherlockResponse.data);
-    } catch (err) {
-      console.error('Error fetching username information:', err);
-      setError(
-        err.response?.data?.error ||
-          'An error occurred while fetching username information. Please try again.'
-      );
-    } finally {
-      setLoading(false);
-    }
+    // Site checks show up one by one as the server finishes them
+    await new Promise((resolve) => {
+      usernameApi.stream(usernameValue, {
+        onResult: ({ section, result, error: sectionError }) => {
+          if (section === 'sherlock') {
+            setSherlockResults(
+              sectionError ? { error: sectionError, message: "Couldn't fetch Sherlock results." } : result
+            );
+            return;
+          }
+
+          const siteResult = sectionError
+            ? { site: section.replace(/^site:/, ''), url: '', exists: false, error: sectionError }
+            : result;
+          setResults(prev => ({ ...prev, results: [...prev.results, siteResult] }));
+        },
+        onDone: resolve,
+        onError: (err) => {
+          console.error('Error fetching username information:', err);
+          setError('The connection dropped before every site was checked. Please try again.');
+          resolve();
+        },
+      });
+    });
+
+    setLoading(false);
   };
 
   return (
@@ -70,7 +80,7 @@ const UsernamePage = () => {
         </Alert>
       )}
 
-      {!loading && !error && results && (
+      {results && results.results.length > 0 && (
         <Box>
           <Typography variant="h5" gutterBottom>
             Results for username: {username}
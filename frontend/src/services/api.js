@@ -9,11 +9,31 @@ const api = axios.create({
   },
 });
 
+// Open a Server-Sent Events stream; onResult is called once per section as it arrives
+const streamLookup = (path, params, { onResult, onDone, onError }) => {
+  const source = new EventSource(`${API_URL}${path}?${new URLSearchParams(params)}`);
+
+  source.addEventListener('result', (event) => onResult(JSON.parse(event.data)));
+  source.addEventListener('done', (event) => {
+    source.close();
+    if (onDone) onDone(JSON.parse(event.data));
+  });
+  source.onerror = (event) => {
+    source.close();
+    if (onError) onError(event);
+  };
+
+  return source;
+};
+
 // Domain endpoints
 export const domainApi = {
   getWhois: (domain) => api.post('/domain/whois', { domain }),
   getDns: (domain, recordTypes) => api.post('/domain/dns', { domain, record_types: recordTypes }),
   getHeaders: (domain) => api.post('/domain/headers', { domain }),
+  getProfile: (domain, recordTypes) => api.post('/domain/profile', { domain, record_types: recordTypes }),
+  stream: (domain, recordTypes, handlers) =>
+    streamLookup('/domain/stream', recordTypes ? { domain, record_types: recordTypes.join(',') } : { domain }, handlers),
 };
 
 // Email endpoints
@@ -21,12 +41,16 @@ export const emailApi = {
   validate: (email) => api.post('/email/validate', { email }),
   checkBreaches: (email) => api.post('/email/haveibeenpwned', { email }),
   findDomainEmails: (domain) => api.post('/email/domain-emails', { domain }),
+  getProfile: (email) => api.post('/email/profile', { email }),
+  stream: (email, handlers) => streamLookup('/email/stream', { email }, handlers),
 };
 
 // Username endpoints
 export const usernameApi = {
   search: (username, limit) => api.post('/username/search', { username, limit }),
   sherlockSearch: (username) => api.post('/username/sherlock', { username }),
+  getProfile: (username) => api.post('/username/profile', { username }),
+  stream: (username, handlers) => streamLookup('/username/stream', { username }, handlers),
 };
 
 // IP endpoints
@@ -35,6 +59,19 @@ export const ipApi = {
   getWhois: (ip) => api.post('/ip/whois', { ip }),
   getReverseDns: (ip) => api.post('/ip/reverse-dns', { ip }),
   getShodan: (ip) => api.post('/ip/shodan', { ip }),
+  getProfile: (ip) => api.post('/ip/profile', { ip }),
+  stream: (ip, handlers) => streamLookup('/ip/stream', { ip }, handlers),
+};
+
+// Pull one section out of a profile response, turning a failed section into an error result
+export const profileSection = (profile, name, message) => {
+  if (profile.sections[name]) {
+    return profile.sections[name];
+  }
+  if (profile.errors[name]) {
+    return { error: profile.errors[name], message };
+  }
+  return null;
 };
 
 // Health check